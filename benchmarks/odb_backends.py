@@ -0,0 +1,84 @@
+# Copyright (c) 2020 IBM Corp. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Compare Collator object database backends.
+
+Builds two throw-away repositories, one with many small JSON blobs and one
+with a few large blobs, then reads every version through each backend.
+
+Usage: python benchmarks/odb_backends.py [--small 2000] [--large 5]
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import warnings
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from harvest.collator import ODB_BACKENDS, Collator  # noqa: E402
+
+from test.fixtures.git_repo import make_repo  # noqa: E402
+
+START = datetime(2020, 1, 1, 12)
+
+
+def build(path, versions, size):
+    """Create a repository with one version of raw/bench.json per day."""
+    history = []
+    for day in range(versions):
+        content = json.dumps({"day": day, "padding": "x" * size})
+        history.append((START + timedelta(days=day), {"raw/bench.json": content}))
+    make_repo(path, history).git.gc("--quiet")
+
+
+def bench(path, versions, odb):
+    """Read every version's content, returning the content read time and calls."""
+    collator = Collator("https://github.com/foo/bar", None, "master", path, odb=odb)
+    commits = collator.read(
+        "raw/bench.json", START, START + timedelta(days=versions - 1)
+    )
+    collator.audit.reset()
+    begin = time.perf_counter()
+    for commit in commits:
+        commit.tree["raw/bench.json"].data_stream.read()
+    return time.perf_counter() - begin, collator.audit.count("command")
+
+
+def main():
+    """Run the benchmark and print a results table."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--small", type=int, default=2000)
+    parser.add_argument("--large", type=int, default=5)
+    args = parser.parse_args()
+    warnings.simplefilter("ignore", DeprecationWarning)
+    scenarios = [
+        ("many small blobs", args.small, 256),
+        ("few large blobs", args.large, 32 * 1024 * 1024),
+    ]
+    print(f'{"scenario":<18}{"backend":<8}{"versions":>10}{"seconds":>10}{"git":>6}')
+    for name, versions, size in scenarios:
+        with tempfile.TemporaryDirectory() as path:
+            build(path, versions, size)
+            for odb in sorted(ODB_BACKENDS):
+                elapsed, calls = bench(path, versions, odb)
+                print(f"{name:<18}{odb:<8}{versions:>10}{elapsed:>10.2f}{calls:>6}")
+
+
+if __name__ == "__main__":
+    main()
@@ -13,4 +13,4 @@
 # limitations under the License.
 """The Auditree file collating and reporting tool."""
 
-__version__ = "1.3.1"
+__version__ = "1.4.0"
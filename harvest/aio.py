@@ -0,0 +1,321 @@
+# Copyright (c) 2020 IBM Corp. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Harvest asyncio collator."""
+
+import asyncio
+import binascii
+import collections
+import time
+from asyncio.subprocess import PIPE
+from datetime import timedelta
+
+import git
+
+from harvest.audit import COMMAND, OBJECT
+from harvest.collator import Collator, sample_dates
+from harvest.output import FileVersion
+
+
+class AsyncCollator(object):
+    """
+    Harvest collator with asyncio read and content methods.
+
+    History walks and object reads run as git subprocesses driven by the event
+    loop.  The object reads of every coroutine share one ``git cat-file
+    --batch-check`` and one ``git cat-file --batch`` process: requests are
+    written as they are made and responses are matched to them in order, so
+    many concurrent lookups need neither a thread nor a process each.  Cloning
+    or fetching the repository, done once per snapshot, runs in the event
+    loop's default executor.
+
+    The repository is checked out, and versions are named, by the Collator
+    that the collator wraps, constructed from the same arguments.
+
+    Use the collator with ``async with``, or await close(), to stop the
+    cat-file processes.
+    """
+
+    def __init__(self, *args, **kwargs):
+        """Construct the AsyncCollator object, with the arguments of a Collator."""
+        self.collator = Collator(*args, **kwargs)
+        self._snapshot_lock = None
+        self._batches = {}
+        self._blob_reads = {}
+
+    @property
+    def audit(self):
+        """Provide the audit of the wrapped collator's git operations."""
+        return self.collator.audit
+
+    @property
+    def blob_cache(self):
+        """Provide the blob cache of the wrapped collator."""
+        return self.collator.blob_cache
+
+    @property
+    def snapshot(self):
+        """Provide the SHA of the commit that reads are answered from, if known."""
+        return self.collator.snapshot
+
+    async def __aenter__(self):
+        """Provide the collator to an async with block."""
+        return self
+
+    async def __aexit__(self, *exc_info):
+        """Stop the cat-file processes at the end of an async with block."""
+        await self.close()
+
+    async def read(self, filepath, from_dt, until_dt, granularity=None):
+        """
+        Retrieve commits from the repository based on a date range.
+
+        Versions are sampled as by Collator.read, from a single ``git
+        rev-list`` of the file's history.  The commits returned hold their
+        commit date, any other attribute is read from the object database on
+        first access.
+
+        :param str filepath: The relative path to the file within the repo
+        :param datetime from_dt: The retrieval start date
+        :param datetime until_dt: The retrieval end date
+        :param granularity: "daily", "weekly", "monthly" or a list of datetimes,
+            defaults to the collator's granularity
+
+        :returns: A list of Commit objects, newest first
+        """
+        snapshot = await self.revision()
+        samples = sample_dates(
+            from_dt, until_dt, granularity or self.collator.granularity
+        )
+        history = iter(())
+        if samples:
+            output = await self._git(
+                "rev-list",
+                "--timestamp",
+                f"--until={samples[0] + timedelta(days=1)}",
+                snapshot,
+                "--",
+                filepath,
+            )
+            repo = self.collator.git_repo
+            history = (
+                git.Commit(repo, binascii.unhexlify(sha), committed_date=int(ts))
+                for ts, sha in (line.split() for line in output.decode().splitlines())
+            )
+        return self.collator._sample(filepath, from_dt, until_dt, samples, history)
+
+    async def content(self, commit, filepath):
+        """
+        Retrieve the content of a file as of a commit.
+
+        When a blob cache is provided the blob is looked up first and its
+        content is only read from the repository if it is not cached, once
+        however many lookups of the blob are in flight.
+
+        :param commit: The commit that the file is retrieved from
+        :param str filepath: The relative path to the file within the repo
+
+        :returns: The raw file content
+        """
+        name = f"{commit.hexsha}:{filepath}"
+        if self.blob_cache is None:
+            return (await self._cat_file("--batch", name, filepath))[1]
+        hexsha, _ = await self._cat_file("--batch-check", name, filepath)
+        content = self.blob_cache.get(hexsha)
+        if content is None:
+            if hexsha not in self._blob_reads:
+                self._blob_reads[hexsha] = asyncio.ensure_future(
+                    self._cache_blob(hexsha, filepath)
+                )
+            content = await asyncio.shield(self._blob_reads[hexsha])
+        return content
+
+    async def versions(self, filepath, from_dt, until_dt, granularity=None):
+        """
+        Iterate over the versions of a file within a date range.
+
+        The content of every version is requested at once and versions are
+        provided oldest first, as their content arrives.
+
+        :param str filepath: The relative path to the file within the repo
+        :param datetime from_dt: The retrieval start date
+        :param datetime until_dt: The retrieval end date
+        :param granularity: "daily", "weekly", "monthly" or a list of datetimes,
+            defaults to the collator's granularity
+
+        :returns: An asynchronous iterator of FileVersion objects
+        """
+        commits = await self.read(filepath, from_dt, until_dt, granularity)
+        commits.sort(key=lambda c: c.committed_date)
+        contents = [asyncio.ensure_future(self.content(c, filepath)) for c in commits]
+        try:
+            for commit, content in zip(commits, contents):
+                yield FileVersion(
+                    self.collator._file_name(filepath, commit),
+                    filepath,
+                    commit,
+                    select=self.collator.select,
+                    revision=self.snapshot,
+                    raw=await content,
+                )
+        finally:
+            for content in contents:
+                content.cancel()
+
+    async def revision(self):
+        """
+        Provide the SHA of the commit that reads are answered from.
+
+        The repository is checked out and the branch, or the collator's rev,
+        is resolved once, as by Collator.revision.
+
+        :returns: The commit SHA
+        """
+        if self.snapshot is not None:
+            return self.snapshot
+        if self._snapshot_lock is None:
+            self._snapshot_lock = asyncio.Lock()
+        collator = self.collator
+        async with self._snapshot_lock:
+            if collator.snapshot is None:
+                loop = asyncio.get_event_loop()
+                await loop.run_in_executor(None, collator.checkout)
+                for rev in collator.revisions():
+                    try:
+                        output = await self._git(
+                            "rev-parse", "--verify", "--quiet", f"{rev}^{{commit}}"
+                        )
+                        break
+                    except git.exc.GitCommandError:
+                        continue
+                else:
+                    name = collator.rev or collator.branch
+                    raise ValueError(f"{name} is not a valid revision")
+                collator.snapshot = output.decode().strip()
+                self.audit.notes["revision"] = collator.snapshot
+            return collator.snapshot
+
+    async def close(self):
+        """Stop the cat-file processes."""
+        batches, self._batches = self._batches, {}
+        for batch in batches.values():
+            await batch.close()
+
+    async def _git(self, *args):
+        command = ["git", f"--git-dir={self.collator.git_repo.git_dir}", *args]
+        start = time.perf_counter()
+        process = await asyncio.create_subprocess_exec(
+            *command, stdout=PIPE, stderr=PIPE
+        )
+        stdout, stderr = await process.communicate()
+        self.audit.record(COMMAND, command, time.perf_counter() - start, len(stdout))
+        if process.returncode:
+            raise git.exc.GitCommandError(
+                command, process.returncode, stderr.decode().strip()
+            )
+        return stdout
+
+    async def _cache_blob(self, hexsha, filepath):
+        try:
+            _, content = await self._cat_file("--batch", hexsha, filepath)
+            self.blob_cache.put(hexsha, content)
+            return content
+        finally:
+            del self._blob_reads[hexsha]
+
+    async def _cat_file(self, mode, name, filepath):
+        await self.revision()
+        if mode not in self._batches:
+            self._batches[mode] = _CatFile(
+                ["git", f"--git-dir={self.collator.git_repo.git_dir}", "cat-file", mode]
+            )
+        start = time.perf_counter()
+        hexsha, size, content = await self._batches[mode].request(name)
+        if hexsha is None:
+            raise KeyError(f"{filepath} not found in {name.split(':')[0]}")
+        self.audit.record(
+            OBJECT,
+            ["stream" if mode == "--batch" else "info", hexsha],
+            time.perf_counter() - start,
+            size if mode == "--batch" else 0,
+        )
+        return hexsha, content
+
+
+class _CatFile(object):
+    # A git cat-file --batch or --batch-check process answering the requests of
+    # many coroutines.  Responses come back in request order, so each request
+    # queues a future that the reader task resolves with the next response.
+
+    def __init__(self, command):
+        self.command = command
+        self.contents = command[-1] == "--batch"
+        self._process = None
+        self._reader = None
+        self._pending = collections.deque()
+        self._drain_lock = asyncio.Lock()
+
+    async def request(self, name):
+        if self._process is None:
+            self._process = asyncio.ensure_future(self._start())
+        process = await self._process
+        if self._reader.done():
+            raise RuntimeError(f'{" ".join(self.command[2:])} is not running')
+        future = asyncio.get_event_loop().create_future()
+        self._pending.append(future)
+        process.stdin.write(f"{name}\n".encode())
+        async with self._drain_lock:
+            await process.stdin.drain()
+        return await future
+
+    async def close(self):
+        if self._process is None:
+            return
+        process = await self._process
+        process.stdin.close()
+        await process.wait()
+        await self._reader
+
+    async def _start(self):
+        process = await asyncio.create_subprocess_exec(
+            *self.command, stdin=PIPE, stdout=PIPE
+        )
+        self._reader = asyncio.ensure_future(self._read(process.stdout))
+        return process
+
+    async def _read(self, stdout):
+        # Responses are "<sha> <type> <size>" followed, for --batch, by the
+        # content and a newline, or "<name> missing" for an unknown object.
+        try:
+            while True:
+                header = await stdout.readline()
+                if not header:
+                    break
+                fields = header.split()
+                response = (None, 0, None)
+                if fields[-1] not in (b"missing", b"ambiguous"):
+                    size = int(fields[2])
+                    content = None
+                    if self.contents:
+                        content = (await stdout.readexactly(size + 1))[:-1]
+                    response = (fields[0].decode(), size, content)
+                future = self._pending.popleft()
+                if not future.done():
+                    future.set_result(response)
+        finally:
+            while self._pending:
+                future = self._pending.popleft()
+                if not future.done():
+                    future.set_exception(
+                        RuntimeError(f'{" ".join(self.command[2:])} exited')
+                    )
@@ -0,0 +1,281 @@
+# Copyright (c) 2020 IBM Corp. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Harvest git audit log."""
+
+import json
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import git
+from git.db import GitCmdObjectDB
+
+COMMAND = "command"
+OBJECT = "object"
+
+
+class GitAudit(object):
+    """
+    Record of every git subprocess and object database request made.
+
+    Requests are totalled by kind and name as they are recorded.  Individual
+    entries are only written to the log file, when one is provided, and kept in
+    memory when asked for.  Entries can be recorded by several threads.
+    """
+
+    def __init__(self, log_path=None, max_entries=0):
+        """
+        Construct the GitAudit object.
+
+        :param str log_path: Optional path to a file that audit entries are
+          appended to as JSON lines
+        :param int max_entries: Keep this many of the latest entries in memory,
+          None keeps every entry, by default none are kept
+        """
+        self.log_path = log_path
+        self.max_entries = max_entries
+        self.entries = deque(maxlen=max_entries)
+        self.totals = {}
+        self.notes = {}
+        self._log = None
+        self._lock = threading.Lock()
+
+    def record(self, kind, command, duration, nbytes=0, streamed=False):
+        """
+        Add a request to the audit.
+
+        :param str kind: The entry kind, either "command" or "object"
+        :param list command: The git command or object database request
+        :param float duration: The elapsed time in seconds
+        :param int nbytes: The number of bytes returned
+        :param bool streamed: True if the output was handed back as a stream
+
+        :returns: The audit entry, or None if entries are neither logged nor kept
+        """
+        entry = None
+        if self.log_path or self.max_entries != 0:
+            entry = {
+                "kind": kind,
+                "command": [_redact(str(arg)) for arg in command],
+                "duration": duration,
+                "bytes": nbytes,
+            }
+            if streamed:
+                entry["streamed"] = True
+        name = _name(kind, command)
+        with self._lock:
+            total = self.totals.get((kind, name))
+            if total is None:
+                total = self.totals[(kind, name)] = {
+                    "count": 0,
+                    "bytes": 0,
+                    "duration": 0,
+                }
+            total["count"] += 1
+            total["bytes"] += nbytes
+            total["duration"] += duration
+            if entry is None:
+                return None
+            if self.max_entries != 0:
+                self.entries.append(entry)
+            if self.log_path:
+                if not self._log:
+                    self._log = open(self.log_path, "a", buffering=1)
+                self._log.write(json.dumps(entry) + "\n")
+        return entry
+
+    @contextmanager
+    def timed(self, kind, command):
+        """
+        Record the duration of the wrapped block as a single audit entry.
+
+        :param str kind: The entry kind, either "command" or "object"
+        :param list command: The git command or object database request
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(kind, command, time.perf_counter() - start)
+
+    def count(self, kind=None, name=None):
+        """
+        Provide the number of audited requests.
+
+        :param str kind: Only count requests of this kind
+        :param str name: Only count requests for this git sub-command or object
+          database request, like "rev-list" or "stream"
+
+        :returns: The number of matching requests
+        """
+        return sum(t["count"] for t in self._filter(kind, name))
+
+    def nbytes(self, kind=None, name=None):
+        """
+        Provide the number of bytes returned by audited requests.
+
+        :param str kind: Only include requests of this kind
+        :param str name: Only include requests for this sub-command or request
+
+        :returns: The total number of bytes
+        """
+        return sum(t["bytes"] for t in self._filter(kind, name))
+
+    def duration(self, kind=None, name=None):
+        """
+        Provide the time spent in audited requests.
+
+        :param str kind: Only include requests of this kind
+        :param str name: Only include requests for this sub-command or request
+
+        :returns: The total duration in seconds
+        """
+        return sum(t["duration"] for t in self._filter(kind, name))
+
+    def summary(self):
+        """
+        Provide the audited request counts, bytes and durations by kind.
+
+        :returns: A dictionary of totals keyed by entry kind
+        """
+        return {
+            kind: {
+                "count": self.count(kind),
+                "bytes": self.nbytes(kind),
+                "duration": self.duration(kind),
+            }
+            for kind in (COMMAND, OBJECT)
+        }
+
+    def requests(self):
+        """
+        Provide the audited request counts, bytes and durations by request.
+
+        :returns: A dictionary of totals keyed by entry kind and git
+          sub-command or object database request, like ("command", "rev-list")
+        """
+        with self._lock:
+            return {key: dict(total) for key, total in self.totals.items()}
+
+    def reset(self):
+        """Discard all recorded entries and totals."""
+        with self._lock:
+            self.entries = deque(maxlen=self.max_entries)
+            self.totals = {}
+
+    def close(self):
+        """Append the audit summary and notes to the log file and close it."""
+        summary = self.summary()
+        with self._lock:
+            if not self._log:
+                return
+            self._log.write(json.dumps({"summary": summary, **self.notes}) + "\n")
+            self._log.close()
+            self._log = None
+
+    def _filter(self, kind, name):
+        return [
+            total
+            for (total_kind, total_name), total in self.requests().items()
+            if (kind is None or total_kind == kind)
+            and (name is None or total_name == name)
+        ]
+
+
+def audit_repo(repo, audit):
+    """
+    Route a repository's git commands and object reads through an audit.
+
+    :param repo: The git.Repo object to instrument
+    :param GitAudit audit: The audit that records the requests
+
+    :returns: The instrumented git.Repo object
+    """
+    git_cmd = getattr(repo, "git", None)
+    if not isinstance(git_cmd, git.Git) or isinstance(git_cmd, _AuditedGit):
+        return repo
+    audited_git = _AuditedGit(repo.working_dir, audit)
+    audited_git.update_environment(**git_cmd.environment())
+    repo.git = audited_git
+    if isinstance(repo.odb, GitCmdObjectDB):
+        # The object database holds its own reference to the command wrapper
+        # so that the persistent cat-file processes are spawned through it.
+        repo.odb._git = audited_git
+    repo.odb = _AuditedObjectDB(repo.odb, audit)
+    return repo
+
+
+class _AuditedGit(git.Git):
+    __slots__ = ("_audit",)
+
+    def __init__(self, working_dir, audit):
+        super().__init__(working_dir)
+        self._audit = audit
+
+    def execute(self, command, *args, **kwargs):
+        start = time.perf_counter()
+        result = None
+        try:
+            result = super().execute(command, *args, **kwargs)
+            return result
+        finally:
+            output = result[1] if isinstance(result, tuple) else result
+            self._audit.record(
+                COMMAND,
+                command if isinstance(command, (list, tuple)) else [command],
+                time.perf_counter() - start,
+                len(output) if isinstance(output, (str, bytes)) else 0,
+                kwargs.get("as_process", False),
+            )
+
+
+class _AuditedObjectDB(object):
+    def __init__(self, odb, audit):
+        self._odb = odb
+        self._audit = audit
+
+    def info(self, binsha):
+        start = time.perf_counter()
+        oinfo = self._odb.info(binsha)
+        self._audit.record(
+            OBJECT, ["info", oinfo.hexsha.decode()], time.perf_counter() - start
+        )
+        return oinfo
+
+    def stream(self, binsha):
+        start = time.perf_counter()
+        ostream = self._odb.stream(binsha)
+        self._audit.record(
+            OBJECT,
+            ["stream", ostream.hexsha.decode()],
+            time.perf_counter() - start,
+            ostream.size,
+        )
+        return ostream
+
+    def __getattr__(self, name):
+        return getattr(self._odb, name)
+
+
+def _name(kind, command):
+    if kind == OBJECT:
+        return command[0]
+    args = (a for a in command[1:] if not str(a).startswith("-"))
+    return str(next(args, command[0]))
+
+
+def _redact(arg):
+    return re.sub(r"://[^/@\s]+@", f'://{"":*<10}@', arg)
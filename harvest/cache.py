@@ -0,0 +1,366 @@
+# Copyright (c) 2020 IBM Corp. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Harvest caches."""
+
+import hashlib
+import inspect
+import json
+import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+
+from harvest import compression as compress
+
+
+class BlobCache(object):
+    """
+    Least recently used cache of blob content keyed by blob SHA.
+
+    The cache can be shared by several threads.
+    """
+
+    def __init__(self, max_bytes=256 * 1024 * 1024):
+        """
+        Construct the BlobCache object.
+
+        :param int max_bytes: The total content size the cache may hold
+        """
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._blobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, sha):
+        """
+        Retrieve the content of a blob.
+
+        :param str sha: The blob SHA
+
+        :returns: The blob content or None if it is not cached
+        """
+        with self._lock:
+            content = self._blobs.get(sha)
+            if content is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._blobs.move_to_end(sha)
+            return content
+
+    def put(self, sha, content):
+        """
+        Add the content of a blob, evicting the least recently used blobs.
+
+        Content larger than the whole cache is not kept.
+
+        :param str sha: The blob SHA
+        :param bytes content: The blob content
+        """
+        with self._lock:
+            if len(content) > self.max_bytes or sha in self._blobs:
+                return
+            self._blobs[sha] = content
+            self.nbytes += len(content)
+            while self.nbytes > self.max_bytes:
+                _, evicted = self._blobs.popitem(last=False)
+                self.nbytes -= len(evicted)
+
+    def __len__(self):
+        """Provide the number of blobs cached."""
+        return len(self._blobs)
+
+
+class CloneCache(object):
+    """Cache of repository clones made by harvest, one per org/repo."""
+
+    def __init__(self, location=None):
+        """
+        Construct the CloneCache object.
+
+        :param str location: The cache directory, defaults to $TMPDIR/harvest
+        """
+        self.location = location or os.path.join(tempfile.gettempdir(), "harvest")
+
+    def entries(self):
+        """
+        Provide the cached clones.
+
+        A clone is last used when it was last cloned or fetched.
+
+        :returns: A list of entries, dictionaries with the cache, name, path,
+            bytes and last_used timestamp of each clone
+        """
+        return [
+            _entry("clone", f"{org}/{repo}", os.path.join(self.location, org, repo))
+            for org in _subdirs(self.location)
+            for repo in _subdirs(os.path.join(self.location, org))
+        ]
+
+
+class ReportCache(object):
+    """Cache of written reports keyed by report, config and repository commit."""
+
+    def __init__(self, location=None):
+        """
+        Construct the ReportCache object.
+
+        :param str location: The cache directory, defaults to
+            $TMPDIR/harvest-reports
+        """
+        self.location = location or os.path.join(
+            tempfile.gettempdir(), "harvest-reports"
+        )
+
+    def key(self, reporter, module_path, commit, **options):
+        """
+        Provide the cache key of a report run.
+
+        The key combines the report class, the source of its module, its
+        template, its config, the repository commit it reads from and any write
+        options.
+
+        :param BaseReporter reporter: The report object
+        :param str module_path: The path to the report module source
+        :param str commit: The SHA of the commit the report reads from
+        :param options: The options the report is written with
+
+        :returns: The key as a hex digest
+        """
+        template_path = reporter.template_path
+        report = type(reporter)
+        return _digest(
+            json.dumps(
+                {
+                    "report": f"{report.__module__}.{report.__qualname__}",
+                    "module": _file_digest(module_path),
+                    "template": _file_digest(template_path) if template_path else None,
+                    "config": reporter.config,
+                    "commit": commit,
+                    "options": options,
+                },
+                sort_keys=True,
+                default=str,
+            ).encode()
+        )
+
+    def entries(self):
+        """
+        Provide the cached reports.
+
+        A report is last used when it was last stored or restored.
+
+        :returns: A list of entries, dictionaries with the cache, name, path,
+            bytes and last_used timestamp of each report, named by cache key
+        """
+        return [
+            _entry("report", key, os.path.join(self.location, key))
+            for key in _subdirs(self.location)
+        ]
+
+    def restore(self, key, location="."):
+        """
+        Copy the files of a cached report to a directory.
+
+        :param str key: The cache key
+        :param str location: The directory the files are copied to
+
+        :returns: The names of the files copied or None if the key is not cached
+        """
+        entry = os.path.join(self.location, key)
+        if not os.path.isdir(entry):
+            return None
+        os.utime(entry)
+        names = sorted(os.listdir(entry))
+        for name in names:
+            shutil.copy2(os.path.join(entry, name), os.path.join(location, name))
+        return names
+
+    def store(self, key, source):
+        """
+        Cache the files of a written report, replacing any cached for the key.
+
+        :param str key: The cache key
+        :param str source: The directory holding only the written report files
+        """
+        os.makedirs(self.location, exist_ok=True)
+        entry = os.path.join(self.location, key)
+        tmp_entry = tempfile.mkdtemp(prefix=f".{key}.", dir=self.location)
+        for name in os.listdir(source):
+            shutil.copy2(os.path.join(source, name), os.path.join(tmp_entry, name))
+        if os.path.isdir(entry):
+            shutil.rmtree(entry)
+        os.replace(tmp_entry, entry)
+
+
+class CheckpointCache(object):
+    """
+    Cache of the per-day results of reports keyed by report, config and inputs.
+
+    The results of a report run with a config are kept in a directory, one JSON
+    file per day holding the blob SHAs of the day's input files along with the
+    result computed from them.
+    """
+
+    def __init__(self, location=None):
+        """
+        Construct the CheckpointCache object.
+
+        :param str location: The cache directory, defaults to
+            $TMPDIR/harvest-checkpoints
+        """
+        self.location = location or os.path.join(
+            tempfile.gettempdir(), "harvest-checkpoints"
+        )
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, reporter):
+        """
+        Provide the cache key of a report and config.
+
+        The key combines the report class, the source of its module and its
+        config.
+
+        :param BaseReporter reporter: The report object
+
+        :returns: The key as a hex digest
+        """
+        report = type(reporter)
+        return _digest(
+            json.dumps(
+                {
+                    "report": f"{report.__module__}.{report.__qualname__}",
+                    "module": _file_digest(inspect.getfile(report)),
+                    "config": reporter.config,
+                },
+                sort_keys=True,
+                default=str,
+            ).encode()
+        )
+
+    def entries(self):
+        """
+        Provide the cached report results.
+
+        Results are last used when a result was last stored or reused.
+
+        :returns: A list of entries, dictionaries with the cache, name, path,
+            bytes and last_used timestamp of the results of each report and
+            config, named by cache key
+        """
+        return [
+            _entry("checkpoint", key, os.path.join(self.location, key))
+            for key in _subdirs(self.location)
+        ]
+
+    def get(self, key, day, inputs):
+        """
+        Retrieve the result of a day computed from the same inputs.
+
+        :param str key: The cache key
+        :param datetime day: The day
+        :param dict inputs: The blob SHAs of the day's input files keyed by
+            file path, None for a file not found
+
+        :returns: The result or None if it is not cached
+        """
+        entry = os.path.join(self.location, key)
+        try:
+            with open(os.path.join(entry, f'{day.strftime("%Y-%m-%d")}.json')) as f:
+                checkpoint = json.load(f)
+        except (OSError, ValueError):
+            checkpoint = {}
+        if checkpoint.get("inputs") != inputs or checkpoint.get("result") is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        os.utime(entry)
+        return checkpoint["result"]
+
+    def put(self, key, day, inputs, result):
+        """
+        Cache the result of a day, replacing any cached for the day.
+
+        :param str key: The cache key
+        :param datetime day: The day
+        :param dict inputs: The blob SHAs of the day's input files keyed by
+            file path, None for a file not found
+        :param result: The JSON serializable result
+        """
+        entry = os.path.join(self.location, key)
+        os.makedirs(entry, exist_ok=True)
+        compress.atomic_write(
+            os.path.join(entry, f'{day.strftime("%Y-%m-%d")}.json'),
+            json.dumps({"inputs": inputs, "result": result}),
+        )
+        os.utime(entry)
+
+
+def prune(entries, max_bytes, dry_run=False):
+    """
+    Remove the least recently used cache entries until they fit a size budget.
+
+    :param list entries: The cache entries, of any caches
+    :param int max_bytes: The total size the entries may occupy
+    :param bool dry_run: Only provide the entries that would be removed
+
+    :returns: The list of entries removed, least recently used first
+    """
+    total = sum(e["bytes"] for e in entries)
+    removed = []
+    for entry in sorted(entries, key=lambda e: e["last_used"]):
+        if total <= max_bytes:
+            break
+        if not dry_run:
+            shutil.rmtree(entry["path"], ignore_errors=True)
+        total -= entry["bytes"]
+        removed.append(entry)
+    return removed
+
+
+def _subdirs(path):
+    if not os.path.isdir(path):
+        return []
+    return sorted(
+        name
+        for name in os.listdir(path)
+        if not name.startswith(".") and os.path.isdir(os.path.join(path, name))
+    )
+
+
+def _entry(cache, name, path):
+    nbytes = 0
+    for dirname, _, files in os.walk(path):
+        for filename in files:
+            nbytes += os.lstat(os.path.join(dirname, filename)).st_size
+    return {
+        "cache": cache,
+        "name": name,
+        "path": path,
+        "bytes": nbytes,
+        "last_used": os.stat(path).st_mtime,
+    }
+
+
+def _file_digest(path):
+    with open(path, "rb") as f:
+        return _digest(f.read())
+
+
+def _digest(data):
+    return hashlib.sha256(data).hexdigest()
@@ -15,14 +15,31 @@
 
 import json
 import os
+import tempfile
+import threading
+import time
 from argparse import SUPPRESS
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from urllib.parse import urlparse
 
 from compliance.utils.credentials import Config
 
 from harvest import __version__ as version
-from harvest.collator import Collator
+from harvest import compression as compress
+from harvest import jsonpath
+from harvest.cache import CheckpointCache, CloneCache, ReportCache, prune
+from harvest.collator import GRANULARITIES, ODB_BACKENDS, Collator
+from harvest.output import (
+    ArchiveOutput,
+    DeltaOutput,
+    DirectoryOutput,
+    JsonLinesOutput,
+    NamespacedOutput,
+)
+from harvest.metrics import RunMetrics
+from harvest.progress import broadcast, renderer, tracker
+from harvest.server import HarvestServer
 from harvest.utils import (
     get_report_classes,
     get_report_details,
@@ -30,11 +47,15 @@ from harvest.utils import (
     get_report_modules,
     get_report_summary,
 )
+from harvest.writers import get_writer
 
 from ilcli import Command
 
 
 class _CoreHarvestCommand(Command):
+    metrics = None
+    progress = None
+
     def _init_arguments(self):
         self.add_argument(
             "repo",
@@ -52,6 +73,16 @@ class _CoreHarvestCommand(Command):
             ),
             default="master",
         )
+        self.add_argument(
+            "--rev",
+            help=(
+                "the commit SHA, tag or other revision that every file version "
+                "is read as of - defaults to the head of the branch, resolved "
+                "once when the run starts"
+            ),
+            metavar="REVISION",
+            default=None,
+        )
         self.add_argument(
             "--repo-path",
             help=(
@@ -67,6 +98,54 @@ class _CoreHarvestCommand(Command):
             help="the path to credentials file - defaults to %(default)s",
             default="~/.credentials",
         )
+        self.add_argument(
+            "--audit-log",
+            help=(
+                "the path to a file that every git command and object read "
+                "is logged to as JSON lines, with its duration and size"
+            ),
+            metavar="~/path/audit.jsonl",
+            default=None,
+        )
+        self.add_argument(
+            "--odb",
+            help=(
+                "the git object database backend - git uses git subprocesses "
+                "and gitdb reads objects in process - defaults to %(default)s"
+            ),
+            choices=sorted(ODB_BACKENDS),
+            default="git",
+        )
+        self.add_argument(
+            "--maintenance-budget",
+            help=(
+                "the number of seconds that may be spent keeping the cached "
+                "clone's commit-graph and packs up to date after a clone or "
+                "fetch - 0 disables maintenance - defaults to %(default)s"
+            ),
+            metavar="SECONDS",
+            type=int,
+            default=30,
+        )
+        self.add_argument(
+            "--progress",
+            help=(
+                "report progress on stderr, as a progress bar with an ETA on a "
+                "terminal and as JSON lines otherwise"
+            ),
+            action="store_true",
+            default=False,
+        )
+        self.add_argument(
+            "--metrics-file",
+            help=(
+                "the path to a file that run statistics are written to in the "
+                "OpenMetrics text format when the run completes, like a node "
+                "exporter textfile collector directory"
+            ),
+            metavar="~/path/harvest.prom",
+            default=None,
+        )
         self.add_argument(
             "--no-validate", action="store_false", help=SUPPRESS, default=True
         )
@@ -82,6 +161,19 @@ class _CoreHarvestCommand(Command):
         if not (parsed.scheme and parsed.hostname and parsed.path):
             return "ERROR: repo url must be of the form https://hostname/org/repo"
 
+    def _start_run(self, args):
+        self.metrics = RunMetrics(self.name) if args.metrics_file else None
+        self.progress = broadcast(renderer() if args.progress else None, self.metrics)
+
+    def _finish_run(self, args):
+        if self.metrics:
+            self.metrics.write(args.metrics_file)
+
+    def _error(self, message):
+        if self.metrics:
+            self.metrics.add("harvest_run_errors", 1)
+        self.err(message)
+
 
 class Collate(_CoreHarvestCommand):
     """Retrieve historical versions of a file from a git repository."""
@@ -90,6 +182,16 @@ class Collate(_CoreHarvestCommand):
 
     def _init_arguments(self):
         super()._init_arguments()
+        self.add_argument(
+            "--jobs",
+            help=(
+                "the number of repositories collated at the same time when "
+                "several comma separated repository URLs are provided - "
+                "defaults to %(default)s"
+            ),
+            type=int,
+            default=4,
+        )
         self.add_argument(
             "filepath",
             help=(
@@ -116,49 +218,202 @@ class Collate(_CoreHarvestCommand):
             metavar="YYYY-MM-DD or YYYYMMDD",
             default=False,
         )
+        self.add_argument(
+            "--granularity",
+            help=(
+                "retrieve the version of the file as of every day, every "
+                "seventh day or the last day of every month counting back from "
+                "the end date, or as of each date in a comma separated list - "
+                "defaults to %(default)s"
+            ),
+            metavar="daily|weekly|monthly|YYYY-MM-DD,...",
+            default="daily",
+        )
+        self.add_argument(
+            "--select",
+            help=(
+                "write only the content found at this JSON path of each "
+                "version, like $.accounts.foo - null when it is not found"
+            ),
+            metavar="JSON-PATH",
+            default=None,
+        )
         self.add_argument(
             "--include-file-path",
             help="Should the file path be included in the saved file names",
             action="store_true",
             dest="include_file_path",
         )
+        self.add_argument(
+            "--archive",
+            help=(
+                "write all file versions to a single tar (.tar, .tar.gz, .tgz, "
+                ".tar.bz2, .tar.xz) or zip archive instead of the current "
+                "directory - use - to stream a tar archive to stdout"
+            ),
+            metavar="~/path/versions.tar.gz",
+            default=None,
+        )
+        self.add_argument(
+            "--jsonl",
+            help=(
+                "write all file versions to a single JSON Lines file, one "
+                "record per version with its date, commit, path and content - "
+                "use - to stream the records to stdout"
+            ),
+            metavar="~/path/versions.jsonl",
+            default=None,
+        )
+        self.add_argument(
+            "--delta",
+            help=(
+                "write all file versions to a single JSON Lines file holding "
+                "the first version of each file in full and every later JSON "
+                "version as a JSON Patch from the previous one - use - to "
+                "stream the records to stdout"
+            ),
+            metavar="~/path/versions.delta.jsonl",
+            default=None,
+        )
+        self.add_argument(
+            "--compress",
+            help=(
+                "compress file versions written to the current directory with "
+                "gzip, xz or zstd (requires zstandard) - JSON Lines outputs are "
+                "compressed when their path ends in .gz, .xz or .zst"
+            ),
+            choices=sorted(compress.EXTENSIONS),
+            default=None,
+        )
+        self.add_argument(
+            "--resume",
+            help=(
+                "skip file versions already written to the current directory "
+                "by a previous collate, tracked in a manifest file"
+            ),
+            action="store_true",
+            default=False,
+        )
 
     def _validate_arguments(self, args):
+        if args.granularity not in GRANULARITIES:
+            try:
+                args.granularity = [
+                    _parse_date(d) for d in args.granularity.split(",") if d
+                ]
+            except ValueError:
+                return (
+                    "ERROR: granularity must be daily, weekly, monthly or a "
+                    "comma separated list of dates"
+                )
+            if not args.granularity:
+                return "ERROR: granularity must include at least one date"
+            if not args.end:
+                args.end = max(args.granularity).strftime("%Y-%m-%d")
+            if not args.start:
+                args.start = min(args.granularity).strftime("%Y-%m-%d")
         if not args.end:
             args.end = datetime.today().strftime("%Y-%m-%d")
         if not args.start:
             args.start = args.end
-        if "-" in args.start:
-            args.start = datetime.strptime(args.start, "%Y-%m-%d")
-        else:
-            args.start = datetime.strptime(args.start, "%Y%m%d")
-        if "-" in args.end:
-            args.end = datetime.strptime(args.end, "%Y-%m-%d")
-        else:
-            args.end = datetime.strptime(args.end, "%Y%m%d")
+        args.start = _parse_date(args.start)
+        args.end = _parse_date(args.end)
         if args.start > datetime.today():
             return "ERROR: start date cannot be in the future"
         if args.start > args.end:
             return "ERROR: start date cannot be after end date"
         if args.end > datetime.today():
             return "ERROR: end date cannot be in the future"
+        if len([o for o in (args.archive, args.jsonl, args.delta) if o]) > 1:
+            return "ERROR: only one of --archive, --jsonl and --delta can be provided"
+        if args.resume and (args.archive or args.jsonl or args.delta):
+            return "ERROR: --resume can only be used when writing to a directory"
+        if args.archive and not ArchiveOutput.supported(args.archive):
+            return f"ERROR: {args.archive} is not a supported archive type"
+        if args.compress and (args.archive or args.jsonl or args.delta):
+            return "ERROR: --compress can only be used when writing to a directory"
+        if args.compress and not compress.available(args.compress):
+            return f"ERROR: {args.compress} compression is not available"
+        if args.select:
+            try:
+                jsonpath.parse(args.select)
+            except ValueError as e:
+                return f"ERROR: {str(e)}"
+        if args.jobs < 1:
+            return "ERROR: --jobs must be at least 1"
+        args.repos = [r.strip() for r in args.repo.split(",") if r.strip()]
+        if len(args.repos) > 1:
+            if "local" in args.repos or args.repo_path:
+                return "ERROR: local repos cannot be collated with other repos"
+            for repo in args.repos:
+                args.repo = repo
+                error = super()._validate_arguments(args)
+                if error:
+                    return error
+            return
         return super()._validate_arguments(args)
 
     def _run(self, args):
+        self._start_run(args)
+        output = DirectoryOutput(resume=args.resume, compression=args.compress)
+        if args.archive:
+            output = ArchiveOutput(args.archive)
+        elif args.jsonl:
+            output = JsonLinesOutput(args.jsonl)
+        elif args.delta:
+            output = DeltaOutput(args.delta)
+        try:
+            if len(args.repos) == 1:
+                self._collate(args, args.repo, output)
+                return
+            lock = threading.Lock()
+            with ThreadPoolExecutor(max_workers=args.jobs) as executor:
+                futures = {
+                    repo: executor.submit(
+                        self._collate,
+                        args,
+                        repo,
+                        NamespacedOutput(output, _namespace(repo), lock),
+                        f"{repo}: ",
+                    )
+                    for repo in args.repos
+                }
+            for repo, future in futures.items():
+                if future.exception():
+                    self._error(f"ERROR: {repo}: {str(future.exception())}")
+        finally:
+            output.close()
+            if self.metrics:
+                self.metrics.collect_output(output)
+            self._finish_run(args)
+
+    def _collate(self, args, repo, output, prefix=""):
         collator = Collator(
-            args.repo,
+            repo,
             Config(args.creds) if args.creds else None,
             args.branch,
             args.repo_path,
             args.no_validate,
             include_file_path=args.include_file_path,
+            audit_log=args.audit_log,
+            odb=args.odb,
+            maintenance_budget=args.maintenance_budget,
+            output=output,
+            granularity=args.granularity,
+            select=args.select,
+            rev=args.rev,
+            progress=self.progress,
         )
-
-        for file in args.filepath:
-            try:
-                collator.write(file, collator.read(file, args.start, args.end))
-            except ValueError as e:
-                self.err(f"ERROR: {str(e)}")
+        try:
+            for file in args.filepath:
+                try:
+                    collator.write(file, collator.read(file, args.start, args.end))
+                except ValueError as e:
+                    self._error(f"ERROR: {prefix}{str(e)}")
+        finally:
+            collator.audit.close()
+            if self.metrics:
+                self.metrics.collect(collator)
 
 
 class Report(_CoreHarvestCommand):
@@ -185,6 +440,66 @@ class Report(_CoreHarvestCommand):
             metavar='\'{"key1":"value1","key2":"value2",...}\'',
             default={},
         )
+        self.add_argument(
+            "--format",
+            help=(
+                "write the report in this format instead of the one implied by "
+                "its filename extension - csv, jsonl, parquet (requires "
+                "pyarrow) or any other extension for text"
+            ),
+            metavar="FORMAT",
+            default=None,
+        )
+        self.add_argument(
+            "--cache",
+            help=(
+                "reuse the report written by an identical run, one with the "
+                "same report source, template, config, options and repository "
+                "commit, and cache the report otherwise"
+            ),
+            action="store_true",
+            default=False,
+        )
+        self.add_argument(
+            "--refresh-cache",
+            help="generate the report even when cached and replace the cache",
+            action="store_true",
+            default=False,
+        )
+        self.add_argument(
+            "--cache-dir",
+            help="the report cache directory - defaults to $TMPDIR/harvest-reports",
+            metavar="~/path/report-cache",
+            default=None,
+        )
+        self.add_argument(
+            "--checkpoints",
+            help=(
+                "reuse the per-day results that the report computed from the "
+                "same files in earlier runs with the same config, and "
+                "checkpoint the results of new or changed days"
+            ),
+            action="store_true",
+            default=False,
+        )
+        self.add_argument(
+            "--checkpoint-dir",
+            help=(
+                "the report checkpoint directory - defaults to "
+                "$TMPDIR/harvest-checkpoints"
+            ),
+            metavar="~/path/report-checkpoints",
+            default=None,
+        )
+        self.add_argument(
+            "--compress",
+            help=(
+                "compress the report as it is written with gzip, xz or zstd "
+                "(requires zstandard)"
+            ),
+            choices=sorted(compress.EXTENSIONS),
+            default=None,
+        )
 
     def _validate_arguments(self, args):
         try:
@@ -196,11 +511,18 @@ class Report(_CoreHarvestCommand):
             return f"ERROR: {args.name} is not found or is not a valid report"
         if len(rpts) > 1:
             return f"ERROR: {args.name} is ambiguous"
+        if args.compress and not compress.available(args.compress):
+            return f"ERROR: {args.compress} compression is not available"
+        if args.format and not get_writer(args.format).available():
+            return f"ERROR: {args.format} writer dependencies are not installed"
         self.report = rpts[0]
+        self.rpt_module = rpt_module
         self.template_dir = args.template_dir or os.path.dirname(rpt_module.__file__)
         return super()._validate_arguments(args)
 
     def _run(self, args):
+        self._start_run(args)
+        started_at = time.monotonic()
         reporter = self.report(
             args.repo,
             Config(args.creds) if args.creds else None,
@@ -210,10 +532,75 @@ class Report(_CoreHarvestCommand):
             args.no_validate,
             **args.config,
         )
+        reporter.progress = self.progress
+        if args.checkpoints:
+            reporter.checkpoints = CheckpointCache(args.checkpoint_dir)
+        reporter.collator = Collator(
+            args.repo,
+            Config(args.creds) if args.creds else None,
+            args.branch,
+            args.repo_path,
+            args.no_validate,
+            audit_log=args.audit_log,
+            odb=args.odb,
+            maintenance_budget=args.maintenance_budget,
+            rev=args.rev,
+            progress=self.progress,
+        )
         try:
-            reporter.write(reporter.generate_report())
+            write_kwargs = {}
+            if args.compress:
+                write_kwargs["compression"] = args.compress
+            if args.format:
+                write_kwargs["output_format"] = args.format
+            if args.cache or args.refresh_cache:
+                self._cached_write(args, reporter, write_kwargs)
+            else:
+                reporter.write(self._generate(args, reporter), **write_kwargs)
         except (ValueError, RuntimeError) as e:
-            self.err(f"ERROR: {str(e)}")
+            self._error(f"ERROR: {str(e)}")
+        finally:
+            reporter.collator.audit.close()
+            if self.metrics:
+                self.metrics.collect(reporter.collator)
+                if reporter.checkpoints:
+                    self.metrics.cache(
+                        "checkpoint",
+                        reporter.checkpoints.hits,
+                        reporter.checkpoints.misses,
+                    )
+                self.metrics.set(
+                    "harvest_report_duration_seconds",
+                    time.monotonic() - started_at,
+                    report=args.name,
+                )
+            self._finish_run(args)
+
+    def _cached_write(self, args, reporter, write_kwargs):
+        cache = ReportCache(args.cache_dir)
+        key = cache.key(
+            reporter,
+            self.rpt_module.__file__,
+            reporter.collator.revision(),
+            **write_kwargs,
+        )
+        if not args.refresh_cache:
+            hit = cache.restore(key) is not None
+            if self.metrics:
+                self.metrics.cache("report", int(hit), int(not hit))
+            if hit:
+                return
+        with tempfile.TemporaryDirectory() as tmpdir:
+            reporter.write(self._generate(args, reporter), tmpdir, **write_kwargs)
+            cache.store(key, tmpdir)
+        cache.restore(key)
+
+    def _generate(self, args, reporter):
+        reporter.prefetch()
+        progress = tracker(self.progress, "generate", item=args.name)
+        content = reporter.generate_report()
+        progress.finish()
+        return content
 
 
 class Reports(Command):
@@ -259,10 +646,248 @@ class Reports(Command):
                 self.err(f"ERROR: {args.detail} is not found in {args.package}")
 
 
+class Serve(Command):
+    """Serve collate, file content and report requests from warm repositories."""
+
+    name = "serve"
+
+    def _init_arguments(self):
+        self.add_argument(
+            "--host",
+            help="the address to listen on - defaults to %(default)s",
+            default="127.0.0.1",
+        )
+        self.add_argument(
+            "--port",
+            help="the port to listen on - defaults to %(default)s",
+            type=int,
+            default=8080,
+        )
+        self.add_argument(
+            "--socket",
+            help="listen on a Unix socket at this path instead of on a port",
+            metavar="~/path/harvest.sock",
+            default=None,
+        )
+        self.add_argument(
+            "--creds",
+            metavar="~/path/creds",
+            help="the path to credentials file - defaults to %(default)s",
+            default="~/.credentials",
+        )
+        self.add_argument(
+            "--refresh",
+            help=(
+                "the number of seconds a repository is served before it is "
+                "fetched again - defaults to %(default)s"
+            ),
+            metavar="SECONDS",
+            type=int,
+            default=300,
+        )
+        self.add_argument(
+            "--blob-cache-size",
+            help=(
+                "the number of megabytes of file content kept in memory - "
+                "defaults to %(default)s"
+            ),
+            metavar="MB",
+            type=int,
+            default=256,
+        )
+        self.add_argument(
+            "--odb",
+            help=(
+                "the git object database backend - git uses git subprocesses "
+                "and gitdb reads objects in process - defaults to %(default)s"
+            ),
+            choices=sorted(ODB_BACKENDS),
+            default="git",
+        )
+        self.add_argument(
+            "--maintenance-budget",
+            help=(
+                "the number of seconds that may be spent keeping the cached "
+                "clone's commit-graph and packs up to date after a clone or "
+                "fetch - 0 disables maintenance - defaults to %(default)s"
+            ),
+            metavar="SECONDS",
+            type=int,
+            default=30,
+        )
+        self.add_argument(
+            "--allow-repo",
+            help="serve this repository URL - may be provided several times",
+            metavar="URL",
+            action="append",
+            default=[],
+        )
+        self.add_argument(
+            "--allow-repo-path",
+            help="serve this local repository - may be provided several times",
+            metavar="~/path/repo",
+            action="append",
+            default=[],
+        )
+        self.add_argument(
+            "--allow-package",
+            help=(
+                "generate the reports of this package - may be provided "
+                "several times"
+            ),
+            metavar="PACKAGE",
+            action="append",
+            default=[],
+        )
+
+    def _validate_arguments(self, args):
+        if not args.allow_repo and not args.allow_repo_path:
+            return "ERROR: provide the repositories served with --allow-repo"
+
+    def _run(self, args):
+        harvest = HarvestServer(
+            Config(args.creds) if args.creds else None,
+            refresh=args.refresh,
+            blob_cache_size=args.blob_cache_size * 1024 * 1024,
+            odb=args.odb,
+            maintenance_budget=args.maintenance_budget,
+            allowed_repos=args.allow_repo,
+            allowed_paths=args.allow_repo_path,
+            allowed_packages=args.allow_package,
+        )
+        server = harvest.http_server(args.host, args.port, args.socket)
+        self.out(f"Serving on {args.socket or f'http://{args.host}:{args.port}'}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+
+
+class _CacheCommand(Command):
+    def _init_arguments(self):
+        self.add_argument(
+            "--cache-dir",
+            help="the report cache directory - defaults to $TMPDIR/harvest-reports",
+            metavar="~/path/report-cache",
+            default=None,
+        )
+        self.add_argument(
+            "--checkpoint-dir",
+            help=(
+                "the report checkpoint directory - defaults to "
+                "$TMPDIR/harvest-checkpoints"
+            ),
+            metavar="~/path/report-checkpoints",
+            default=None,
+        )
+
+    def _entries(self, args):
+        return (
+            CloneCache().entries()
+            + ReportCache(args.cache_dir).entries()
+            + CheckpointCache(args.checkpoint_dir).entries()
+        )
+
+
+class CacheList(_CacheCommand):
+    """List cached clones, reports and report checkpoints, most recent first."""
+
+    name = "list"
+
+    def _run(self, args):
+        entries = sorted(self._entries(args), key=lambda e: -e["last_used"])
+        for entry in entries:
+            self.out(_describe(entry))
+        total = sum(e["bytes"] for e in entries)
+        self.out(f"{len(entries)} entries, {_megabytes(total)}")
+
+
+class CachePrune(_CacheCommand):
+    """Remove the least recently used cached clones, reports and checkpoints."""
+
+    name = "prune"
+
+    def _init_arguments(self):
+        super()._init_arguments()
+        self.add_argument(
+            "--max-size",
+            help=(
+                "the number of megabytes that cached clones, reports and report "
+                "checkpoints may occupy together"
+            ),
+            metavar="MB",
+            type=int,
+            required=True,
+        )
+        self.add_argument(
+            "--dry-run",
+            help="only list the entries that would be removed",
+            action="store_true",
+            default=False,
+        )
+
+    def _validate_arguments(self, args):
+        if args.max_size < 0:
+            return "ERROR: --max-size cannot be negative"
+
+    def _run(self, args):
+        removed = prune(self._entries(args), args.max_size * 1024 * 1024, args.dry_run)
+        for entry in removed:
+            self.out(
+                f'{"Would remove" if args.dry_run else "Removed"} {_describe(entry)}'
+            )
+        freed = sum(e["bytes"] for e in removed)
+        self.out(f"{len(removed)} entries, {_megabytes(freed)} freed")
+
+
+class CacheWarm(_CoreHarvestCommand):
+    """Clone or fetch a repository into the cache and build its indexes."""
+
+    name = "warm"
+    ignore_arguments = ["--repo-path"]
+
+    def _validate_arguments(self, args):
+        if args.repo == "local":
+            return "ERROR: only repositories cloned by harvest can be warmed"
+        return super()._validate_arguments(args)
+
+    def _run(self, args):
+        self._start_run(args)
+        collator = Collator(
+            args.repo,
+            Config(args.creds) if args.creds else None,
+            args.branch,
+            validate=args.no_validate,
+            audit_log=args.audit_log,
+            odb=args.odb,
+            maintenance_budget=args.maintenance_budget,
+            rev=args.rev,
+            progress=self.progress,
+        )
+        try:
+            self.out(f"{collator.local_path} is at {collator.revision()}")
+        except ValueError as e:
+            self._error(f"ERROR: {str(e)}")
+        finally:
+            collator.audit.close()
+            if self.metrics:
+                self.metrics.collect(collator)
+            self._finish_run(args)
+
+
+class Cache(Command):
+    """List, prune and warm the clone and report caches."""
+
+    name = "cache"
+    subcommands = [CacheList, CachePrune, CacheWarm]
+
+
 class Harvest(Command):
     """The harvest CLI base command."""
 
-    subcommands = [Collate, Report, Reports]
+    subcommands = [Collate, Report, Reports, Serve, Cache]
 
     def _init_arguments(self):
         self.add_argument(
@@ -273,6 +898,26 @@ class Harvest(Command):
         )
 
 
+def _parse_date(value):
+    return datetime.strptime(value, "%Y-%m-%d" if "-" in value else "%Y%m%d")
+
+
+def _describe(entry):
+    last_used = datetime.fromtimestamp(entry["last_used"]).strftime("%Y-%m-%d %H:%M")
+    return (
+        f'{entry["cache"]:<6} {entry["name"]}  {_megabytes(entry["bytes"])}  '
+        f"last used {last_used}"
+    )
+
+
+def _megabytes(nbytes):
+    return f"{nbytes / 1024 / 1024:.1f}MB"
+
+
+def _namespace(repo_url):
+    return urlparse(repo_url).path.strip("/")
+
+
 def run():
     """Execute the harvest CLI."""
     harvest = Harvest()
@@ -0,0 +1,128 @@
+# Copyright (c) 2020 IBM Corp. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Harvest client for a running harvest server."""
+
+import json
+import socket
+from http import HTTPStatus
+from http.client import HTTPConnection
+from urllib.parse import urlencode, urlparse
+
+
+class HarvestClient(object):
+    """Send collate, file content and report requests to a harvest server."""
+
+    def __init__(
+        self,
+        url="http://127.0.0.1:8080",
+        socket_path=None,
+        repo="local",
+        branch="master",
+        repo_path=None,
+        timeout=300,
+    ):
+        """
+        Construct the HarvestClient object.
+
+        :param str url: The URL of a server listening on HTTP
+        :param str socket_path: The path of a server listening on a Unix socket
+        :param str repo: The repository URL or "local" with a repo_path
+        :param str branch: The repository branch
+        :param str repo_path: The location of a local git repository
+        :param int timeout: The number of seconds to wait for a response
+        """
+        self.url = urlparse(url)
+        self.socket_path = socket_path
+        self.repo = {"repo": repo, "branch": branch}
+        if repo_path:
+            self.repo["repo_path"] = repo_path
+        self.timeout = timeout
+
+    def get_file_content(self, filepath, file_dt=None):
+        """
+        Retrieve file content for a given file and date.
+
+        :param str filepath: The relative path to the file within the repo
+        :param datetime file_dt: The date of the file version
+
+        :returns: The file content or None if the file is not found
+        """
+        params = {"filepath": filepath}
+        if file_dt:
+            params["date"] = file_dt.strftime("%Y-%m-%d")
+        status, _, body = self._get("content", params, missing_ok=True)
+        return None if status == HTTPStatus.NOT_FOUND else body
+
+    def collate(self, filepath, start=None, end=None):
+        """
+        Retrieve the versions of a file within a date range.
+
+        :param str filepath: The relative path to the file within the repo
+        :param datetime start: The retrieval start date
+        :param datetime end: The retrieval end date
+
+        :returns: A list of records with the date, commit, path and content
+        """
+        params = {"filepath": filepath}
+        if start:
+            params["start"] = start.strftime("%Y-%m-%d")
+        if end:
+            params["end"] = end.strftime("%Y-%m-%d")
+        _, _, body = self._get("collate", params)
+        return [json.loads(line) for line in body.decode().splitlines()]
+
+    def report(self, package, name, config=None):
+        """
+        Generate a report.
+
+        :param str package: The name of the package that contains the report
+        :param str name: The name of the report to execute
+        :param dict config: The key/value pairs needed to execute the report
+
+        :returns: A tuple of the report filename and its content
+        """
+        params = {"package": package, "name": name}
+        if config:
+            params["config"] = json.dumps(config)
+        _, headers, body = self._get("report", params)
+        filename = headers["Content-Disposition"].split('filename="', 1)[1][:-1]
+        return filename, body
+
+    def _get(self, endpoint, params, missing_ok=False):
+        if self.socket_path:
+            conn = _UnixHTTPConnection(self.socket_path, self.timeout)
+        else:
+            conn = HTTPConnection(self.url.hostname, self.url.port, self.timeout)
+        try:
+            conn.request("GET", f"/{endpoint}?{urlencode({**self.repo, **params})}")
+            response = conn.getresponse()
+            body = response.read()
+        finally:
+            conn.close()
+        if response.status == HTTPStatus.NOT_FOUND and missing_ok:
+            return response.status, response.headers, body
+        if response.status != HTTPStatus.OK:
+            raise RuntimeError(body.decode())
+        return response.status, response.headers, body
+
+
+class _UnixHTTPConnection(HTTPConnection):
+    def __init__(self, socket_path, timeout):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
@@ -12,20 +12,100 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 """Harvest file collator."""
+import binascii
 import os
+import re
 import shutil
 import tempfile
+import threading
+import time
 from datetime import datetime, timedelta
 from pathlib import PurePath
 from urllib.parse import urlparse
 
 import git
+from git.db import GitCmdObjectDB, GitDB
 
+from harvest import jsonpath
+from harvest.audit import COMMAND, GitAudit, audit_repo
 from harvest.exceptions import FileMissingError
+from harvest.output import DirectoryOutput, FileVersion
+from harvest.progress import tracker
+
+ODB_BACKENDS = {"git": GitCmdObjectDB, "gitdb": GitDB}
+
+# The histories of at most this many files are walked by one git log, keeping
+# the command line within the limits of the platform.
+MAX_LOG_PATHS = 500
+
+LOG_HEADER = re.compile(r"[0-9a-f]{40,64} \d+")
+
+DAILY = "daily"
+WEEKLY = "weekly"
+MONTHLY = "monthly"
+GRANULARITIES = (DAILY, WEEKLY, MONTHLY)
+
+# Bloom filters are computed for at most this many new commits per run so that
+# the first maintenance of a large repository is spread across several runs.
+MAX_NEW_FILTERS = 10000
+
+MAINTENANCE_CONFIG = (
+    ("core.commitGraph", "true"),
+    ("commitGraph.readChangedPaths", "true"),
+)
+
+MAINTENANCE_TASKS = (
+    (
+        "commit_graph",
+        (
+            "write",
+            "--reachable",
+            "--split",
+            "--changed-paths",
+            f"--max-new-filters={MAX_NEW_FILTERS}",
+        ),
+    ),
+    ("repack", ("-d", "--geometric=2")),
+)
+
+
+def sample_dates(from_dt, until_dt, granularity=DAILY):
+    """
+    Provide the dates that file versions are sampled at within a date range.
+
+    :param datetime from_dt: The range start date
+    :param datetime until_dt: The range end date
+    :param granularity: "daily", "weekly", "monthly" or a list of datetimes
+
+    :returns: A list of dates at midnight, latest first
+    """
+    from_dt = datetime(from_dt.year, from_dt.month, from_dt.day)
+    until_dt = datetime(until_dt.year, until_dt.month, until_dt.day)
+    if granularity not in GRANULARITIES:
+        days = {datetime(d.year, d.month, d.day) for d in granularity}
+        return sorted((d for d in days if from_dt <= d <= until_dt), reverse=True)
+    samples = []
+    current = until_dt
+    while current >= from_dt:
+        samples.append(current)
+        if granularity == DAILY:
+            current -= timedelta(days=1)
+        elif granularity == WEEKLY:
+            current -= timedelta(days=7)
+        else:
+            current = datetime(current.year, current.month, 1) - timedelta(days=1)
+    return samples
 
 
 class Collator(object):
-    """Harvest collator to retrieve Git repository content."""
+    """
+    Harvest collator to retrieve Git repository content.
+
+    A collator can be shared by several threads.  The repository is checked out
+    and the snapshot resolved once, under a lock, and every thread reads
+    through its own repository handle, while the audit and blob cache are
+    shared.
+    """
 
     def __init__(
         self,
@@ -35,6 +115,15 @@ class Collator(object):
         repo_path=None,
         validate=True,
         include_file_path=False,
+        audit_log=None,
+        odb="git",
+        maintenance_budget=30,
+        output=None,
+        blob_cache=None,
+        granularity=DAILY,
+        select=None,
+        rev=None,
+        progress=None,
     ):
         """Construct the Collator object."""
         parsed = urlparse(repo_url)
@@ -44,9 +133,52 @@ class Collator(object):
         self.creds = creds
         self.branch = branch
         self.repo_path = repo_path
+        self._lock = threading.RLock()
+        self._local = threading.local()
         self.git_repo = None
         self.validate = validate
         self.include_file_path = include_file_path
+        self.audit = GitAudit(audit_log)
+        if odb not in ODB_BACKENDS:
+            raise ValueError(f"{odb} is not a valid object database backend")
+        self.odbt = ODB_BACKENDS[odb]
+        self.maintenance_budget = maintenance_budget
+        self.maintenance = None
+        self.output = output or DirectoryOutput()
+        self.blob_cache = blob_cache
+        self.granularity = granularity
+        if select:
+            jsonpath.parse(select)
+        self.select = select
+        self.rev = rev
+        self.snapshot = None
+        self.progress = progress
+
+    @property
+    def git_repo(self):
+        """
+        Provide the repository handle of the calling thread.
+
+        GitPython repositories, and the persistent git processes they hold,
+        cannot be used by several threads at once.  The thread that sets the
+        repository uses it and any other thread opens its own handle on the
+        same repository on first use, kept until the thread ends or the
+        repository is set again.
+        """
+        repo = self._git_repo
+        if repo is None or self._owner == threading.get_ident():
+            return repo
+        if getattr(self._local, "primary", None) is not repo:
+            self._local.handle = audit_repo(
+                git.Repo(repo.git_dir, odbt=self.odbt), self.audit
+            )
+            self._local.primary = repo
+        return self._local.handle
+
+    @git_repo.setter
+    def git_repo(self, repo):
+        self._git_repo = repo
+        self._owner = threading.get_ident()
 
     @property
     def local_path(self):
@@ -56,78 +188,228 @@ class Collator(object):
         tmpdir = PurePath(tempfile.gettempdir())
         return str(tmpdir.joinpath("harvest", self.org, self.repo))
 
-    def read(self, filepath, from_dt, until_dt):
+    def read(self, filepath, from_dt, until_dt, granularity=None):
         """
         Retrieve commits from the repository based on a date range.
 
-        On each iteration through the while loop iter_commits will return an
-        iterator with a single entry.  That single entry will be the latest
-        commit for the current_date which will be decremented accordingly until
-        the looping condition is satisfied.
+        The file's history is walked once, newest first, from the snapshot
+        commit provided by revision(), and the version as of each sample point
+        in the date range is kept.  Sample points are every day, every seventh
+        day or the last day of every month counting back from the end date, or
+        an explicit list of dates.  Versions shared by several sample points
+        are only returned once.  Progress is reported per sample point.
 
         :param str filepath: The relative path to the file within the repo
         :param datetime from_dt: The retrieval start date
         :param datetime until_dt: The retrieval end date
+        :param granularity: "daily", "weekly", "monthly" or a list of datetimes,
+            defaults to the collator's granularity
 
-        :returns: A list of Commit objects
+        :returns: A list of Commit objects, newest first
         """
-        self.checkout()
-        commits = []
-        current_date = until_dt + timedelta(days=1)
-        while current_date > from_dt:
-            try:
-                commit = next(
-                    self.git_repo.iter_commits(
-                        paths=filepath, until=current_date, max_count=1
+        snapshot = self.revision()
+        samples = sample_dates(from_dt, until_dt, granularity or self.granularity)
+        history = iter(())
+        if samples:
+            history = self.git_repo.iter_commits(
+                snapshot, paths=filepath, until=samples[0] + timedelta(days=1)
+            )
+        return self._sample(filepath, from_dt, until_dt, samples, history)
+
+    def read_files(self, filepaths, from_dt, until_dt, granularity=None):
+        """
+        Retrieve commits of several files from the repository by date range.
+
+        Versions are sampled as by read, from a single ``git log`` walking the
+        history of every file at once.  The commits returned hold their commit
+        date, any other attribute is read from the object database on first
+        access.
+
+        :param list filepaths: The relative paths to the files within the repo
+        :param datetime from_dt: The retrieval start date
+        :param datetime until_dt: The retrieval end date
+        :param granularity: "daily", "weekly", "monthly" or a list of datetimes,
+            defaults to the collator's granularity
+
+        :returns: A dictionary of lists of Commit objects, newest first, by file
+            path.  Files not found within the date range have empty lists.
+        """
+        snapshot = self.revision()
+        samples = sample_dates(from_dt, until_dt, granularity or self.granularity)
+        repo = self.git_repo
+        histories = {filepath: [] for filepath in filepaths}
+        paths = list(histories)
+        for start in range(0, len(paths) if samples else 0, MAX_LOG_PATHS):
+            output = repo.git.log(
+                "-z",
+                "--name-only",
+                "--cc",
+                "--no-renames",
+                "--format=%H %ct",
+                f"--until={samples[0] + timedelta(days=1)}",
+                snapshot,
+                "--",
+                *paths[start : start + MAX_LOG_PATHS],
+            )
+            commit = None
+            for field in output.split("\0"):
+                field = field.lstrip("\n")
+                if LOG_HEADER.fullmatch(field):
+                    sha, ts = field.split()
+                    commit = git.Commit(
+                        repo, binascii.unhexlify(sha), committed_date=int(ts)
                     )
+                elif field in histories:
+                    histories[field].append(commit)
+        commits = {}
+        for filepath, history in histories.items():
+            try:
+                commits[filepath] = self._sample(
+                    filepath, from_dt, until_dt, samples, iter(history)
                 )
-                commits.append(commit)
-                current_date = datetime.strptime(
-                    self._ts_to_str(commit.committed_date), "%Y%m%d"
-                )
-            except StopIteration:
-                break
-        if not commits:
-            until = until_dt.strftime("%Y-%m-%d")
-            since = from_dt.strftime("%Y-%m-%d")
-            raise FileMissingError(f"{filepath} not found between {since} and {until}")
+            except FileMissingError:
+                commits[filepath] = []
         return commits
 
     def write(self, filepath: str, commits):
         """
         Create file artifacts.
 
+        Versions are written in chronological order.  When a JSON path is
+        selected only the content found at that path is written.
+
         :param str filepath: The relative path to the file within the repo
         :param list commits: A list of commits for a given file and date range
         """
-        file_path_include = ""
-        if self.include_file_path:
-            file_path_include = "_".join(filepath.rsplit("/")[:-1]) + "_"
-
-        for commit in commits:
-            file_name = (
-                f"./{self._ts_to_str(commit.committed_date)}_"
-                f"{file_path_include}"
-                f'{filepath.rsplit("/", 1).pop()}'
+        progress = self._tracker("write", len(commits), item=filepath)
+        for commit in sorted(commits, key=lambda c: c.committed_date):
+            version = FileVersion(
+                self._file_name(filepath, commit),
+                filepath,
+                commit,
+                select=self.select,
+                revision=self.snapshot,
             )
-            with open(file_name, "w+") as f:
-                f.write(commit.tree[filepath].data_stream.read().decode())
+            self.output.write(version)
+            progress.update(nbytes=version.nbytes)
+        progress.finish()
+
+    def content(self, commit, filepath):
+        """
+        Retrieve the content of a file as of a commit.
+
+        Content is kept in the blob cache, when one is provided, so that a
+        blob shared by many commits is read from the object database once.
+        Commits read by another thread are read through the calling thread's
+        repository handle.
+
+        :param commit: The commit that the file is retrieved from
+        :param str filepath: The relative path to the file within the repo
+
+        :returns: The raw file content
+        """
+        repo = self.git_repo
+        if repo is not None and commit.repo is not repo:
+            commit = git.Commit(repo, commit.binsha)
+        blob = commit.tree[filepath]
+        if self.blob_cache is None:
+            return blob.data_stream.read()
+        content = self.blob_cache.get(blob.hexsha)
+        if content is None:
+            content = blob.data_stream.read()
+            self.blob_cache.put(blob.hexsha, content)
+        return content
+
+    def files(self):
+        """
+        Provide the paths of the files in the repository as of the snapshot.
+
+        :returns: A sorted list of relative file paths
+        """
+        snapshot = self.revision()
+        output = self.git_repo.git.ls_tree("-r", "--name-only", "-z", snapshot)
+        return sorted(path for path in output.split("\0") if path)
+
+    def revision(self):
+        """
+        Provide the SHA of the commit that reads are answered from.
+
+        The collator's rev when one is provided, otherwise the branch, is
+        resolved once and every later read is answered from that snapshot, even
+        if the repository is fetched in the meantime.  The branch of a local
+        repository falls back to its origin branch and then to HEAD.  Set
+        snapshot to None to resolve it again.  The SHA is noted in the audit
+        log summary.
+
+        :returns: The commit SHA
+        """
+        self.checkout()
+        with self._lock:
+            if self.snapshot is None:
+                for rev in self.revisions():
+                    try:
+                        commit = self.git_repo.commit(rev)
+                        break
+                    except (git.BadName, ValueError):
+                        continue
+                else:
+                    name = self.rev or self.branch
+                    raise ValueError(f"{name} is not a valid revision")
+                self.snapshot = commit.hexsha
+                self.audit.notes["revision"] = self.snapshot
+            return self.snapshot
+
+    def revisions(self):
+        """
+        Provide the revisions that the snapshot is resolved from, in order.
+
+        :returns: A list of the collator's rev, or of the branch and, for a
+            local repository, its origin branch and HEAD
+        """
+        if self.rev:
+            return [self.rev]
+        revs = [f"refs/heads/{self.branch}"]
+        if self.repo_path:
+            revs += [f"refs/remotes/origin/{self.branch}", "HEAD"]
+        return revs
 
     def checkout(self):
-        """Establish/Refresh the local Git repository."""
+        """
+        Establish/Refresh the local Git repository.
+
+        Repositories cloned by harvest are cached as bare repositories, files
+        are only ever read from the object database, and only the branch is
+        fetched when the cache is refreshed.  The modification time of a
+        cached clone records when it was last cloned or fetched.
+        """
+        with self._lock:
+            self._checkout()
+
+    def _checkout(self):
         if self.repo_path and not self.git_repo:
-            self.git_repo = git.Repo(self.repo_path)
+            self.git_repo = audit_repo(
+                git.Repo(self.repo_path, odbt=self.odbt), self.audit
+            )
         if self.git_repo:
             if self.validate and not self._valid_repo():
                 raise ValueError(f"{self.org}/{self.repo} repository mismatch")
             return
-        if os.path.isdir(os.path.join(self.local_path, ".git")):
+        if os.path.isdir(self.local_path):
             try:
-                self.git_repo = git.Repo(self.local_path)
-                self.git_repo.remote().fetch()
-                self.git_repo.remote().pull()
+                if os.path.isdir(os.path.join(self.local_path, ".git")):
+                    self._make_bare()
+                self.git_repo = audit_repo(
+                    git.Repo(self.local_path, odbt=self.odbt), self.audit
+                )
+                progress = self._tracker("fetch")
+                self.git_repo.remote().fetch(
+                    f"+refs/heads/{self.branch}:refs/heads/{self.branch}"
+                )
+                os.utime(self.local_path)
+                progress.finish()
+                self.maintain()
                 return
-            except git.exc.InvalidGitRepositoryError:
+            except (git.exc.InvalidGitRepositoryError, git.exc.NoSuchPathError):
                 shutil.rmtree(self.local_path)
         token = None
         if "github.com" in self.hostname:
@@ -139,23 +421,118 @@ class Collator(object):
         elif "gitlab" in self.hostname:
             token = self.creds["gitlab"].token
         url_path = f"{self.hostname}/{self.org}/{self.repo}.git"
+        progress = self._tracker("clone")
         try:
-            self.git_repo = git.Repo.clone_from(
-                f"{self.scheme}://{token}@{url_path}",
-                self.local_path,
-                branch=self.branch,
-            )
+            with self.audit.timed(
+                COMMAND, ["git", "clone", f"{self.scheme}://{url_path}"]
+            ):
+                self.git_repo = git.Repo.clone_from(
+                    f"{self.scheme}://{token}@{url_path}",
+                    self.local_path,
+                    branch=self.branch,
+                    odbt=self.odbt,
+                    bare=True,
+                )
+            self.git_repo = audit_repo(self.git_repo, self.audit)
+            progress.finish()
         except git.exc.GitCommandError as e:
             raise git.exc.GitCommandError(
                 [c.replace(token, f'{"":*<10}') for c in e.command],
                 e.status,
                 e.stderr.strip("\n"),
             ) from None
+        self.maintain()
+
+    def maintain(self):
+        """
+        Keep the commit-graph and packs of the cached clone up to date.
+
+        Path limited history walks use the commit-graph changed path Bloom
+        filters to skip commits that do not touch the path.  Tasks are run in
+        order and incrementally, no new task is started once the time budget is
+        spent.  The settings applied and task outcomes are kept in the
+        maintenance attribute and in the audit log.
+        """
+        self.maintenance = {
+            "budget": self.maintenance_budget,
+            "config": dict(MAINTENANCE_CONFIG),
+            "tasks": {},
+        }
+        self.audit.notes["maintenance"] = self.maintenance
+        if not self.maintenance_budget:
+            return
+        deadline = time.monotonic() + self.maintenance_budget
+        for key, value in MAINTENANCE_CONFIG:
+            self.git_repo.git.config(key, value)
+        for task, args in MAINTENANCE_TASKS:
+            start = time.monotonic()
+            if start >= deadline:
+                self.maintenance["tasks"][task] = {"status": "skipped"}
+                continue
+            try:
+                getattr(self.git_repo.git, task)(*args)
+                status = "done"
+            except git.exc.GitCommandError:
+                status = "failed"
+            self.maintenance["tasks"][task] = {
+                "status": status,
+                "args": list(args),
+                "duration": time.monotonic() - start,
+            }
+
+    def _make_bare(self):
+        # Clones cached before they were bare are converted in place, keeping
+        # their objects and discarding their working tree.
+        git.Repo(self.local_path).git.config("core.bare", "true")
+        bare_path = f"{self.local_path}.bare"
+        os.rename(os.path.join(self.local_path, ".git"), bare_path)
+        shutil.rmtree(self.local_path)
+        os.rename(bare_path, self.local_path)
+
+    def _sample(self, filepath, from_dt, until_dt, samples, history):
+        # Keeps the version as of each sample point from a history walked
+        # newest first, reporting progress per sample point.
+        commits = []
+        progress = self._tracker("read", len(samples), item=filepath)
+        if samples:
+            commit = next(history, None)
+            for sample in samples:
+                while commit is not None and self._commit_day(commit) > sample:
+                    commit = next(history, None)
+                if commit is None:
+                    break
+                if not commits or commits[-1] is not commit:
+                    commits.append(commit)
+                progress.update()
+        progress.finish()
+        if not commits:
+            until = until_dt.strftime("%Y-%m-%d")
+            since = from_dt.strftime("%Y-%m-%d")
+            raise FileMissingError(f"{filepath} not found between {since} and {until}")
+        return commits
+
+    def _file_name(self, filepath, commit):
+        file_path_include = ""
+        if self.include_file_path:
+            file_path_include = "_".join(filepath.rsplit("/")[:-1]) + "_"
+        return (
+            f"{self._ts_to_str(commit.committed_date)}_"
+            f"{file_path_include}"
+            f'{filepath.rsplit("/", 1).pop()}'
+        )
+
+    def _tracker(self, phase, total=None, **fields):
+        return tracker(
+            self.progress, phase, total, repo=f"{self.org}/{self.repo}", **fields
+        )
 
     def _valid_repo(self):
         remote_url = self.git_repo.remotes.origin.url
         *_, org, repo = remote_url.split(".git").pop(0).rsplit("/", 2)
         return self.org == org.split(":").pop() and self.repo == repo
 
+    def _commit_day(self, commit):
+        return datetime.strptime(self._ts_to_str(commit.committed_date), "%Y%m%d")
+
     def _ts_to_str(self, timestamp):
         return datetime.fromtimestamp(timestamp).strftime("%Y%m%d")
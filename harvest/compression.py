@@ -0,0 +1,103 @@
+# Copyright (c) 2020 IBM Corp. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Harvest compressed file writing."""
+
+import gzip
+import lzma
+import os
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+EXTENSIONS = {"gzip": ".gz", "xz": ".xz", "zstd": ".zst"}
+
+
+def available(compression):
+    """
+    Check whether a compression can be used.
+
+    zstd compression requires the zstandard package.
+
+    :param str compression: gzip, xz or zstd
+
+    :returns: True if files can be compressed that way
+    """
+    if compression == "zstd":
+        return zstandard is not None
+    return compression in EXTENSIONS
+
+
+def from_path(path):
+    """
+    Provide the compression implied by a path's extension.
+
+    :param str path: The file path
+
+    :returns: gzip, xz, zstd or None when the path is not compressed
+    """
+    for compression, ext in EXTENSIONS.items():
+        if path.lower().endswith(ext):
+            return compression
+    return None
+
+
+def open_file(path, mode="w", compression=None, **kwargs):
+    """
+    Open a file that is compressed as it is written.
+
+    :param str path: The file path, including any compression extension
+    :param str mode: The file mode, text unless it includes "b"
+    :param str compression: gzip, xz, zstd or None for an uncompressed file
+    :param kwargs: The encoding, errors and newline of a text mode file
+
+    :returns: A file object
+    """
+    if not compression:
+        return open(path, mode, **kwargs)
+    if not available(compression):
+        raise ValueError(f"{compression} compression is not available")
+    mode = mode.replace("+", "")
+    if "b" not in mode and "t" not in mode:
+        mode += "t"
+    if compression == "gzip":
+        return gzip.open(path, mode, **kwargs)
+    if compression == "xz":
+        return lzma.open(path, mode, **kwargs)
+    return zstandard.open(path, mode, **kwargs)
+
+
+def atomic_write(path, text, compression=None):
+    """
+    Write text to a file, replacing it atomically.
+
+    The text is written to a temporary file next to the path that is renamed
+    once complete, so a reader never sees a partial file.
+
+    :param str path: The file path, including any compression extension
+    :param str text: The text written
+    :param str compression: gzip, xz, zstd or None for an uncompressed file
+    """
+    tmp_path = os.path.join(
+        os.path.dirname(path), f".{os.path.basename(path)}.{os.getpid()}.tmp"
+    )
+    try:
+        with open_file(tmp_path, "w", compression) as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
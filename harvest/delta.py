@@ -0,0 +1,179 @@
+# Copyright (c) 2020 IBM Corp. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Harvest JSON delta encoding."""
+
+import json
+from datetime import datetime
+
+from harvest import compression as compress
+
+
+def diff(old, new, path=""):
+    """
+    Compute the JSON Patch operations that turn one JSON document into another.
+
+    Only the "add", "remove" and "replace" operations of RFC 6902 are produced.
+    Lists are compared element by element after their common prefix and suffix
+    are skipped, so entries added to or removed from an inventory produce a
+    handful of operations rather than a replacement of the whole list.
+
+    :param old: The original JSON document
+    :param new: The updated JSON document
+    :param str path: The JSON Pointer of the documents being compared
+
+    :returns: A list of JSON Patch operations
+    """
+    if _same(old, new):
+        return []
+    if isinstance(old, dict) and isinstance(new, dict):
+        ops = [
+            {"op": "remove", "path": _pointer(path, key)}
+            for key in old
+            if key not in new
+        ]
+        for key, value in new.items():
+            if key not in old:
+                ops.append({"op": "add", "path": _pointer(path, key), "value": value})
+            else:
+                ops.extend(diff(old[key], value, _pointer(path, key)))
+        return ops
+    if isinstance(old, list) and isinstance(new, list):
+        start = 0
+        while start < min(len(old), len(new)) and _same(old[start], new[start]):
+            start += 1
+        old_end, new_end = len(old), len(new)
+        while (
+            old_end > start
+            and new_end > start
+            and _same(old[old_end - 1], new[new_end - 1])
+        ):
+            old_end -= 1
+            new_end -= 1
+        common_end = min(old_end, new_end)
+        ops = []
+        for idx in range(start, common_end):
+            ops.extend(diff(old[idx], new[idx], _pointer(path, idx)))
+        for idx in reversed(range(common_end, old_end)):
+            ops.append({"op": "remove", "path": _pointer(path, idx)})
+        for idx in range(common_end, new_end):
+            ops.append({"op": "add", "path": _pointer(path, idx), "value": new[idx]})
+        return ops
+    return [{"op": "replace", "path": path, "value": new}]
+
+
+def patch(doc, ops):
+    """
+    Apply JSON Patch operations produced by diff to a JSON document.
+
+    The document is modified in place.
+
+    :param doc: The JSON document
+    :param list ops: The JSON Patch operations
+
+    :returns: The patched JSON document
+    """
+    for op in ops:
+        if not op["path"]:
+            doc = op["value"]
+            continue
+        *parents, last = [_unescape(t) for t in op["path"].split("/")[1:]]
+        target = doc
+        for token in parents:
+            target = target[int(token) if isinstance(target, list) else token]
+        if isinstance(target, list):
+            last = int(last)
+        if op["op"] == "remove":
+            del target[last]
+        elif op["op"] == "add" and isinstance(target, list):
+            target.insert(last, op["value"])
+        else:
+            target[last] = op["value"]
+    return doc
+
+
+class DeltaReader(object):
+    """Rebuild file versions from a delta encoded collate output."""
+
+    def __init__(self, path):
+        """
+        Construct the DeltaReader object.
+
+        :param str path: The path to a file written by the delta output,
+            decompressed as it is read when it ends in .gz, .xz or .zst
+        """
+        self.path = path
+
+    def dates(self, filepath, repo=None):
+        """
+        Provide the dates of the versions recorded for a file.
+
+        :param str filepath: The relative path to the file within the repo
+        :param str repo: The org/repo of the file when several were collated
+
+        :returns: A list of YYYY-MM-DD dates, oldest first
+        """
+        return [r["date"] for r in self._records(filepath, repo)]
+
+    def content(self, filepath, file_dt, repo=None):
+        """
+        Rebuild the content of a file as of a given date.
+
+        The version returned is the latest one recorded on or before the date.
+
+        :param str filepath: The relative path to the file within the repo
+        :param file_dt: The date as a datetime or a YYYY-MM-DD string
+        :param str repo: The org/repo of the file when several were collated
+
+        :returns: The parsed JSON, or text, content or None if no version exists
+        """
+        if isinstance(file_dt, datetime):
+            file_dt = file_dt.strftime("%Y-%m-%d")
+        content = None
+        for record in self._records(filepath, repo):
+            if record["date"] > file_dt:
+                break
+            if "patch" in record:
+                content = patch(content, record["patch"])
+            else:
+                content = record["content"]
+        return content
+
+    def _records(self, filepath, repo):
+        with compress.open_file(self.path, "r", compress.from_path(self.path)) as f:
+            for line in f:
+                record = json.loads(line)
+                if record["path"] == filepath and record.get("repo") == repo:
+                    yield record
+
+
+def _same(old, new):
+    # Python equality holds between True and 1 or 1.0 and 1, values that differ
+    # in JSON, so types are compared at every level.
+    if type(old) is not type(new):
+        return False
+    if isinstance(old, dict):
+        return old.keys() == new.keys() and all(
+            _same(v, new[k]) for k, v in old.items()
+        )
+    if isinstance(old, list):
+        return len(old) == len(new) and all(map(_same, old, new))
+    return old == new
+
+
+def _pointer(path, token):
+    return f'{path}/{str(token).replace("~", "~0").replace("/", "~1")}'
+
+
+def _unescape(token):
+    return token.replace("~1", "/").replace("~0", "~")
@@ -0,0 +1,66 @@
+# Copyright (c) 2020 IBM Corp. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Harvest JSON field paths."""
+
+import re
+
+_TOKEN = re.compile(r"""\.?([^.\[\]'"]+)|\[(\d+)\]|\['([^']*)'\]|\["([^"]*)"\]""")
+
+
+def parse(path):
+    """
+    Parse a JSON field path into its keys and list indexes.
+
+    Paths are dot separated keys with optional list indexes and an optional
+    leading $, for example $.accounts[0].name.  Keys containing dots are
+    quoted within brackets, for example $['foo.bar'].
+
+    :param str path: The JSON field path
+
+    :returns: A list of str keys and int indexes
+    """
+    tokens = []
+    position = 1 if path.startswith("$") else 0
+    while position < len(path):
+        match = _TOKEN.match(path, position)
+        if not match:
+            raise ValueError(f"{path} is not a valid JSON path")
+        key, index, single, double = match.groups()
+        if index is not None:
+            tokens.append(int(index))
+        else:
+            tokens.append(next(t for t in (key, single, double) if t is not None))
+        position = match.end()
+    return tokens
+
+
+def extract(doc, path, default=None):
+    """
+    Retrieve the value at a JSON field path.
+
+    :param doc: The JSON document
+    :param path: The JSON field path or its parsed tokens
+    :param default: The value provided when the path is not found
+
+    :returns: The value found at the path
+    """
+    value = doc
+    for token in parse(path) if isinstance(path, str) else path:
+        try:
+            if isinstance(token, int) and not isinstance(value, list):
+                token = str(token)
+            value = value[token]
+        except (KeyError, IndexError, TypeError):
+            return default
+    return value
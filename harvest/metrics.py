@@ -0,0 +1,206 @@
+# Copyright (c) 2020 IBM Corp. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Harvest run statistics in the OpenMetrics text format."""
+
+import threading
+import time
+
+from harvest import compression as compress
+from harvest.audit import OBJECT
+
+# Every metric is a gauge holding the value of the last run, in the order that
+# the metric families are written.
+METRICS = {
+    "harvest_run_timestamp_seconds": "Time the run finished.",
+    "harvest_run_duration_seconds": "Time the run took.",
+    "harvest_run_errors": "Errors reported by the run.",
+    "harvest_phase_duration_seconds": "Time spent in each phase of the run.",
+    "harvest_phase_items": "Items processed by each phase of the run.",
+    "harvest_phase_bytes": "Bytes processed by each phase of the run.",
+    "harvest_git_requests": "Git commands run and object database requests made.",
+    "harvest_git_request_duration_seconds": "Time spent in git requests.",
+    "harvest_git_request_bytes": "Bytes returned by git requests.",
+    "harvest_objects_read": "Commits, trees and blobs read from the object database.",
+    "harvest_object_read_bytes": "Bytes of objects read from the object database.",
+    "harvest_files_written": "File versions written to the output directory.",
+    "harvest_files_skipped": "File versions already in the output directory.",
+    "harvest_cache_hits": "Cache lookups that were found.",
+    "harvest_cache_misses": "Cache lookups that were not found.",
+    "harvest_cache_hit_ratio": "Share of cache lookups that were found.",
+    "harvest_report_duration_seconds": "Time taken to generate and write a report.",
+}
+
+
+class RunMetrics(object):
+    """
+    Statistics of a collate or report run.
+
+    Use the object as the progress callback of the run's Collator, or report,
+    to record phase durations, items and bytes.
+    """
+
+    def __init__(self, command):
+        """
+        Construct the RunMetrics object.
+
+        :param str command: The harvest command run, like "collate"
+        """
+        self.command = command
+        self.started_at = time.time()
+        self.samples = {name: {} for name in METRICS}
+        self.lock = threading.Lock()
+
+    def __call__(self, event):
+        """
+        Record the duration, items and bytes of a finished phase.
+
+        :param dict event: The progress event
+        """
+        if not event["finished"]:
+            return
+        self.add("harvest_phase_duration_seconds", event["elapsed"], **_phase(event))
+        self.add("harvest_phase_items", event["done"], **_phase(event))
+        self.add("harvest_phase_bytes", event["bytes"], **_phase(event))
+
+    def add(self, name, value, **labels):
+        """
+        Add to the value of a metric.
+
+        :param str name: The metric name, one of METRICS
+        :param value: The amount added
+        :param labels: The labels of the metric sample
+        """
+        key = tuple(sorted(labels.items()))
+        with self.lock:
+            self.samples[name][key] = self.samples[name].get(key, 0) + value
+
+    def set(self, name, value, **labels):
+        """
+        Set the value of a metric.
+
+        :param str name: The metric name, one of METRICS
+        :param value: The value
+        :param labels: The labels of the metric sample
+        """
+        with self.lock:
+            self.samples[name][tuple(sorted(labels.items()))] = value
+
+    def collect(self, collator):
+        """
+        Record the git requests and blob cache lookups of a collator.
+
+        :param Collator collator: The collator used by the run
+        """
+        repo = f"{collator.org}/{collator.repo}"
+        for (kind, request), total in collator.audit.requests().items():
+            labels = {"repo": repo, "kind": kind, "request": request}
+            self.add("harvest_git_requests", total["count"], **labels)
+            self.add(
+                "harvest_git_request_duration_seconds", total["duration"], **labels
+            )
+            self.add("harvest_git_request_bytes", total["bytes"], **labels)
+        self.add(
+            "harvest_objects_read", collator.audit.count(OBJECT, "stream"), repo=repo
+        )
+        self.add(
+            "harvest_object_read_bytes",
+            collator.audit.nbytes(OBJECT, "stream"),
+            repo=repo,
+        )
+        if collator.blob_cache is not None:
+            self.cache("blob", collator.blob_cache.hits, collator.blob_cache.misses)
+
+    def collect_output(self, output):
+        """
+        Record the file versions written to an output that counts them.
+
+        :param CollateOutput output: The output of the run
+        """
+        if hasattr(output, "written"):
+            self.add("harvest_files_written", output.written)
+            self.add("harvest_files_skipped", output.skipped)
+
+    def cache(self, name, hits, misses):
+        """
+        Record cache lookups.
+
+        :param str name: The cache name, like "blob" or "report"
+        :param int hits: The number of lookups found
+        :param int misses: The number of lookups not found
+        """
+        self.add("harvest_cache_hits", hits, cache=name)
+        self.add("harvest_cache_misses", misses, cache=name)
+        with self.lock:
+            hits = self.samples["harvest_cache_hits"][(("cache", name),)]
+            misses = self.samples["harvest_cache_misses"][(("cache", name),)]
+        if hits + misses:
+            self.set("harvest_cache_hit_ratio", hits / (hits + misses), cache=name)
+
+    def text(self):
+        """
+        Provide the metrics in the OpenMetrics text format.
+
+        The run's timestamp and duration are taken when this is called.  Every
+        sample is labelled with the command.
+
+        :returns: The metrics text, ending with # EOF
+        """
+        now = time.time()
+        self.set("harvest_run_timestamp_seconds", now)
+        self.set("harvest_run_duration_seconds", now - self.started_at)
+        self.add("harvest_run_errors", 0)
+        lines = []
+        with self.lock:
+            for name, help_text in METRICS.items():
+                if not self.samples[name]:
+                    continue
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} gauge")
+                for key, value in sorted(self.samples[name].items()):
+                    labels = ",".join(
+                        f'{k}="{_escape(v)}"'
+                        for k, v in (("command", self.command),) + key
+                    )
+                    lines.append(f"{name}{{{labels}}} {_number(value)}")
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path):
+        """
+        Write the metrics to a file, replacing it atomically.
+
+        The file is written next to the path and renamed so that a collector
+        reading the directory, like the node exporter textfile collector, never
+        reads a partial file.
+
+        :param str path: The metrics file path, conventionally ending in .prom
+        """
+        compress.atomic_write(path, self.text())
+
+
+def _phase(event):
+    labels = {"phase": event["phase"]}
+    if event.get("repo"):
+        labels["repo"] = event["repo"]
+    return labels
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _number(value):
+    if isinstance(value, float):
+        return repr(round(value, 6))
+    return str(value)
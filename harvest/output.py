@@ -0,0 +1,456 @@
+# Copyright (c) 2020 IBM Corp. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Harvest collate outputs."""
+
+import io
+import json
+import os
+import sys
+import tarfile
+import threading
+import time
+import zipfile
+from datetime import datetime
+
+from harvest import compression as compress
+from harvest import delta, jsonpath
+
+TAR_COMPRESSION = {
+    ".tar": "",
+    ".tar.gz": "gz",
+    ".tgz": "gz",
+    ".tar.bz2": "bz2",
+    ".tar.xz": "xz",
+}
+
+MANIFEST_FILENAME = ".harvest-manifest.json"
+
+# A resumed run saves its manifest after this many versions are written so that
+# little work is repeated when it is interrupted.
+MANIFEST_SAVE_INTERVAL = 100
+
+
+class FileVersion(object):
+    """A version of a file retrieved from a git repository commit."""
+
+    def __init__(
+        self, name, filepath, commit, repo=None, select=None, revision=None, raw=None
+    ):
+        """
+        Construct the FileVersion object.
+
+        :param str name: The name the version is written as
+        :param str filepath: The relative path to the file within the repo
+        :param commit: The commit that the version is retrieved from
+        :param str repo: The org/repo the version is retrieved from, provided
+            when versions of several repositories share an output
+        :param str select: The JSON path of the only content to provide
+        :param str revision: The SHA of the snapshot commit the version was
+            read as of
+        :param bytes raw: The raw content of the version, when it is already read
+        """
+        self.name = name
+        self.filepath = filepath
+        self.commit = commit
+        self.repo = repo
+        self.select = select
+        self.revision = revision
+        self._raw = raw
+        self._content = None
+
+    @property
+    def blob(self):
+        """Provide the git blob of the version."""
+        return self.commit.tree[self.filepath]
+
+    @property
+    def digest(self):
+        """Provide an identifier of the version content, without reading it."""
+        if self.select:
+            return f"{self.blob.hexsha}:{self.select}"
+        return self.blob.hexsha
+
+    @property
+    def content(self):
+        """
+        Provide the raw content of the version, read on first access.
+
+        When a JSON path is selected the content is the JSON encoded value
+        found at that path, or null when the path is not found.
+        """
+        if self._content is None:
+            content = self._raw
+            if content is None:
+                content = self.blob.data_stream.read()
+            if self.select:
+                try:
+                    doc = json.loads(content)
+                except ValueError:
+                    raise ValueError(
+                        f"{self.filepath} is not JSON, {self.select} "
+                        "cannot be selected"
+                    ) from None
+                content = json.dumps(jsonpath.extract(doc, self.select)).encode()
+            self._content = content
+        return self._content
+
+    @property
+    def nbytes(self):
+        """Provide the size of the content read so far, 0 if it was not read."""
+        return len(self._content) if self._content is not None else 0
+
+    @property
+    def date(self):
+        """Provide the commit date of the version as YYYY-MM-DD."""
+        return datetime.fromtimestamp(self.commit.committed_date).strftime("%Y-%m-%d")
+
+    @property
+    def data(self):
+        """Provide the content parsed as JSON, or as text if it is not JSON."""
+        text = self.content.decode()
+        try:
+            return json.loads(text)
+        except ValueError:
+            return text
+
+
+class CollateOutput(object):
+    """
+    Base collate output.  Receives file versions as they are collated.
+
+    Outputs that write every version to a single stream set single_stream, the
+    versions of several repositories are written to them one at a time.
+    """
+
+    single_stream = False
+
+    def __enter__(self):
+        """Use the output as a context manager that closes it on exit."""
+        return self
+
+    def __exit__(self, *exc_info):
+        """Close the output."""
+        self.close()
+
+    def write(self, version):
+        """
+        Write a file version to the output.
+
+        :param FileVersion version: The file version to write
+        """
+        raise NotImplementedError("Method implemented by sub-classes")
+
+    def close(self):
+        """Finish writing the output."""
+        pass
+
+
+class DirectoryOutput(CollateOutput):
+    """
+    Write each file version as a file in a directory.
+
+    Versions can be written by several threads at once.
+    """
+
+    def __init__(self, location=".", resume=False, compression=None):
+        """
+        Construct the DirectoryOutput object.
+
+        When resuming, the digest of every version written, its blob SHA and
+        any JSON path selected, is kept in a manifest file in the directory
+        along with the snapshot commit of each repository last collated.
+        Versions already present with the same digest are skipped without
+        reading their content.
+
+        :param str location: The directory that versions are written to
+        :param bool resume: Skip versions written to the directory before
+        :param str compression: Compress files as they are written with gzip,
+            xz or zstd, adding the compression's extension to their names
+        """
+        self.location = location
+        self.resume = resume
+        self.compression = compression
+        self.manifest = {}
+        self.revisions = {}
+        self.written = 0
+        self.skipped = 0
+        self._unsaved = 0
+        self._lock = threading.Lock()
+        if resume and os.path.isfile(self.manifest_path):
+            with open(self.manifest_path) as f:
+                saved = json.load(f)
+            self.manifest = saved.get("versions", {})
+            self.revisions = saved.get("revisions", {})
+
+    @property
+    def manifest_path(self):
+        """Provide the path to the manifest of versions written."""
+        return os.path.join(self.location, MANIFEST_FILENAME)
+
+    def write(self, version):
+        """
+        Write a file version as a file named after the version.
+
+        The file is written to a temporary file that is then renamed so that an
+        interrupted run never leaves a truncated version behind.
+
+        :param FileVersion version: The file version to write
+        """
+        path = os.path.join(self.location, version.name)
+        if self.compression:
+            path += compress.EXTENSIONS[self.compression]
+        digest = version.digest if self.resume else None
+        with self._lock:
+            if version.revision:
+                self.revisions[version.repo or ""] = version.revision
+            if (
+                self.resume
+                and self.manifest.get(version.name) == digest
+                and os.path.isfile(path)
+            ):
+                self.skipped += 1
+                return
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        compress.atomic_write(path, version.content.decode(), self.compression)
+        with self._lock:
+            self.written += 1
+            if self.resume:
+                self.manifest[version.name] = digest
+                self._unsaved += 1
+                if self._unsaved >= MANIFEST_SAVE_INTERVAL:
+                    self._save_manifest()
+
+    def close(self):
+        """Save the manifest of versions written."""
+        with self._lock:
+            if self.resume and (self._unsaved or self.revisions):
+                self._save_manifest()
+
+    def _save_manifest(self):
+        compress.atomic_write(
+            self.manifest_path,
+            json.dumps({"versions": self.manifest, "revisions": self.revisions}),
+        )
+        self._unsaved = 0
+
+
+class ArchiveOutput(CollateOutput):
+    """Write file versions as entries of a single tar or zip archive."""
+
+    single_stream = True
+
+    def __init__(self, path):
+        """
+        Construct the ArchiveOutput object.
+
+        The archive format is determined by the path extension.  Supported are
+        .zip, .tar, .tar.gz, .tgz, .tar.bz2 and .tar.xz.  A path of "-" streams
+        an uncompressed tar archive to standard output.
+
+        :param str path: The archive path or "-" for standard output
+        """
+        if not self.supported(path):
+            raise ValueError(f"{path} is not a supported archive type")
+        self.path = path
+        self.zip_file = None
+        self.tar_file = None
+        if path == "-":
+            self.tar_file = tarfile.open(fileobj=sys.stdout.buffer, mode="w|")
+        elif path.lower().endswith(".zip"):
+            self.zip_file = zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED)
+        else:
+            ext = [e for e in TAR_COMPRESSION if path.lower().endswith(e)].pop()
+            self.tar_file = tarfile.open(path, f"w:{TAR_COMPRESSION[ext]}")
+
+    @staticmethod
+    def supported(path):
+        """
+        Check whether an archive can be written to the path.
+
+        :param str path: The archive path or "-" for standard output
+
+        :returns: True if the archive type is supported
+        """
+        return path == "-" or any(
+            path.lower().endswith(e) for e in list(TAR_COMPRESSION) + [".zip"]
+        )
+
+    def write(self, version):
+        """
+        Add a file version to the archive as an entry named after the version.
+
+        :param FileVersion version: The file version to write
+        """
+        content = version.content
+        if self.zip_file:
+            info = zipfile.ZipInfo(
+                version.name, time.localtime(version.commit.committed_date)[:6]
+            )
+            info.compress_type = zipfile.ZIP_DEFLATED
+            self.zip_file.writestr(info, content)
+            return
+        info = tarfile.TarInfo(version.name)
+        info.size = len(content)
+        info.mtime = version.commit.committed_date
+        self.tar_file.addfile(info, io.BytesIO(content))
+
+    def close(self):
+        """Finish the archive."""
+        if self.zip_file:
+            self.zip_file.close()
+        if self.tar_file:
+            self.tar_file.close()
+        if self.path == "-":
+            sys.stdout.buffer.flush()
+
+
+class JsonLinesOutput(CollateOutput):
+    """Write file versions as a JSON Lines time series, one record per version."""
+
+    single_stream = True
+
+    def __init__(self, path):
+        """
+        Construct the JsonLinesOutput object.
+
+        A path ending in .gz, .xz or .zst is compressed as it is written.
+
+        :param path: The JSON Lines file path, "-" for standard output or an
+            open text stream
+        """
+        self.path = path
+        self._owned = False
+        self._flush = True
+        if path == "-":
+            self.file = sys.stdout
+        elif isinstance(path, str):
+            compression = compress.from_path(path)
+            self.file = compress.open_file(path, "w", compression)
+            self._owned = True
+            self._flush = compression is None
+        else:
+            self.file = path
+
+    def write(self, version):
+        """
+        Append a record with the version's date, commit, path and content.
+
+        The content is included as parsed JSON where possible, otherwise as
+        text.  Each record is flushed as soon as it is written, unless the
+        output is compressed since every flush ends a compressed block.
+
+        :param FileVersion version: The file version to write
+        """
+        self.file.write(json.dumps(self.record(version)) + "\n")
+        if self._flush:
+            self.file.flush()
+
+    def record(self, version):
+        """
+        Provide the JSON record for a file version.
+
+        :param FileVersion version: The file version
+
+        :returns: The record as a dictionary
+        """
+        record = {
+            "date": version.date,
+            "commit": version.commit.hexsha,
+            "path": version.filepath,
+            "content": version.data,
+        }
+        if version.repo:
+            record["repo"] = version.repo
+        if version.revision:
+            record["revision"] = version.revision
+        return record
+
+    def close(self):
+        """Finish the JSON Lines stream."""
+        if self._owned:
+            self.file.close()
+
+
+class DeltaOutput(JsonLinesOutput):
+    """Write the first version of each file in full and later ones as deltas."""
+
+    def __init__(self, path):
+        """
+        Construct the DeltaOutput object.
+
+        Use harvest.delta.DeltaReader to rebuild a version from the output.
+
+        :param path: The delta file path, "-" for standard output or an open
+            text stream
+        """
+        super().__init__(path)
+        self.previous = {}
+
+    def record(self, version):
+        """
+        Provide the JSON record for a file version.
+
+        Versions with JSON content that follow a JSON version of the same file
+        are recorded as the JSON Patch operations from the previous version.
+        All other versions are recorded in full.
+
+        :param FileVersion version: The file version
+
+        :returns: The record as a dictionary
+        """
+        record = super().record(version)
+        data = record["content"]
+        key = (version.repo, version.filepath)
+        previous = self.previous.get(key)
+        self.previous[key] = data
+        if isinstance(data, (dict, list)) and isinstance(previous, (dict, list)):
+            del record["content"]
+            record["patch"] = delta.diff(previous, data)
+        return record
+
+
+class NamespacedOutput(CollateOutput):
+    """Write the file versions of one repository to an output shared by many."""
+
+    def __init__(self, output, namespace, lock=None):
+        """
+        Construct the NamespacedOutput object.
+
+        Version names are prefixed with the namespace, placing them in a
+        directory of that name, and records are tagged with it.  Writes to a
+        shared single stream output are serialized with the lock, once the
+        version content is read.
+
+        :param CollateOutput output: The shared output
+        :param str namespace: The org/repo of the repository
+        :param lock: The lock shared by all writers to the output
+        """
+        self.output = output
+        self.namespace = namespace
+        self.lock = lock or threading.Lock()
+
+    def write(self, version):
+        """
+        Write a file version to the shared output.
+
+        :param FileVersion version: The file version to write
+        """
+        version.name = f"{self.namespace}/{version.name}"
+        version.repo = self.namespace
+        if not self.output.single_stream:
+            self.output.write(version)
+            return
+        version.content
+        with self.lock:
+            self.output.write(version)
@@ -0,0 +1,222 @@
+# Copyright (c) 2020 IBM Corp. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Harvest progress events."""
+
+import json
+import sys
+import threading
+import time
+
+# Progress of a phase is sent at most this often, in seconds, except for the
+# events that start and finish it.
+INTERVAL = 0.5
+
+BAR_WIDTH = 30
+
+
+def tracker(callback, phase, total=None, **fields):
+    """
+    Provide the tracker of a phase's progress.
+
+    :param callback: The callable that events are sent to, or None
+    :param str phase: The phase name, like "read" or "write"
+    :param int total: The number of items in the phase, if it is known
+    :param fields: Fields added to every event, like the repo or item
+
+    :returns: A Tracker object, one that does nothing if callback is None
+    """
+    if callback is None:
+        return _NULL_TRACKER
+    return Tracker(callback, phase, total, **fields)
+
+
+class Tracker(object):
+    """
+    Send progress events of one phase to a callback.
+
+    Events are dictionaries with the phase, the number of items done, the total
+    number of items or None, the number of bytes processed, the seconds elapsed
+    and whether the phase is finished, along with any extra fields.  An event
+    is sent when the phase starts, at most every INTERVAL seconds as it
+    progresses and when it finishes.
+    """
+
+    def __init__(self, callback, phase, total=None, **fields):
+        """
+        Construct the Tracker object and send the phase's first event.
+
+        :param callback: The callable that events are sent to
+        :param str phase: The phase name, like "read" or "write"
+        :param int total: The number of items in the phase, if it is known
+        :param fields: Fields added to every event, like the repo or item
+        """
+        self.callback = callback
+        self.phase = phase
+        self.total = total
+        self.fields = fields
+        self.done = 0
+        self.nbytes = 0
+        self.finished = False
+        self.started_at = time.monotonic()
+        self._next = self.started_at + INTERVAL
+        self._send(self.started_at)
+
+    def update(self, done=1, nbytes=0):
+        """
+        Add to the items done and bytes processed.
+
+        :param int done: The number of items done since the last update
+        :param int nbytes: The number of bytes processed since the last update
+        """
+        self.done += done
+        self.nbytes += nbytes
+        now = time.monotonic()
+        if now >= self._next:
+            self._next = now + INTERVAL
+            self._send(now)
+
+    def finish(self):
+        """Send the phase's last event."""
+        if not self.finished:
+            self.finished = True
+            self._send(time.monotonic())
+
+    def _send(self, now):
+        self.callback(
+            {
+                "phase": self.phase,
+                "done": self.done,
+                "total": self.total,
+                "bytes": self.nbytes,
+                "elapsed": round(now - self.started_at, 3),
+                "finished": self.finished,
+                **self.fields,
+            }
+        )
+
+
+class _NullTracker(object):
+    def update(self, done=1, nbytes=0):
+        pass
+
+    def finish(self):
+        pass
+
+
+_NULL_TRACKER = _NullTracker()
+
+
+class JsonLinesRenderer(object):
+    """Write each progress event as a line of JSON."""
+
+    def __init__(self, stream=None):
+        """
+        Construct the JsonLinesRenderer object.
+
+        :param stream: The text stream written to, defaults to stderr
+        """
+        self.stream = stream or sys.stderr
+        self.lock = threading.Lock()
+
+    def __call__(self, event):
+        """
+        Write a progress event.
+
+        :param dict event: The progress event
+        """
+        with self.lock:
+            self.stream.write(json.dumps(event) + "\n")
+            self.stream.flush()
+
+
+class TerminalRenderer(JsonLinesRenderer):
+    """Draw a progress bar with an ETA on a single terminal line."""
+
+    def __call__(self, event):
+        """
+        Redraw the progress line with an event.
+
+        :param dict event: The progress event
+        """
+        with self.lock:
+            self.stream.write(f"\r\033[K{format_event(event)}")
+            if event["finished"]:
+                self.stream.write("\n")
+            self.stream.flush()
+
+
+def format_event(event):
+    """
+    Describe a progress event on one line.
+
+    :param dict event: The progress event
+
+    :returns: The description, with a bar and ETA when the total is known
+    """
+    label = " ".join(str(event[k]) for k in ("repo", "item") if event.get(k))
+    parts = [f'{event["phase"]} {label}'.strip()]
+    done, total = event["done"], event["total"]
+    if total:
+        filled = min(BAR_WIDTH, BAR_WIDTH * done // total)
+        parts.append(f'[{"#" * filled}{"." * (BAR_WIDTH - filled)}]')
+        parts.append(f"{done}/{total}")
+    else:
+        parts.append(str(done))
+    if event["bytes"]:
+        parts.append(f'{event["bytes"] / 1024 / 1024:.1f}MB')
+    if event["finished"]:
+        parts.append(f'in {_duration(event["elapsed"])}')
+    elif total and done:
+        remaining = event["elapsed"] * (total - done) / done
+        parts.append(f"ETA {_duration(remaining)}")
+    return " ".join(parts)
+
+
+def renderer(stream=None):
+    """
+    Provide the progress renderer suited to a stream.
+
+    :param stream: The text stream written to, defaults to stderr
+
+    :returns: A TerminalRenderer for a terminal, a JsonLinesRenderer otherwise
+    """
+    stream = stream or sys.stderr
+    if stream.isatty():
+        return TerminalRenderer(stream)
+    return JsonLinesRenderer(stream)
+
+
+def broadcast(*callbacks):
+    """
+    Provide a callback that sends each event to several callbacks.
+
+    :param callbacks: The callbacks, None entries are ignored
+
+    :returns: The combined callback, or None if there are no callbacks
+    """
+    callbacks = [c for c in callbacks if c is not None]
+    if len(callbacks) < 2:
+        return callbacks[0] if callbacks else None
+
+    def send(event):
+        for callback in callbacks:
+            callback(event)
+
+    return send
+
+
+def _duration(seconds):
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02}:{seconds:02}"
@@ -13,18 +13,50 @@
 # limitations under the License.
 """Harvest reporter base class module."""
 
-import csv
+import fnmatch
+import json
+import mmap
 import os
+import shutil
+import tempfile
+import threading
+from contextlib import contextmanager
 from datetime import datetime
+from itertools import islice
 
-from harvest.collator import Collator
+from harvest import compression as compress
+from harvest import jsonpath
+from harvest.collator import DAILY, Collator, sample_dates
 from harvest.exceptions import FileMissingError
+from harvest.output import FileVersion
+from harvest.progress import tracker
+from harvest.writers import get_writer
 
 from jinja2 import Environment, FileSystemLoader
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Blob content larger than this is spooled to a temporary file by open_file.
+SPOOL_MAX_SIZE = 64 * 1024 * 1024
+SPOOL_CHUNK_SIZE = 1024 * 1024
+
+WRITE_BATCH_SIZE = 1000
+
 
 class BaseReporter(object):
-    """Base reporter class.  All reports must be sub-classes of this class."""
+    """
+    Base reporter class.  All reports must be sub-classes of this class.
+
+    File content and versions can be retrieved from several threads at once,
+    for example to retrieve many files with a thread pool.
+    """
+
+    # The file paths or glob patterns of the evidence the report reads as of
+    # today, prefetched before the report is generated.  See get_inputs.
+    inputs = None
 
     def __init__(
         self,
@@ -45,6 +77,10 @@ class BaseReporter(object):
         self.validate = validate
         self.config = config
         self.collator = None
+        self.progress = None
+        self.checkpoints = None
+        self._prefetched = {}
+        self._collator_lock = threading.Lock()
 
     @property
     def report_filename(self):
@@ -55,69 +91,374 @@ class BaseReporter(object):
         """
         Retrieve file content for a given file and date from a git repository.
 
+        Content of a file and date that was prefetched is provided from memory.
+
         :param str filepath: The relative path to the file within the repo
         :param datetime file_dt: The date of the file version
 
         :returns: The file content
         """
-        if not self.collator:
-            self.collator = Collator(
-                self.repo_url, self.creds, self.branch, self.repo_path, self.validate
-            )
-        if not file_dt:
-            file_dt = datetime.today()
-        if file_dt > datetime.today():
-            raise ValueError(f'{file_dt.strftime("%Y-%m-%d")} is in the future')
-        commits = None
+        if filepath in self._prefetched:
+            day = file_dt or datetime.today()
+            day = datetime(day.year, day.month, day.day)
+            from_day, until_day, versions = self._prefetched[filepath]
+            if from_day <= day <= until_day:
+                return versions.get(day)
+        commit = self._get_commit(filepath, file_dt)
+        return self.collator.content(commit, filepath) if commit else None
+
+    @contextmanager
+    def open_file(self, filepath, file_dt=None, memory_map=False):
+        """
+        Open file content for a given file and date from a git repository.
+
+        The content is streamed from the repository into a spooled temporary
+        file that is kept in memory up to SPOOL_MAX_SIZE bytes and on disk
+        beyond that, so large files can be processed sequentially without
+        holding them in memory.  Use as a context manager, the file is removed
+        on exit.
+
+        :param str filepath: The relative path to the file within the repo
+        :param datetime file_dt: The date of the file version
+        :param bool memory_map: Provide a read only memory map of the content
+            instead of a file object
+
+        :returns: A binary file object, or mmap, positioned at the start of
+            the content or None if the file is not found
+        """
+        commit = self._get_commit(filepath, file_dt)
+        if not commit:
+            yield None
+            return
+        with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE) as f:
+            shutil.copyfileobj(commit.tree[filepath].data_stream, f, SPOOL_CHUNK_SIZE)
+            size = f.tell()
+            f.seek(0)
+            # Empty content cannot be memory mapped
+            if not memory_map or not size:
+                yield f
+                return
+            f.rollover()
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as view:
+                yield view
+
+    def get_file_versions(self, filepath, from_dt, until_dt, granularity=DAILY):
+        """
+        Retrieve the versions of a file sampled across a date range.
+
+        :param str filepath: The relative path to the file within the repo
+        :param datetime from_dt: The start of the date range
+        :param datetime until_dt: The end of the date range
+        :param granularity: "daily", "weekly", "monthly" or a list of datetimes
+
+        :returns: A list of FileVersion objects, oldest first
+        """
+        self._init_collator()
         try:
-            commits = self.collator.read(
+            commits = self.collator.read(filepath, from_dt, until_dt, granularity)
+        except FileMissingError:
+            return []
+        return [
+            FileVersion(
+                self.collator._file_name(filepath, c),
                 filepath,
-                datetime(file_dt.year, file_dt.month, file_dt.day),
-                datetime(file_dt.year, file_dt.month, file_dt.day),
+                c,
+                revision=self.collator.snapshot,
             )
+            for c in reversed(commits)
+        ]
+
+    def get_file_columns(self, filepath, from_dt, until_dt, fields, granularity=DAILY):
+        """
+        Retrieve JSON field values of a file as columns across a date range.
+
+        Each distinct version of the file is parsed once and only the values of
+        the fields are kept.  The columns hold one entry per sample date, the
+        value as of that date, and a field missing from a version is None.
+
+        :param str filepath: The relative path to the file within the repo
+        :param datetime from_dt: The start of the date range
+        :param datetime until_dt: The end of the date range
+        :param list fields: The JSON field paths, like $.summary.passed
+        :param granularity: "daily", "weekly", "monthly" or a list of datetimes
+
+        :returns: A dictionary of columns keyed by field with a "date" column,
+            as NumPy arrays when NumPy is installed otherwise as lists.  A
+            column holding lists or objects is a one dimensional object array.
+        """
+        self._init_collator()
+        paths = {field: jsonpath.parse(field) for field in fields}
+        try:
+            commits = self.collator.read(filepath, from_dt, until_dt, granularity)
         except FileMissingError:
-            pass
-        return commits[0].tree[filepath].data_stream.read() if commits else None
+            commits = []
+        values = {}
+        progress = tracker(self.progress, "parse", len(commits), item=filepath)
+        for commit in commits:
+            sha = commit.tree[filepath].hexsha
+            if sha not in values:
+                content = self.collator.content(commit, filepath)
+                doc = json.loads(content)
+                values[sha] = [jsonpath.extract(doc, paths[f]) for f in fields]
+                progress.update(nbytes=len(content))
+            else:
+                progress.update()
+        progress.finish()
+        columns = {"date": [], **{field: [] for field in fields}}
+        for sample, commit in self._by_sample(commits, from_dt, until_dt, granularity):
+            columns["date"].append(sample)
+            row = values[commit.tree[filepath].hexsha]
+            for field, value in zip(fields, row):
+                columns[field].append(value)
+        if numpy is not None:
+            columns = {
+                field: _array(column, "datetime64[D]" if field == "date" else None)
+                for field, column in columns.items()
+            }
+        return columns
+
+    def get_daily_results(self, filepaths, from_dt, until_dt, compute):
+        """
+        Retrieve a result per day of a date range, computed from the day's files.
+
+        The result of a day is computed from the versions of the files as of
+        that day.  When a checkpoint cache is set, the checkpoints attribute, a
+        day's result is reused if it was computed by the same report and config
+        from the same versions, identified by their blob SHAs, so only new days
+        and days whose files changed are computed.  Checkpointed results are
+        provided as decoded from JSON, whether they were computed by this run
+        or reused, so that the report is the same either way.  A day whose
+        result is None is computed on every run.
+
+        :param list filepaths: The relative paths to the files within the repo
+        :param datetime from_dt: The start of the date range
+        :param datetime until_dt: The end of the date range
+        :param compute: A callable taking the day and a dictionary of file
+            content keyed by file path, None for a file not found as of the
+            day, that returns the day's result, JSON serializable when
+            checkpointed
+
+        :returns: A list of (day, result) tuples, oldest first
+        """
+        self._init_collator()
+        versions = {}
+        for filepath in filepaths:
+            try:
+                commits = self.collator.read(filepath, from_dt, until_dt)
+            except FileMissingError:
+                commits = []
+            versions[filepath] = dict(self._by_sample(commits, from_dt, until_dt))
+        key = self.checkpoints.key(self) if self.checkpoints else None
+        days = list(reversed(sample_dates(from_dt, until_dt)))
+        results = []
+        progress = tracker(self.progress, "compute", len(days))
+        for day in days:
+            commits = {f: versions[f].get(day) for f in filepaths}
+            inputs = {f: c.tree[f].hexsha if c else None for f, c in commits.items()}
+            result = None
+            if self.checkpoints:
+                result = self.checkpoints.get(key, day, inputs)
+            if result is None:
+                result = compute(
+                    day,
+                    {
+                        f: self.collator.content(c, f) if c else None
+                        for f, c in commits.items()
+                    },
+                )
+                if self.checkpoints:
+                    self.checkpoints.put(key, day, inputs, result)
+                    result = json.loads(json.dumps(result))
+            results.append((day, result))
+            progress.update()
+        progress.finish()
+        return results
+
+    def get_inputs(self):
+        """
+        Declare the evidence the report reads so that it can be prefetched.
+
+        Override in sub-class to derive the inputs from the report config,
+        otherwise the files of the inputs class attribute are read as of today.
+
+        :returns: A tuple of a list of file paths or glob patterns, the start
+            date and the end date of the versions read, or None if the report
+            does not declare its inputs
+        """
+        if not self.inputs:
+            return None
+        today = datetime.today()
+        return list(self.inputs), today, today
+
+    def prefetch(self):
+        """
+        Retrieve the declared inputs of the report in a single pass.
+
+        Glob patterns are matched, as by fnmatch, against the files of the
+        repository snapshot.  The daily versions of every file within the date
+        range are read, walking the history of all of the files at once, and
+        the distinct contents kept in memory, after which
+        get_file_content provides those files and dates without reading the
+        repository.
+
+        :returns: The file paths prefetched
+        """
+        inputs = self.get_inputs()
+        if not inputs:
+            return []
+        patterns, from_dt, until_dt = inputs
+        self._init_collator()
+        filepaths = [p for p in patterns if not any(c in p for c in "*?[")]
+        globs = [p for p in patterns if p not in filepaths]
+        if globs:
+            filepaths += [
+                f
+                for f in self.collator.files()
+                if f not in filepaths and any(fnmatch.fnmatchcase(f, g) for g in globs)
+            ]
+        today = datetime.today()
+        from_day = datetime(from_dt.year, from_dt.month, from_dt.day)
+        until_day = datetime(until_dt.year, until_dt.month, until_dt.day)
+        until_day = min(until_day, datetime(today.year, today.month, today.day))
+        contents = {}
+        prefetched = {}
+        histories = self.collator.read_files(filepaths, from_day, until_day)
+        progress = tracker(self.progress, "prefetch", len(filepaths))
+        for filepath, commits in histories.items():
+            versions = {}
+            nbytes = 0
+            for day, commit in self._by_sample(commits, from_day, until_day):
+                sha = commit.tree[filepath].hexsha
+                if sha not in contents:
+                    contents[sha] = self.collator.content(commit, filepath)
+                    nbytes += len(contents[sha])
+                versions[day] = contents[sha]
+            prefetched[filepath] = (from_day, until_day, versions)
+            progress.update(nbytes=nbytes)
+        progress.finish()
+        self._prefetched = prefetched
+        return filepaths
 
     def generate_report(self):
         """Stub method for custom report generation by sub-classes."""
         raise NotImplementedError("Method implemented by sub-classes")
 
-    def write(self, raw_content, location="."):
+    def write(self, raw_content, location=".", compression=None, output_format=None):
         """
         Create report artifact.
 
-        :param raw_content: The raw content as a list of strings or a string
+        The writer is selected by the output format, which defaults to the
+        report filename extension.  Rows are written in batches and progress is
+        reported per batch.
+
+        :param raw_content: The raw content as a list of rows or a string
+        :param str location: The directory the report is written to
+        :param str compression: Compress the report as it is written with
+            gzip, xz or zstd, adding the compression's extension to its name
+        :param str output_format: Write the report in this format, like jsonl,
+            replacing the report filename extension
         """
         if not raw_content:
             return
         rpt_content = self._format_content(raw_content)
-        with open(os.path.join(location, self.report_filename), "w+") as f:
-            write_func = f.write
-            is_csv = self.report_filename.rsplit(".", 1).pop().lower() == "csv"
-            if is_csv and isinstance(rpt_content, list):
-                csv_writer = csv.DictWriter(f, fieldnames=rpt_content[0].keys())
-                csv_writer.writeheader()
-                write_func = csv_writer.writerow
-            if isinstance(rpt_content, list):
-                for row in rpt_content:
-                    write_func(row)
+        filename = self.report_filename
+        if output_format:
+            filename = f'{filename.rsplit(".", 1)[0]}.{output_format}'
+        writer_class = get_writer(filename.rsplit(".", 1).pop())
+        if not writer_class.available():
+            raise RuntimeError(f"{filename} writer dependencies are not installed")
+        path = os.path.join(location, filename)
+        if compression:
+            path += compress.EXTENSIONS[compression]
+        mode = "wb" if writer_class.binary else "w+"
+        progress = tracker(self.progress, "write", item=filename)
+        with compress.open_file(path, mode, compression) as f:
+            writer = writer_class(f)
+            if isinstance(rpt_content, str):
+                writer.write_text(rpt_content)
+                progress.update(nbytes=len(rpt_content))
             else:
-                write_func(rpt_content)
+                rows = iter(rpt_content)
+                batch = list(islice(rows, WRITE_BATCH_SIZE))
+                while batch:
+                    writer.write_rows(batch)
+                    progress.update(len(batch))
+                    batch = list(islice(rows, WRITE_BATCH_SIZE))
+            writer.close()
+        progress.finish()
 
-    def _format_content(self, raw_content):
-        template_env = None
+    def _get_commit(self, filepath, file_dt):
+        self._init_collator()
+        if not file_dt:
+            file_dt = datetime.today()
+        if file_dt > datetime.today():
+            raise ValueError(f'{file_dt.strftime("%Y-%m-%d")} is in the future')
+        try:
+            commits = self.collator.read(
+                filepath,
+                datetime(file_dt.year, file_dt.month, file_dt.day),
+                datetime(file_dt.year, file_dt.month, file_dt.day),
+            )
+        except FileMissingError:
+            return None
+        return commits[0] if commits else None
+
+    def _by_sample(self, commits, from_dt, until_dt, granularity=DAILY):
+        # Pairs each sample date, oldest first, with the commit of the version
+        # as of that date, skipping dates before the first version.
+        pending = list(reversed(commits))
+        current = None
+        for sample in reversed(sample_dates(from_dt, until_dt, granularity)):
+            while pending and self.collator._commit_day(pending[0]) <= sample:
+                current = pending.pop(0)
+            if current is not None:
+                yield sample, current
+
+    def _init_collator(self):
+        if self.collator:
+            return
+        with self._collator_lock:
+            if self.collator:
+                return
+            self.collator = Collator(
+                self.repo_url,
+                self.creds,
+                self.branch,
+                self.repo_path,
+                self.validate,
+                progress=self.progress,
+            )
+
+    @property
+    def template_path(self):
+        """Provide the path to the report template or None if there is none."""
         template_file = f"{self.report_filename}.tmpl"
         for dirname, _, files in os.walk(self.template_dir):
             if template_file in files:
-                template_env = Environment(
-                    loader=FileSystemLoader(searchpath=dirname),
-                    trim_blocks=True,
-                    lstrip_blocks=True,
-                    autoescape=True,
-                )
-                break
-        if not template_env:
+                return os.path.join(dirname, template_file)
+        return None
+
+    def _format_content(self, raw_content):
+        template_path = self.template_path
+        if not template_path:
             return raw_content
-        template = template_env.get_template(template_file)
+        template_env = Environment(
+            loader=FileSystemLoader(searchpath=os.path.dirname(template_path)),
+            trim_blocks=True,
+            lstrip_blocks=True,
+            autoescape=True,
+        )
+        template = template_env.get_template(os.path.basename(template_path))
         return template.render(data=raw_content, report=self)
+
+
+def _array(column, dtype=None):
+    # Lists and objects are kept as the elements of an object array, NumPy
+    # would otherwise add a dimension for equal length lists and reject lists
+    # of different lengths.
+    if dtype or not any(isinstance(v, (list, dict)) for v in column):
+        return numpy.array(column, dtype=dtype)
+    array = numpy.empty(len(column), dtype=object)
+    for i, value in enumerate(column):
+        array[i] = value
+    return array
@@ -0,0 +1,376 @@
+# Copyright (c) 2020 IBM Corp. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Harvest server keeping repositories warm between requests."""
+
+import io
+import json
+import os
+import socketserver
+import tempfile
+import time
+from datetime import datetime
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from harvest.audit import GitAudit
+from harvest.cache import BlobCache
+from harvest.collator import Collator
+from harvest.exceptions import FileMissingError
+from harvest.output import JsonLinesOutput
+from harvest.utils import get_report_classes, get_report_module
+
+LOCAL_REPO_URL = "https://local/local/local"
+
+# The git requests of a warm repository kept in memory, the server does not
+# report them so only the latest are kept.
+AUDIT_MAX_ENTRIES = 1000
+
+
+class WarmRepo(object):
+    """A repository collator kept open along with its history index."""
+
+    def __init__(self, collator, refresh):
+        """
+        Construct the WarmRepo object.
+
+        :param Collator collator: The collator of the repository
+        :param int refresh: The number of seconds between repository refreshes
+        """
+        self.collator = collator
+        self.refresh = refresh
+        self.history = {}
+        self.refreshed_at = None
+
+    def checkout(self):
+        """
+        Establish the repository, refreshing it once the interval has passed.
+
+        Requests are answered from the branch commit resolved at the last
+        refresh.  The clone is only maintained when it is first checked out so
+        that refreshes do not hold up requests, use harvest cache warm to
+        maintain it on a schedule.
+        """
+        now = time.monotonic()
+        if self.refreshed_at is None or now - self.refreshed_at >= self.refresh:
+            collator = self.collator
+            budget = collator.maintenance_budget
+            if self.refreshed_at is not None:
+                collator.maintenance_budget = 0
+            collator.audit.reset()
+            collator.git_repo = None
+            collator.snapshot = None
+            try:
+                collator.checkout()
+            finally:
+                collator.maintenance_budget = budget
+            self.history = {}
+            self.refreshed_at = now
+
+    def read(self, filepath, from_dt, until_dt):
+        """
+        Retrieve commits for a file, reusing results since the last refresh.
+
+        :param str filepath: The relative path to the file within the repo
+        :param datetime from_dt: The retrieval start date
+        :param datetime until_dt: The retrieval end date
+
+        :returns: A list of Commit objects
+        """
+        self.checkout()
+        key = (filepath, from_dt, until_dt)
+        if key not in self.history:
+            try:
+                self.history[key] = self.collator.read(filepath, from_dt, until_dt)
+            except FileMissingError as e:
+                self.history[key] = e
+        if isinstance(self.history[key], FileMissingError):
+            raise self.history[key]
+        return self.history[key]
+
+
+class HarvestServer(object):
+    """Serve collate, file content and report requests from warm repositories."""
+
+    def __init__(
+        self,
+        creds,
+        refresh=300,
+        blob_cache_size=256 * 1024 * 1024,
+        odb="git",
+        maintenance_budget=30,
+        allowed_repos=None,
+        allowed_paths=None,
+        allowed_packages=None,
+    ):
+        """
+        Construct the HarvestServer object.
+
+        Only the repositories and local repository paths allowed are served,
+        and only the reports of the packages allowed are generated.
+
+        :param creds: The credentials used to clone repositories
+        :param int refresh: The number of seconds between repository refreshes
+        :param int blob_cache_size: The number of bytes of file content cached
+        :param str odb: The git object database backend
+        :param int maintenance_budget: The seconds spent on clone maintenance
+        :param list allowed_repos: The URLs of the repositories served
+        :param list allowed_paths: The local repository paths served
+        :param list allowed_packages: The packages whose reports are generated
+        """
+        self.creds = creds
+        self.allowed_repos = {_repo_url(r) for r in allowed_repos or []}
+        self.allowed_paths = {os.path.realpath(p) for p in allowed_paths or []}
+        self.allowed_packages = set(allowed_packages or [])
+        self.refresh = refresh
+        self.blob_cache = BlobCache(blob_cache_size)
+        self.odb = odb
+        self.maintenance_budget = maintenance_budget
+        self.repos = {}
+        self.report_modules = {}
+
+    def warm_repo(self, repo, branch="master", repo_path=None):
+        """
+        Provide the warm repository for a repo, creating it on first use.
+
+        :param str repo: The repository URL or "local" with a repo_path
+        :param str branch: The repository branch
+        :param str repo_path: The location of a local git repository
+
+        :returns: A WarmRepo object
+        """
+        key = (repo, branch, repo_path)
+        if key not in self.repos:
+            local = repo == "local"
+            if local and not repo_path:
+                raise ValueError("repo_path required when using local repo mode")
+            if not local and _repo_url(repo) not in self.allowed_repos:
+                raise ValueError(f"{repo} is not served")
+            if repo_path and os.path.realpath(repo_path) not in self.allowed_paths:
+                raise ValueError(f"{repo_path} is not served")
+            collator = Collator(
+                LOCAL_REPO_URL if local else repo,
+                None if local else self.creds,
+                branch,
+                repo_path,
+                not local,
+                odb=self.odb,
+                maintenance_budget=self.maintenance_budget,
+                blob_cache=self.blob_cache,
+            )
+            collator.audit = GitAudit(max_entries=AUDIT_MAX_ENTRIES)
+            self.repos[key] = WarmRepo(collator, self.refresh)
+        return self.repos[key]
+
+    def content(self, filepath, file_dt=None, **repo):
+        """
+        Retrieve file content for a given file and date.
+
+        :param str filepath: The relative path to the file within the repo
+        :param datetime file_dt: The date of the file version
+        :param repo: The repo, branch and repo_path of the repository
+
+        :returns: The file content or None if the file is not found
+        """
+        file_dt = _day(file_dt or datetime.today())
+        if file_dt > datetime.today():
+            raise ValueError(f'{file_dt.strftime("%Y-%m-%d")} is in the future')
+        warm = self.warm_repo(**repo)
+        try:
+            commits = warm.read(filepath, file_dt, file_dt)
+        except FileMissingError:
+            return None
+        return warm.collator.content(commits[0], filepath)
+
+    def collate(self, stream, filepath, start, end, **repo):
+        """
+        Write the versions of a file within a date range as JSON Lines.
+
+        :param stream: The text stream that records are written to
+        :param str filepath: The relative path to the file within the repo
+        :param datetime start: The retrieval start date
+        :param datetime end: The retrieval end date
+        :param repo: The repo, branch and repo_path of the repository
+        """
+        warm = self.warm_repo(**repo)
+        commits = warm.read(filepath, _day(start), _day(end))
+        collator = warm.collator
+        collator.output = JsonLinesOutput(stream)
+        try:
+            collator.write(filepath, commits)
+        finally:
+            collator.output.close()
+
+    def report(self, package, name, config=None, **repo):
+        """
+        Generate a report using a warm repository.
+
+        Report modules are loaded on their first request and reused.
+
+        :param str package: The name of the package that contains the report
+        :param str name: The name of the report to execute
+        :param dict config: The key/value pairs needed to execute the report
+        :param repo: The repo, branch and repo_path of the repository
+
+        :returns: A tuple of the report filename and its content
+        """
+        if package not in self.allowed_packages:
+            raise ValueError(f"{package} is not served")
+        if (package, name) not in self.report_modules:
+            try:
+                rpt_module = get_report_module(package, name)
+            except ModuleNotFoundError:
+                raise ValueError(f"{package} is not found") from None
+            self.report_modules[(package, name)] = rpt_module
+        rpt_module = self.report_modules[(package, name)]
+        rpts = get_report_classes(rpt_module)
+        if len(rpts) != 1:
+            raise ValueError(f"{name} is not found or is ambiguous")
+        warm = self.warm_repo(**repo)
+        warm.checkout()
+        collator = warm.collator
+        reporter = rpts[0](
+            LOCAL_REPO_URL if repo["repo"] == "local" else repo["repo"],
+            collator.creds,
+            collator.branch,
+            collator.repo_path,
+            os.path.dirname(rpt_module.__file__),
+            collator.validate,
+            **(config or {}),
+        )
+        reporter.collator = collator
+        with tempfile.TemporaryDirectory() as tmpdir:
+            reporter.prefetch()
+            reporter.write(reporter.generate_report(), tmpdir)
+            path = os.path.join(tmpdir, reporter.report_filename)
+            if not os.path.isfile(path):
+                return reporter.report_filename, b""
+            with open(path, "rb") as f:
+                return reporter.report_filename, f.read()
+
+    def http_server(self, host="127.0.0.1", port=8080, socket_path=None):
+        """
+        Provide the HTTP server that serves requests with this object.
+
+        Requests are handled one at a time so that repositories are only refreshed
+        between requests.
+
+        :param str host: The address to listen on
+        :param int port: The port to listen on
+        :param str socket_path: Listen on a Unix socket at this path instead
+
+        :returns: A socketserver.BaseServer object
+        """
+        handler = type("Handler", (_RequestHandler,), {"harvest": self})
+        if socket_path:
+            if os.path.exists(socket_path):
+                os.remove(socket_path)
+            return _UnixHTTPServer(socket_path, handler)
+        return HTTPServer((host, port), handler)
+
+
+class _UnixHTTPServer(socketserver.UnixStreamServer):
+    def server_close(self):
+        super().server_close()
+        if os.path.exists(self.server_address):
+            os.remove(self.server_address)
+
+
+class _RequestHandler(BaseHTTPRequestHandler):
+    harvest = None
+
+    def address_string(self):
+        return self.client_address[0] if self.client_address else "unix"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        query = {k: v[-1] for k, v in parse_qs(parsed.query).items()}
+        handler = getattr(self, f"_get_{parsed.path.strip('/')}", None)
+        if not handler:
+            self._send(HTTPStatus.NOT_FOUND, f"{parsed.path} is not found")
+            return
+        try:
+            repo = {
+                "repo": query.pop("repo"),
+                "branch": query.pop("branch", "master"),
+                "repo_path": query.pop("repo_path", None),
+            }
+            handler(repo, query)
+        except KeyError as e:
+            self._send(HTTPStatus.BAD_REQUEST, f"{e.args[0]} parameter is required")
+        except FileMissingError as e:
+            self._send(HTTPStatus.NOT_FOUND, str(e))
+        except (ValueError, RuntimeError) as e:
+            self._send(HTTPStatus.BAD_REQUEST, str(e))
+        except Exception as e:
+            self._send(HTTPStatus.INTERNAL_SERVER_ERROR, str(e))
+
+    def _get_content(self, repo, query):
+        content = self.harvest.content(
+            query["filepath"], _date(query.get("date")), **repo
+        )
+        if content is None:
+            self._send(HTTPStatus.NOT_FOUND, f'{query["filepath"]} is not found')
+            return
+        self._send(HTTPStatus.OK, content, "application/octet-stream")
+
+    def _get_collate(self, repo, query):
+        end = _date(query.get("end")) or datetime.today()
+        start = _date(query.get("start")) or end
+        stream = io.StringIO()
+        self.harvest.collate(stream, query["filepath"], start, end, **repo)
+        self._send(HTTPStatus.OK, stream.getvalue(), "application/jsonl")
+
+    def _get_report(self, repo, query):
+        filename, content = self.harvest.report(
+            query["package"],
+            query["name"],
+            json.loads(query.get("config", "{}")),
+            **repo,
+        )
+        self._send(
+            HTTPStatus.OK,
+            content,
+            "application/octet-stream",
+            {"Content-Disposition": f'attachment; filename="{filename}"'},
+        )
+
+    def _send(self, status, body, content_type="text/plain", headers=None):
+        if isinstance(body, str):
+            body = body.encode()
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def _date(value):
+    if not value:
+        return None
+    return datetime.strptime(value, "%Y-%m-%d" if "-" in value else "%Y%m%d")
+
+
+def _repo_url(url):
+    url = url.rstrip("/")
+    return url[: -len(".git")] if url.endswith(".git") else url
+
+
+def _day(dt):
+    return datetime(dt.year, dt.month, dt.day)
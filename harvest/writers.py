@@ -0,0 +1,182 @@
+# Copyright (c) 2020 IBM Corp. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Harvest report writers."""
+
+import csv
+import json
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+WRITERS = {}
+
+
+def register_writer(extension, writer):
+    """
+    Register the writer of reports with a file extension.
+
+    :param str extension: The report file extension, like "csv"
+    :param writer: The ReportWriter sub-class
+    """
+    WRITERS[extension.lower()] = writer
+
+
+def get_writer(extension):
+    """
+    Provide the writer of reports with a file extension.
+
+    Extensions without a registered writer are written as text.
+
+    :param str extension: The report file extension, like "csv"
+
+    :returns: The ReportWriter sub-class
+    """
+    return WRITERS.get(extension.lower(), TextWriter)
+
+
+class ReportWriter(object):
+    """Base report writer.  Writes report content to an open file."""
+
+    binary = False
+
+    def __init__(self, f):
+        """
+        Construct the writer object.
+
+        :param f: The open report file, binary when the writer is binary
+        """
+        self.file = f
+
+    @classmethod
+    def available(cls):
+        """Check whether the writer's dependencies are installed."""
+        return True
+
+    def write_text(self, text):
+        """
+        Write report content rendered as text.
+
+        :param str text: The report content
+        """
+        self.file.write(text)
+
+    def write_rows(self, rows):
+        """
+        Write a batch of report rows.
+
+        :param list rows: The report rows
+        """
+        raise NotImplementedError("Method implemented by sub-classes")
+
+    def close(self):
+        """Finish writing the report."""
+        pass
+
+
+class TextWriter(ReportWriter):
+    """Write each row as is."""
+
+    def write_rows(self, rows):
+        """
+        Write a batch of report rows as strings.
+
+        :param list rows: The report rows as strings
+        """
+        self.file.writelines(rows)
+
+
+class CsvWriter(ReportWriter):
+    """Write rows with a header taken from the first row's keys."""
+
+    def __init__(self, f):
+        """
+        Construct the writer object.
+
+        :param f: The open report file
+        """
+        super().__init__(f)
+        self.writer = None
+
+    def write_rows(self, rows):
+        """
+        Write a batch of report rows as CSV records.
+
+        :param list rows: The report rows as dictionaries
+        """
+        if self.writer is None:
+            self.writer = csv.DictWriter(self.file, fieldnames=rows[0].keys())
+            self.writer.writeheader()
+        self.writer.writerows(rows)
+
+
+class JsonLinesWriter(ReportWriter):
+    """Write each row as a line of JSON."""
+
+    def write_rows(self, rows):
+        """
+        Write a batch of report rows as JSON lines.
+
+        :param list rows: The JSON serializable report rows
+        """
+        self.file.write("".join(json.dumps(row, default=str) + "\n" for row in rows))
+
+
+class ParquetWriter(ReportWriter):
+    """Write rows as Parquet row groups with the types of the first batch."""
+
+    binary = True
+
+    def __init__(self, f):
+        """
+        Construct the writer object.
+
+        :param f: The open binary report file
+        """
+        super().__init__(f)
+        self.writer = None
+
+    @classmethod
+    def available(cls):
+        """Check whether pyarrow is installed."""
+        return pyarrow is not None
+
+    def write_text(self, text):
+        """Reject text content, Parquet reports are written from rows."""
+        raise ValueError("parquet reports must be generated as a list of rows")
+
+    def write_rows(self, rows):
+        """
+        Write a batch of report rows as a Parquet row group.
+
+        :param list rows: The report rows as dictionaries
+        """
+        table = pyarrow.Table.from_pylist(
+            rows, schema=self.writer.schema if self.writer else None
+        )
+        if self.writer is None:
+            self.writer = pyarrow.parquet.ParquetWriter(self.file, table.schema)
+        self.writer.write_table(table)
+
+    def close(self):
+        """Write the Parquet footer."""
+        if self.writer is not None:
+            self.writer.close()
+
+
+register_writer("csv", CsvWriter)
+register_writer("jsonl", JsonLinesWriter)
+register_writer("parquet", ParquetWriter)
@@ -0,0 +1,49 @@
+# Copyright (c) 2020 IBM Corp. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Git repository fixture with a dated commit history."""
+
+import os
+
+import git
+
+
+def make_repo(path, history, origin="https://github.com/foo/bar.git"):
+    """
+    Create a git repository whose commits are dated as provided.
+
+    :param str path: The location of the new repository
+    :param list history: (datetime, {filepath: content}) tuples in commit order
+    :param str origin: The origin remote URL
+
+    :returns: the git.Repo object
+    """
+    repo = git.Repo.init(path, initial_branch="master")
+    with repo.config_writer() as config:
+        config.set_value("user", "name", "harvest")
+        config.set_value("user", "email", "harvest@example.com")
+    repo.create_remote("origin", origin)
+    for commit_dt, files in history:
+        for filepath, content in files.items():
+            full_path = os.path.join(path, filepath)
+            os.makedirs(os.path.dirname(full_path), exist_ok=True)
+            with open(full_path, "w") as f:
+                f.write(content)
+            repo.git.add(filepath)
+        date = f"{int(commit_dt.timestamp())} +0000"
+        repo.git.commit(
+            "-m",
+            f"Evidence for {commit_dt.isoformat()}",
+            env={"GIT_AUTHOR_DATE": date, "GIT_COMMITTER_DATE": date},
+        )
+    return repo
@@ -0,0 +1,165 @@
+# Copyright (c) 2020 IBM Corp. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Harvest asyncio collator tests."""
+
+import asyncio
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from test.fixtures.git_repo import make_repo
+
+from harvest.aio import AsyncCollator
+from harvest.audit import COMMAND, OBJECT
+from harvest.cache import BlobCache
+from harvest.collator import Collator
+from harvest.exceptions import FileMissingError
+
+
+class TestAsyncCollator(unittest.TestCase):
+    """Test the asyncio collator."""
+
+    def setUp(self):
+        """Create a repository with a commit on each of thirty days."""
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.repo = make_repo(
+            self.tmpdir.name,
+            [
+                (
+                    datetime(2020, 1, 1, 12) + timedelta(days=d),
+                    {"raw/foo.json": f'{{"day": {d % 10}}}'},
+                )
+                for d in range(30)
+            ],
+        )
+        self.args = ["https://github.com/foo/bar", None, "master", self.tmpdir.name]
+        self.loop = asyncio.new_event_loop()
+
+    def tearDown(self):
+        """Close the event loop and clean up the repository."""
+        self.loop.close()
+        self.tmpdir.cleanup()
+
+    def _run(self, coro):
+        return self.loop.run_until_complete(coro)
+
+    def test_read(self):
+        """Ensures the same versions are read as by the Collator."""
+        from_dt, until_dt = datetime(2019, 12, 25), datetime(2020, 1, 20)
+        expected = Collator(*self.args, granularity="weekly").read(
+            "raw/foo.json", from_dt, until_dt
+        )
+
+        async def read():
+            async with AsyncCollator(*self.args, granularity="weekly") as collator:
+                return await collator.read("raw/foo.json", from_dt, until_dt)
+
+        commits = self._run(read())
+        self.assertEqual([c.hexsha for c in commits], [c.hexsha for c in expected])
+        self.assertEqual(
+            [c.committed_date for c in commits], [c.committed_date for c in expected]
+        )
+        with self.assertRaises(FileMissingError):
+            self._run(read_missing(self.args))
+
+    def test_concurrent_content(self):
+        """Ensures concurrent lookups share the cat-file processes."""
+        collator = AsyncCollator(*self.args, blob_cache=BlobCache())
+
+        async def lookups():
+            async with collator:
+                commits = await collator.read(
+                    "raw/foo.json", datetime(2020, 1, 1), datetime(2020, 1, 30)
+                )
+                return await asyncio.gather(
+                    *[collator.content(c, "raw/foo.json") for c in commits * 5]
+                )
+
+        contents = self._run(lookups())
+        self.assertEqual(
+            contents, [f'{{"day": {d % 10}}}'.encode() for d in reversed(range(30))] * 5
+        )
+        self.assertEqual(collator.audit.count(COMMAND, "cat-file"), 0)
+        self.assertEqual(collator.audit.count(OBJECT, "info"), 150)
+        self.assertEqual(collator.audit.count(OBJECT, "stream"), 10)
+        self.assertEqual(collator.audit.notes["revision"], self.repo.head.commit.hexsha)
+
+    def test_missing_content(self):
+        """Ensures a file missing from a commit is reported."""
+
+        async def lookup():
+            async with AsyncCollator(*self.args) as collator:
+                commit = self.repo.head.commit
+                self.assertEqual(
+                    await collator.content(commit, "raw/foo.json"), b'{"day": 9}'
+                )
+                await collator.content(commit, "raw/bar.json")
+
+        with self.assertRaises(KeyError):
+            self._run(lookup())
+
+    def test_versions(self):
+        """Ensures versions are provided oldest first with their content."""
+
+        async def versions():
+            async with AsyncCollator(*self.args, select="$.day") as collator:
+                return [
+                    v
+                    async for v in collator.versions(
+                        "raw/foo.json", datetime(2020, 1, 28), datetime(2020, 1, 30)
+                    )
+                ]
+
+        versions = self._run(versions())
+        self.assertEqual(
+            [v.date for v in versions], ["2020-01-28", "2020-01-29", "2020-01-30"]
+        )
+        self.assertEqual([v.content for v in versions], [b"7", b"8", b"9"])
+        self.assertEqual(versions[0].name, "20200128_foo.json")
+        self.assertEqual(versions[0].revision, self.repo.head.commit.hexsha)
+
+    def test_branch(self):
+        """Ensures a repository is read as of the branch collated."""
+        self.repo.git.checkout("-b", "dev")
+        self.repo.git.commit("--allow-empty", "-m", "Evidence")
+        dev = self.repo.head.commit.hexsha
+        self.repo.git.checkout("master")
+        for branch, expected in (
+            ("dev", dev),
+            ("master", self.repo.head.commit.hexsha),
+        ):
+            args = [self.args[0], None, branch, self.tmpdir.name]
+            self.assertEqual(self._run(AsyncCollator(*args).revision()), expected)
+
+    def test_wrapped_collator(self):
+        """Ensures the wrapped Collator checks out and audits the repository."""
+        collator = AsyncCollator(*self.args)
+        self.assertNotIsInstance(collator, Collator)
+        snapshot = self._run(collator.revision())
+        self.assertEqual(collator.collator.snapshot, snapshot)
+        self.assertIs(collator.audit, collator.collator.audit)
+        self.assertEqual(collator.collator.files(), ["raw/foo.json"])
+
+    def test_invalid_rev(self):
+        """Ensures an unknown revision is reported."""
+        collator = AsyncCollator(*self.args, rev="nope")
+        with self.assertRaises(ValueError) as cm:
+            self._run(collator.revision())
+        self.assertEqual(str(cm.exception), "nope is not a valid revision")
+
+
+async def read_missing(args):
+    async with AsyncCollator(*args) as collator:
+        return await collator.read(
+            "raw/bar.json", datetime(2020, 1, 1), datetime(2020, 1, 30)
+        )
@@ -0,0 +1,179 @@
+# Copyright (c) 2020 IBM Corp. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Harvest git audit tests."""
+
+import json
+import os
+import tempfile
+import threading
+import unittest
+from datetime import datetime, timedelta
+from test.fixtures.git_repo import make_repo
+
+from harvest.audit import COMMAND, OBJECT, GitAudit
+from harvest.collator import Collator
+
+
+class TestGitAudit(unittest.TestCase):
+    """Test GitAudit."""
+
+    def setUp(self):
+        """Initialize supporting test objects before each test."""
+        self.audit = GitAudit(max_entries=None)
+        self.audit.record(COMMAND, ["git", "rev-list", "--max-count=1", "HEAD"], 0.5)
+        self.audit.record(COMMAND, ["git", "cat-file", "--batch"], 0.25, 0, True)
+        self.audit.record(OBJECT, ["stream", "foo-hexsha"], 0.125, 100)
+        self.audit.record(OBJECT, ["stream", "bar-hexsha"], 0.125, 50)
+
+    def test_count(self):
+        """Ensures requests are counted by kind and name."""
+        self.assertEqual(self.audit.count(), 4)
+        self.assertEqual(self.audit.count(COMMAND), 2)
+        self.assertEqual(self.audit.count(COMMAND, "rev-list"), 1)
+        self.assertEqual(self.audit.count(OBJECT, "stream"), 2)
+        self.assertEqual(self.audit.count(OBJECT, "info"), 0)
+
+    def test_totals(self):
+        """Ensures bytes and durations are totalled by kind."""
+        self.assertEqual(self.audit.nbytes(OBJECT), 150)
+        self.assertEqual(self.audit.duration(COMMAND), 0.75)
+        self.assertEqual(
+            self.audit.summary(),
+            {
+                COMMAND: {"count": 2, "bytes": 0, "duration": 0.75},
+                OBJECT: {"count": 2, "bytes": 150, "duration": 0.25},
+            },
+        )
+        self.assertTrue(self.audit.entries[1]["streamed"])
+
+    def test_entries_not_kept(self):
+        """Ensures only totals are kept in memory by default."""
+        audit = GitAudit()
+        self.assertIsNone(audit.record(COMMAND, ["git", "rev-list", "HEAD"], 0.5, 10))
+        self.assertEqual(len(audit.entries), 0)
+        self.assertEqual(
+            audit.requests(),
+            {(COMMAND, "rev-list"): {"count": 1, "bytes": 10, "duration": 0.5}},
+        )
+        audit = GitAudit(max_entries=2)
+        for _ in range(3):
+            audit.record(OBJECT, ["stream", "foo-hexsha"], 0.125, 100)
+        self.assertEqual(len(audit.entries), 2)
+        self.assertEqual(audit.count(OBJECT, "stream"), 3)
+        audit.reset()
+        self.assertEqual((len(audit.entries), audit.count()), (0, 0))
+
+    def test_concurrent_totals(self):
+        """Ensures totals are read while other threads record entries."""
+
+        def record():
+            for _ in range(2000):
+                self.audit.record(OBJECT, ["info", "baz-hexsha"], 0)
+
+        threads = [threading.Thread(target=record) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        while any(thread.is_alive() for thread in threads):
+            self.audit.count(OBJECT, "info")
+            self.audit.requests()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.audit.count(OBJECT, "info"), 6000)
+
+    def test_redacts_credentials(self):
+        """Ensures tokens embedded in URLs are not recorded."""
+        entry = self.audit.record(
+            COMMAND, ["git", "clone", "https://my-token@github.com/foo/bar.git"], 1
+        )
+        self.assertEqual(
+            entry["command"][2], "https://**********@github.com/foo/bar.git"
+        )
+
+    def test_log_file(self):
+        """Ensures entries and a closing summary are written to the log file."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            log_path = os.path.join(tmpdir, "audit.jsonl")
+            audit = GitAudit(log_path)
+            audit.record(COMMAND, ["git", "fetch"], 1.5, 10)
+            audit.close()
+            with open(log_path) as f:
+                lines = [json.loads(line) for line in f]
+        self.assertEqual(len(lines), 2)
+        self.assertEqual(lines[0]["command"], ["git", "fetch"])
+        self.assertEqual(lines[1]["summary"][COMMAND]["count"], 1)
+
+
+class TestGitAuditBudget(unittest.TestCase):
+    """Test git request budgets against a real repository."""
+
+    def setUp(self):
+        """Create a repository with one commit per day for ten days."""
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.start = datetime(2020, 1, 1, 12)
+        make_repo(
+            self.tmpdir.name,
+            [
+                (self.start + timedelta(days=d), {"raw/foo.json": f'{{"day": {d}}}'})
+                for d in range(10)
+            ],
+        )
+
+    def tearDown(self):
+        """Clean up the repository."""
+        self.tmpdir.cleanup()
+
+    def test_read_budget(self):
+        """Ensures reading ten days of history stays within its git budget."""
+        collator = Collator(
+            "https://github.com/foo/bar", None, "master", self.tmpdir.name
+        )
+        commits = collator.read(
+            "raw/foo.json", datetime(2020, 1, 1), datetime(2020, 1, 10)
+        )
+        self.assertEqual(len(commits), 10)
+        self.assertEqual(collator.audit.count(COMMAND, "rev-list"), 1)
+        self.assertLessEqual(collator.audit.count(COMMAND, "cat-file"), 2)
+        self.assertLessEqual(collator.audit.count(OBJECT), 20)
+
+    def test_read_in_process_odb_budget(self):
+        """Ensures the in-process object database spawns no cat-file process."""
+        collator = Collator(
+            "https://github.com/foo/bar", None, "master", self.tmpdir.name, odb="gitdb"
+        )
+        commits = collator.read(
+            "raw/foo.json", datetime(2020, 1, 1), datetime(2020, 1, 10)
+        )
+        self.assertEqual(len(commits), 10)
+        self.assertEqual(collator.audit.count(COMMAND, "cat-file"), 0)
+        self.assertGreater(collator.audit.count(OBJECT), 0)
+
+    def test_write_budget(self):
+        """Ensures writing ten versions makes no git subprocess calls."""
+        collator = Collator(
+            "https://github.com/foo/bar", None, "master", self.tmpdir.name
+        )
+        commits = collator.read(
+            "raw/foo.json", datetime(2020, 1, 1), datetime(2020, 1, 10)
+        )
+        collator.audit.reset()
+        cwd = os.getcwd()
+        with tempfile.TemporaryDirectory() as outdir:
+            os.chdir(outdir)
+            try:
+                collator.write("raw/foo.json", commits)
+            finally:
+                os.chdir(cwd)
+        self.assertEqual(collator.audit.count(COMMAND), 0)
+        self.assertLessEqual(collator.audit.count(OBJECT, "stream"), 30)
+        self.assertGreater(collator.audit.nbytes(OBJECT), 0)
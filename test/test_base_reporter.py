@@ -14,16 +14,22 @@
 """Harvest base reporter tests."""
 
 import csv
+import gzip
+import json
 import os
 import tempfile
 import unittest
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from test.fixtures.bar_fixture_report import BarFixtureReport
-from unittest.mock import create_autospec, patch
+from test.fixtures.git_repo import make_repo
+from unittest.mock import MagicMock, create_autospec, patch
 
 from git import Blob, Commit
 
+from harvest.cache import CheckpointCache
 from harvest.exceptions import FileMissingError
+from harvest import reporter as reporter_module
 from harvest.reporter import BaseReporter
 
 from pkg_resources import resource_filename
@@ -188,6 +194,21 @@ class TestBaseReporter(unittest.TestCase):
         self.assertEqual(rows[1], ["foo", "bar", "baz"])
         os.remove(rpt_path)
 
+    def test_write_compressed_csv_content(self):
+        """Ensures a csv file is compressed as it is written."""
+
+        class CSVTestReporter(BaseReporter):
+            @property
+            def report_filename(self):
+                return "foo.csv"
+
+        reporter = CSVTestReporter(*self.args)
+        with tempfile.TemporaryDirectory() as location:
+            reporter.write([{"FOO": "foo", "BAR": "bar"}], location, "gzip")
+            self.assertEqual(os.listdir(location), ["foo.csv.gz"])
+            with gzip.open(os.path.join(location, "foo.csv.gz"), "rt") as f:
+                self.assertEqual(list(csv.reader(f)), [["FOO", "BAR"], ["foo", "bar"]])
+
     def test_write_content_using_template(self):
         """Ensures report is written based on template."""
         reporter = BarFixtureReport(*self.args)
@@ -197,3 +218,262 @@ class TestBaseReporter(unittest.TestCase):
         self.assertTrue(os.path.exists(rpt_path))
         self.assertTrue(open(rpt_path).read(), "**foo bar baz**")
         os.remove(rpt_path)
+
+    def test_get_file_versions(self):
+        """Ensures sampled file versions are returned oldest first."""
+        with tempfile.TemporaryDirectory() as repo_path:
+            make_repo(
+                repo_path,
+                [
+                    (datetime(2020, 1, 1, 12) + timedelta(days=d), {"foo.txt": str(d)})
+                    for d in range(0, 60, 5)
+                ],
+                origin="https://github.com/org/repo.git",
+            )
+            reporter = BaseReporter(self.args[0], None, "master", repo_path)
+            versions = reporter.get_file_versions(
+                "foo.txt", datetime(2020, 1, 1), datetime(2020, 2, 29), "monthly"
+            )
+            self.assertEqual(
+                [(v.date, v.data) for v in versions],
+                [("2020-01-31", 30), ("2020-02-25", 55)],
+            )
+            self.assertEqual(
+                reporter.get_file_versions(
+                    "bar.txt", datetime(2020, 1, 1), datetime(2020, 2, 29)
+                ),
+                [],
+            )
+
+    def test_get_file_content_thread_pool(self):
+        """Ensures file content can be retrieved from a thread pool."""
+        with tempfile.TemporaryDirectory() as repo_path:
+            make_repo(
+                repo_path,
+                [
+                    (datetime(2020, 1, 1, 12) + timedelta(days=d), {"foo.txt": str(d)})
+                    for d in range(30)
+                ],
+                origin="https://github.com/org/repo.git",
+            )
+            reporter = BaseReporter(self.args[0], None, "master", repo_path)
+            days = [datetime(2020, 1, 1) + timedelta(days=d) for d in range(30)]
+            with ThreadPoolExecutor(max_workers=6) as executor:
+                contents = list(
+                    executor.map(
+                        lambda day: reporter.get_file_content("foo.txt", day), days * 4
+                    )
+                )
+            self.assertEqual(contents, [str(d).encode() for d in range(30)] * 4)
+
+    @patch("harvest.reporter.numpy", None)
+    def test_get_file_columns(self):
+        """Ensures field values are returned as columns by sample date."""
+        with tempfile.TemporaryDirectory() as repo_path:
+            make_repo(
+                repo_path,
+                [
+                    (
+                        datetime(2020, 1, d, 12),
+                        {"foo.json": f'{{"checks": {{"pass": {d}}}, "x": [{d}]}}'},
+                    )
+                    for d in (2, 4)
+                ],
+                origin="https://github.com/org/repo.git",
+            )
+            reporter = BaseReporter(self.args[0], None, "master", repo_path)
+            with patch("harvest.reporter.json.loads", wraps=json.loads) as loads:
+                columns = reporter.get_file_columns(
+                    "foo.json",
+                    datetime(2020, 1, 1),
+                    datetime(2020, 1, 5),
+                    ["$.checks.pass", "x[0]", "missing"],
+                )
+            self.assertEqual(loads.call_count, 2)
+        self.assertEqual(
+            columns,
+            {
+                "date": [datetime(2020, 1, d) for d in (2, 3, 4, 5)],
+                "$.checks.pass": [2, 2, 4, 4],
+                "x[0]": [2, 2, 4, 4],
+                "missing": [None] * 4,
+            },
+        )
+
+    def test_get_daily_results(self):
+        """Ensures only new days and days with changed files are computed."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            repo_path = os.path.join(tmpdir, "repo")
+            repo = make_repo(
+                repo_path,
+                [
+                    (datetime(2020, 1, 2, 12), {"foo.json": "1", "bar.json": "1"}),
+                    (datetime(2020, 1, 4, 12), {"foo.json": "2"}),
+                ],
+                origin="https://github.com/org/repo.git",
+            )
+            computed = []
+
+            def compute(day, contents):
+                computed.append(day.day)
+                return {f: c and int(c) for f, c in sorted(contents.items())}
+
+            def results(until_dt, **config):
+                reporter = BaseReporter(
+                    self.args[0], None, "master", repo_path, **config
+                )
+                reporter.checkpoints = CheckpointCache(os.path.join(tmpdir, "cp"))
+                return reporter.get_daily_results(
+                    ["foo.json", "bar.json"], datetime(2020, 1, 1), until_dt, compute
+                )
+
+            first = results(datetime(2020, 1, 5))
+            self.assertEqual(computed, [1, 2, 3, 4, 5])
+            self.assertEqual(
+                first[0], (datetime(2020, 1, 1), {"bar.json": None, "foo.json": None})
+            )
+            self.assertEqual(
+                first[-1], (datetime(2020, 1, 5), {"bar.json": 1, "foo.json": 2})
+            )
+            self.assertEqual(results(datetime(2020, 1, 5)), first)
+            self.assertEqual(computed, [1, 2, 3, 4, 5])
+            date = f"{int(datetime(2020, 1, 6, 12).timestamp())} +0000"
+            with open(os.path.join(repo_path, "bar.json"), "w") as f:
+                f.write("3")
+            repo.git.commit("-am", "Evidence", env={"GIT_COMMITTER_DATE": date})
+            computed.clear()
+            self.assertEqual(results(datetime(2020, 1, 6))[:-1], first)
+            self.assertEqual(computed, [6])
+            computed.clear()
+            results(datetime(2020, 1, 6), foo="bar")
+            self.assertEqual(computed, [1, 2, 3, 4, 5, 6])
+
+    def test_get_daily_results_json(self):
+        """Ensures checkpointed results are the same whether reused or not."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            reporter = BaseReporter(*self.args)
+            reporter.collator = MagicMock()
+            reporter.collator.read.side_effect = FileMissingError()
+            reporter.checkpoints = CheckpointCache(tmpdir)
+            with patch.object(reporter.checkpoints, "key", return_value="key"):
+                runs = [
+                    reporter.get_daily_results(
+                        ["foo.json"],
+                        datetime(2020, 1, 1),
+                        datetime(2020, 1, 1),
+                        lambda day, contents: {1: (1, "x")},
+                    )
+                    for _ in range(2)
+                ]
+            self.assertEqual(runs[0], [(datetime(2020, 1, 1), {"1": [1, "x"]})])
+            self.assertEqual(runs[1], runs[0])
+            self.assertEqual(reporter.checkpoints.hits, 1)
+
+    def test_prefetch(self):
+        """Ensures declared inputs are read once and provided from memory."""
+        with tempfile.TemporaryDirectory() as repo_path:
+            make_repo(
+                repo_path,
+                [
+                    (datetime(2020, 1, 2, 12), {"raw/a.json": "a1", "raw/b.json": "b"}),
+                    (datetime(2020, 1, 4, 12), {"raw/a.json": "a2", "foo.txt": "f"}),
+                ],
+                origin="https://github.com/org/repo.git",
+            )
+
+            class InputsReport(BaseReporter):
+                inputs = ["raw/*.json", "missing.json"]
+
+                def get_inputs(self):
+                    patterns, _, _ = super().get_inputs()
+                    return patterns, datetime(2020, 1, 1), datetime(2020, 1, 5)
+
+            reporter = InputsReport(self.args[0], None, "master", repo_path)
+            self.assertEqual(
+                reporter.prefetch(), ["missing.json", "raw/a.json", "raw/b.json"]
+            )
+            self.assertEqual(reporter.collator.audit.count("command", "log"), 1)
+            self.assertEqual(reporter.collator.audit.count("command", "rev-list"), 0)
+            with patch.object(reporter.collator, "read") as read_mock:
+                contents = [
+                    reporter.get_file_content("raw/a.json", datetime(2020, 1, d))
+                    for d in range(1, 6)
+                ]
+                self.assertIsNone(
+                    reporter.get_file_content("missing.json", datetime(2020, 1, 3))
+                )
+                self.assertEqual(
+                    reporter.get_file_content("raw/b.json", datetime(2020, 1, 3, 9)),
+                    b"b",
+                )
+            read_mock.assert_not_called()
+            self.assertEqual(contents, [None, b"a1", b"a1", b"a2", b"a2"])
+            self.assertEqual(reporter.get_file_content("foo.txt"), b"f")
+        self.assertEqual(BaseReporter(*self.args).prefetch(), [])
+
+    def test_get_file_columns_numpy(self):
+        """Ensures columns are NumPy arrays when NumPy is installed."""
+        numpy_mock = MagicMock()
+        reporter = BaseReporter(*self.args)
+        reporter.collator = MagicMock()
+        reporter.collator.read.side_effect = FileMissingError()
+        with patch("harvest.reporter.numpy", numpy_mock):
+            columns = reporter.get_file_columns(
+                "foo.json", datetime(2020, 1, 1), datetime(2020, 1, 5), ["foo"]
+            )
+        self.assertEqual(columns["foo"], numpy_mock.array.return_value)
+        numpy_mock.array.assert_any_call([], dtype="datetime64[D]")
+        numpy_mock.array.assert_any_call([], dtype=None)
+
+    @unittest.skipUnless(reporter_module.numpy, "numpy not installed")
+    def test_get_file_columns_numpy_lists(self):
+        """Ensures list values are kept as the elements of object columns."""
+        numpy = reporter_module.numpy
+        with tempfile.TemporaryDirectory() as repo_path:
+            make_repo(
+                repo_path,
+                [
+                    (
+                        datetime(2020, 1, d, 12),
+                        {"foo.json": json.dumps({"n": d, "failed": list(range(d))})},
+                    )
+                    for d in (1, 2, 3)
+                ],
+                origin="https://github.com/org/repo.git",
+            )
+            reporter = BaseReporter(self.args[0], None, "master", repo_path)
+            columns = reporter.get_file_columns(
+                "foo.json",
+                datetime(2020, 1, 1),
+                datetime(2020, 1, 3),
+                ["n", "failed", "failed[0]"],
+            )
+        self.assertEqual(columns["date"].dtype, numpy.dtype("datetime64[D]"))
+        self.assertEqual(columns["n"].tolist(), [1, 2, 3])
+        self.assertEqual(columns["failed"].shape, (3,))
+        self.assertEqual(columns["failed"].dtype, object)
+        self.assertEqual(columns["failed"].tolist(), [[0], [0, 1], [0, 1, 2]])
+        self.assertEqual(columns["failed[0]"].tolist(), [0, 0, 0])
+
+    def test_open_file(self):
+        """Ensures large file content is spooled to disk and read in lines."""
+        lines = "".join(f"line {n}\n" for n in range(1000))
+        with tempfile.TemporaryDirectory() as repo_path:
+            make_repo(
+                repo_path,
+                [(datetime(2020, 1, 1, 12), {"big.txt": lines, "empty.txt": ""})],
+                origin="https://github.com/org/repo.git",
+            )
+            reporter = BaseReporter(self.args[0], None, "master", repo_path)
+            with patch("harvest.reporter.SPOOL_MAX_SIZE", 1024):
+                with reporter.open_file("big.txt", datetime(2020, 1, 2)) as f:
+                    self.assertTrue(f._rolled)
+                    self.assertEqual(next(iter(f)), b"line 0\n")
+                    self.assertEqual(len(f.readlines()), 999)
+            with reporter.open_file("big.txt", memory_map=True) as view:
+                self.assertEqual(view.readline(), b"line 0\n")
+                self.assertEqual(len(view), len(lines))
+            with reporter.open_file("empty.txt", memory_map=True) as f:
+                self.assertEqual(f.read(), b"")
+            with reporter.open_file("bar.txt") as f:
+                self.assertIsNone(f)
@@ -0,0 +1,227 @@
+# Copyright (c) 2020 IBM Corp. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Harvest cache tests."""
+
+import os
+import tempfile
+import unittest
+from datetime import datetime
+from test.fixtures.git_repo import make_repo
+from unittest.mock import patch
+
+from git import Repo
+
+from harvest.cache import (
+    BlobCache,
+    CheckpointCache,
+    CloneCache,
+    ReportCache,
+    prune,
+)
+from harvest.cli import Harvest
+from harvest.reporter import BaseReporter
+
+
+class TestBlobCache(unittest.TestCase):
+    """Test the blob cache."""
+
+    def test_evicts_least_recently_used(self):
+        """Ensures the least recently used blobs are evicted first."""
+        cache = BlobCache(max_bytes=6)
+        cache.put("a", b"aa")
+        cache.put("b", b"bb")
+        cache.put("c", b"cc")
+        self.assertEqual(cache.get("a"), b"aa")
+        cache.put("d", b"dd")
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(len(cache), 3)
+        self.assertEqual(cache.nbytes, 6)
+        cache.put("e", b"too large")
+        self.assertIsNone(cache.get("e"))
+        self.assertEqual((cache.hits, cache.misses), (1, 2))
+
+
+class TestReportCache(unittest.TestCase):
+    """Test the report cache through the report sub-command."""
+
+    def setUp(self):
+        """Create a repository and change to an empty directory."""
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.repo_path = os.path.join(self.tmpdir.name, "repo")
+        self.repo = make_repo(
+            self.repo_path, [(datetime(2020, 1, 1, 12), {"foo.json": "{}"})]
+        )
+        self.cache_dir = os.path.join(self.tmpdir.name, "cache")
+        self.out_dir = os.path.join(self.tmpdir.name, "out")
+        os.mkdir(self.out_dir)
+        self.cwd = os.getcwd()
+        os.chdir(self.out_dir)
+
+    def tearDown(self):
+        """Clean up after each test."""
+        os.chdir(self.cwd)
+        self.tmpdir.cleanup()
+
+    def _report(self, *args):
+        Harvest().run(
+            [
+                "report",
+                "local",
+                "test.fixtures",
+                "foo_fixture_report",
+                "--repo-path",
+                self.repo_path,
+                "--cache-dir",
+                self.cache_dir,
+                *args,
+            ]
+        )
+
+    @patch(
+        "harvest.reporter.BaseReporter.write",
+        autospec=True,
+        side_effect=BaseReporter.write,
+    )
+    def test_report_reused(self, write_mock):
+        """Ensures identical runs reuse the report until something changes."""
+        self._report("--cache")
+        os.remove("foo_fixture_report.csv")
+        self._report("--cache")
+        self.assertEqual(write_mock.call_count, 1)
+        with open("foo_fixture_report.csv") as f:
+            self.assertEqual(f.read(), "FOO,BAR\nfoo,bar\n")
+        self._report("--cache", "--config", '{"foo": "bar"}')
+        self.assertEqual(write_mock.call_count, 2)
+        self._report("--cache", "--refresh-cache")
+        self.assertEqual(write_mock.call_count, 3)
+        with open(os.path.join(self.repo_path, "foo.json"), "w") as f:
+            f.write('{"foo": 1}')
+        self.repo.git.commit("-am", "Evidence")
+        self._report("--cache")
+        self.assertEqual(write_mock.call_count, 4)
+        self.assertEqual(len(os.listdir(self.cache_dir)), 3)
+
+    def test_key_includes_template(self):
+        """Ensures the report template is part of the key."""
+        reporter = type("Report", (object,), {"config": {}, "template_path": None})
+        module = os.path.join(self.tmpdir.name, "report.py")
+        with open(module, "w") as f:
+            f.write("# report")
+        cache = ReportCache(self.cache_dir)
+        key = cache.key(reporter(), module, "sha")
+        template = os.path.join(self.tmpdir.name, "report.md.tmpl")
+        with open(template, "w") as f:
+            f.write("{{ data }}")
+        reporter.template_path = template
+        self.assertNotEqual(cache.key(reporter(), module, "sha"), key)
+        self.assertNotEqual(cache.key(reporter(), module, "sha", foo="bar"), key)
+
+
+class TestCheckpointCache(unittest.TestCase):
+    """Test the report checkpoint cache."""
+
+    def test_results_keyed_by_inputs(self):
+        """Ensures a day's result is only reused for the same inputs."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            cache = CheckpointCache(tmpdir)
+            key = cache.key(BaseReporter("https://github.com/foo/bar", None, "master"))
+            day = datetime(2020, 1, 1)
+            self.assertIsNone(cache.get(key, day, {"foo.json": "a"}))
+            cache.put(key, day, {"foo.json": "a"}, {"passed": 3})
+            self.assertEqual(cache.get(key, day, {"foo.json": "a"}), {"passed": 3})
+            self.assertIsNone(cache.get(key, day, {"foo.json": "b"}))
+            self.assertIsNone(cache.get(key, datetime(2020, 1, 2), {"foo.json": "a"}))
+            self.assertEqual((cache.hits, cache.misses), (1, 3))
+            self.assertEqual(os.listdir(os.path.join(tmpdir, key)), ["2020-01-01.json"])
+            self.assertEqual(
+                [(e["cache"], e["name"]) for e in cache.entries()],
+                [("checkpoint", key)],
+            )
+            reporter = BaseReporter("https://github.com/foo/bar", None, "master", x=1)
+            self.assertNotEqual(cache.key(reporter), key)
+
+
+class TestCacheCommand(unittest.TestCase):
+    """Test listing, pruning and warming the clone and report caches."""
+
+    def setUp(self):
+        """Create an origin repository, a cached clone and a cached report."""
+        self.tmpdir = tempfile.TemporaryDirectory()
+        for module in ("cache", "collator"):
+            patcher = patch(f"harvest.{module}.tempfile.gettempdir")
+            patcher.start().return_value = self.tmpdir.name
+            self.addCleanup(patcher.stop)
+        self.origin = make_repo(
+            os.path.join(self.tmpdir.name, "origin", "foo", "bar"),
+            [(datetime(2020, 1, 1, 12), {"raw/foo.json": "1" * 4096})],
+        )
+        self.clone = os.path.join(self.tmpdir.name, "harvest", "foo", "bar")
+        Repo.clone_from(self.origin.working_dir, self.clone, bare=True)
+        os.utime(self.clone, (1000, 1000))
+        report = os.path.join(self.tmpdir.name, "harvest-reports", "abc")
+        os.makedirs(report)
+        with open(os.path.join(report, "foo.csv"), "w") as f:
+            f.write("foo")
+        self.harvest = Harvest()
+
+    def tearDown(self):
+        """Clean up the caches."""
+        self.tmpdir.cleanup()
+
+    def test_entries(self):
+        """Ensures clones and reports are listed with their size and last use."""
+        clones = CloneCache().entries()
+        self.assertEqual(
+            [(e["cache"], e["name"]) for e in clones], [("clone", "foo/bar")]
+        )
+        self.assertEqual(clones[0]["last_used"], 1000)
+        self.assertGreater(clones[0]["bytes"], 0)
+        reports = ReportCache().entries()
+        self.assertEqual(
+            [(e["cache"], e["name"], e["bytes"]) for e in reports],
+            [("report", "abc", 3)],
+        )
+
+    def test_prune(self):
+        """Ensures the least recently used entries are removed to fit the budget."""
+        entries = CloneCache().entries() + ReportCache().entries()
+        self.assertEqual(prune(entries, 3, dry_run=True), entries[:1])
+        self.assertTrue(os.path.isdir(self.clone))
+        self.assertEqual(prune(entries, 3), entries[:1])
+        self.assertFalse(os.path.isdir(self.clone))
+        self.assertEqual(prune(ReportCache().entries(), 3), [])
+
+    def test_cli(self):
+        """Ensures the cache sub-commands list, warm and prune the caches."""
+        with patch("harvest.cli.CacheList.out") as out_mock:
+            self.harvest.run(["cache", "list"])
+        lines = [c[0][0] for c in out_mock.call_args_list]
+        self.assertTrue(lines[0].startswith("report abc  0.0MB  last used"))
+        self.assertTrue(lines[1].startswith("clone  foo/bar"))
+        self.assertTrue(lines[2].startswith("2 entries"))
+        with open(os.path.join(self.origin.working_dir, "raw/foo.json"), "w") as f:
+            f.write("2")
+        self.origin.git.commit("-am", "Evidence")
+        with patch("harvest.cli.CacheWarm.out") as out_mock:
+            self.harvest.run(
+                ["cache", "warm", "https://github.com/foo/bar", "--creds", "none"]
+            )
+        out_mock.assert_called_once_with(
+            f"{self.clone} is at {self.origin.head.commit.hexsha}"
+        )
+        self.assertGreater(os.stat(self.clone).st_mtime, 1000)
+        with patch("harvest.cli.CachePrune.out") as out_mock:
+            self.harvest.run(["cache", "prune", "--max-size", "0"])
+        self.assertEqual(out_mock.call_count, 3)
+        self.assertEqual(CloneCache().entries() + ReportCache().entries(), [])
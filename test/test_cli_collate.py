@@ -331,3 +331,199 @@ class TestHarvestCLICollate(unittest.TestCase):
             datetime(today.year, today.month, today.day),
         )
         mock_write.assert_called_once_with("my/path/baz.json", ["commit-foo"])
+
+    @patch("harvest.cli.ArchiveOutput")
+    @patch("harvest.collator.Collator.write")
+    @patch("harvest.collator.Collator.read")
+    def test_collate_archive(self, mock_read, mock_write, mock_archive):
+        """Ensures collate sub-command writes to an archive when requested."""
+        mock_read.return_value = ["commit-foo"]
+        mock_archive.supported.return_value = True
+        self.harvest.run(
+            [
+                "collate",
+                "https://github.com/foo/bar",
+                "my/path/baz.json",
+                "--archive",
+                "-",
+            ]
+        )
+        mock_archive.assert_called_once_with("-")
+        mock_write.assert_called_once_with("my/path/baz.json", ["commit-foo"])
+        mock_archive.return_value.close.assert_called_once_with()
+
+    @patch("harvest.collator.Collator.write")
+    @patch("harvest.collator.Collator.read")
+    def test_collate_archive_unsupported(self, mock_read, mock_write):
+        """Ensures collate sub-command fails when archive type is unknown."""
+        self.harvest.run(
+            [
+                "collate",
+                "https://github.com/foo/bar",
+                "my/path/baz.json",
+                "--archive",
+                "versions.rar",
+            ]
+        )
+        mock_read.assert_not_called()
+        mock_write.assert_not_called()
+
+    @patch("harvest.collator.Collator.write")
+    @patch("harvest.collator.Collator.read")
+    def test_collate_archive_and_jsonl(self, mock_read, mock_write):
+        """Ensures collate sub-command fails when several outputs are provided."""
+        self.harvest.run(
+            [
+                "collate",
+                "https://github.com/foo/bar",
+                "my/path/baz.json",
+                "--archive",
+                "versions.tar",
+                "--jsonl",
+                "versions.jsonl",
+            ]
+        )
+        mock_read.assert_not_called()
+        mock_write.assert_not_called()
+
+    @patch("harvest.cli.DirectoryOutput")
+    @patch("harvest.collator.Collator.write")
+    @patch("harvest.collator.Collator.read")
+    def test_collate_resume(self, mock_read, mock_write, mock_output):
+        """Ensures collate sub-command resumes into the current directory."""
+        mock_read.return_value = ["commit-foo"]
+        self.harvest.run(
+            ["collate", "https://github.com/foo/bar", "my/path/baz.json", "--resume"]
+        )
+        mock_output.assert_called_once_with(resume=True, compression=None)
+        mock_write.assert_called_once_with("my/path/baz.json", ["commit-foo"])
+        mock_output.return_value.close.assert_called_once_with()
+
+    @patch("harvest.cli.DirectoryOutput")
+    @patch("harvest.collator.Collator.write", autospec=True)
+    @patch("harvest.collator.Collator.read", autospec=True)
+    def test_collate_several_repos(self, mock_read, mock_write, mock_output):
+        """Ensures each repo is collated to a namespace despite failures."""
+
+        def read(collator, filepath, start, end):
+            if collator.repo == "broken":
+                raise RuntimeError("clone failed")
+            return [f"commit-{collator.repo}"]
+
+        mock_read.side_effect = read
+        with patch("harvest.cli.Collate.err") as mock_err:
+            self.harvest.run(
+                [
+                    "collate",
+                    "https://github.com/foo/bar,https://github.com/foo/broken,"
+                    "https://github.com/foo/baz",
+                    "my/path/baz.json",
+                    "--jobs",
+                    "2",
+                ]
+            )
+        self.assertEqual(mock_read.call_count, 3)
+        written = {
+            c.args[0].output.namespace: c.args[2] for c in mock_write.call_args_list
+        }
+        self.assertEqual(
+            written, {"foo/bar": ["commit-bar"], "foo/baz": ["commit-baz"]}
+        )
+        mock_err.assert_called_once_with(
+            "ERROR: https://github.com/foo/broken: clone failed"
+        )
+        mock_output.return_value.close.assert_called_once_with()
+
+    @patch("harvest.collator.Collator.write")
+    @patch("harvest.collator.Collator.read")
+    def test_collate_several_repos_local(self, mock_read, mock_write):
+        """Ensures a local repo cannot be collated with other repos."""
+        self.harvest.run(
+            [
+                "collate",
+                "local,https://github.com/foo/bar",
+                "my/path/baz.json",
+                "--repo-path",
+                "os/repo/path",
+            ]
+        )
+        mock_read.assert_not_called()
+        mock_write.assert_not_called()
+
+    @patch("harvest.cli.Collator")
+    def test_collate_granularity(self, mock_collator):
+        """Ensures collate sub-command samples versions at a granularity."""
+        self.harvest.run(
+            [
+                "collate",
+                "https://github.com/foo/bar",
+                "my/path/baz.json",
+                "--start",
+                "2019-01-01",
+                "--granularity",
+                "monthly",
+            ]
+        )
+        self.assertEqual(mock_collator.call_args.kwargs["granularity"], "monthly")
+
+    @patch("harvest.cli.Collator")
+    def test_collate_granularity_dates(self, mock_collator):
+        """Ensures a date list granularity provides the date range."""
+        self.harvest.run(
+            [
+                "collate",
+                "https://github.com/foo/bar",
+                "my/path/baz.json",
+                "--granularity",
+                "2019-03-01,20190101",
+            ]
+        )
+        mock_collator.return_value.read.assert_called_once_with(
+            "my/path/baz.json", datetime(2019, 1, 1), datetime(2019, 3, 1)
+        )
+        self.assertEqual(
+            mock_collator.call_args.kwargs["granularity"],
+            [datetime(2019, 3, 1), datetime(2019, 1, 1)],
+        )
+
+    @patch("harvest.cli.Collator")
+    def test_collate_granularity_invalid(self, mock_collator):
+        """Ensures an unknown granularity is rejected."""
+        self.harvest.run(
+            [
+                "collate",
+                "https://github.com/foo/bar",
+                "my/path/baz.json",
+                "--granularity",
+                "hourly",
+            ]
+        )
+        mock_collator.assert_not_called()
+
+    @patch("harvest.cli.Collator")
+    def test_collate_select(self, mock_collator):
+        """Ensures collate sub-command projects versions to a JSON path."""
+        self.harvest.run(
+            [
+                "collate",
+                "https://github.com/foo/bar",
+                "my/path/baz.json",
+                "--select",
+                "$.accounts['123']",
+            ]
+        )
+        self.assertEqual(mock_collator.call_args.kwargs["select"], "$.accounts['123']")
+
+    @patch("harvest.cli.Collator")
+    def test_collate_select_invalid(self, mock_collator):
+        """Ensures an invalid JSON path is rejected."""
+        self.harvest.run(
+            [
+                "collate",
+                "https://github.com/foo/bar",
+                "my/path/baz.json",
+                "--select",
+                "$.accounts[123",
+            ]
+        )
+        mock_collator.assert_not_called()
@@ -119,3 +119,45 @@ class TestHarvestCLIReport(unittest.TestCase):
         self.mock_generate_report.assert_called_once()
         self.mock_write_report.assert_called_once_with("foo bar baz")
         mock_err.assert_called_once_with("ERROR: boom!")
+
+    @patch("harvest.cli.Command.err")
+    def test_compressed_report(self, mock_err):
+        """Ensures the report is written compressed when requested."""
+        self.mock_get_report_module.return_value = "a_module"
+        self.mock_get_report_classes.return_value = [self.mock_report_class]
+        self.harvest.run(
+            [
+                "report",
+                "https://github.com/foo/bar",
+                "a.valid.pkg",
+                "a_module",
+                "--template-dir",
+                "meh",
+                "--compress",
+                "xz",
+            ]
+        )
+        self.mock_write_report.assert_called_once_with("foo bar baz", compression="xz")
+        mock_err.assert_not_called()
+
+    @patch("harvest.cli.Command.err")
+    def test_report_format(self, mock_err):
+        """Ensures the report is written in the requested format."""
+        self.mock_get_report_module.return_value = "a_module"
+        self.mock_get_report_classes.return_value = [self.mock_report_class]
+        self.harvest.run(
+            [
+                "report",
+                "https://github.com/foo/bar",
+                "a.valid.pkg",
+                "a_module",
+                "--template-dir",
+                "meh",
+                "--format",
+                "jsonl",
+            ]
+        )
+        self.mock_write_report.assert_called_once_with(
+            "foo bar baz", output_format="jsonl"
+        )
+        mock_err.assert_not_called()
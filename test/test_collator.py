@@ -13,15 +13,21 @@
 # limitations under the License.
 """Harvest collator tests."""
 
+import os
 import tempfile
+import threading
 import unittest
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
 from pathlib import PurePath
+from test.fixtures.git_repo import make_repo
 from unittest.mock import MagicMock, call, create_autospec, mock_open, patch
 
 from git import Commit, Remote, Repo
+from git.db import GitCmdObjectDB, GitDB
 
-from harvest.collator import Collator
+from harvest.cache import BlobCache
+from harvest.collator import Collator, sample_dates
 
 
 class TestCollator(unittest.TestCase):
@@ -85,29 +91,19 @@ class TestCollator(unittest.TestCase):
         collator.checkout = checkout_mock
         collator.git_repo = MagicMock()
         collator.git_repo.iter_commits = iter_commits_mock
+        collator.git_repo.commit.return_value.hexsha = "a" * 40
 
         commits = collator.read(
             "raw/foo/foo.json", datetime(2019, 11, 4), datetime(2019, 11, 15)
         )
         self.assertEqual(commits, self.commits)
         checkout_mock.assert_called_once()
-        actual = iter_commits_mock.call_args_list
-        expected = [
-            # first call is 00:00 one day later ensuring latest commit returned
-            call(
-                paths="raw/foo/foo.json",
-                until=datetime(2019, 11, 16, 0, 0),
-                max_count=1,
-            ),
-            call(
-                paths="raw/foo/foo.json", until=datetime(2019, 11, 6, 0, 0), max_count=1
-            ),
-            call(
-                paths="raw/foo/foo.json", until=datetime(2019, 11, 5, 0, 0), max_count=1
-            ),
-        ]
-        self.assertEqual(len(actual), 3)
-        self.assertEqual(actual, expected)
+        collator.git_repo.commit.assert_called_once_with("refs/heads/master")
+        # history is walked once, from the snapshot commit, from 00:00 one day
+        # later so that the latest commit of the end date is included
+        iter_commits_mock.assert_called_once_with(
+            "a" * 40, paths="raw/foo/foo.json", until=datetime(2019, 11, 16, 0, 0)
+        )
 
     def test_no_data(self):
         """Ensures read returns commits and exits on StopIteration."""
@@ -140,7 +136,8 @@ class TestCollator(unittest.TestCase):
             "raw/foo/foo.json not found between 2019-11-01 and 2019-11-15",
         )
 
-    def test_write_functionality(self):
+    @patch("harvest.output.os.replace")
+    def test_write_functionality(self, replace_mock):
         """Ensures that write is called appropriately."""
         m = mock_open()
         with patch("builtins.open", m):
@@ -148,26 +145,49 @@ class TestCollator(unittest.TestCase):
             collator.write("raw/foo/foo.json", self.commits)
         handle = m()
 
+        pid = os.getpid()
         self.assertEqual(handle.write.call_count, 3)
-        self.assertIn(call("./20191106_foo.json", "w+"), m.mock_calls)
-        self.assertIn(call("./20191105_foo.json", "w+"), m.mock_calls)
-        self.assertIn(call("./20191101_foo.json", "w+"), m.mock_calls)
+        self.assertIn(call(f"./.20191106_foo.json.{pid}.tmp", "w"), m.mock_calls)
+        self.assertIn(call(f"./.20191105_foo.json.{pid}.tmp", "w"), m.mock_calls)
+        self.assertIn(call(f"./.20191101_foo.json.{pid}.tmp", "w"), m.mock_calls)
+        self.assertIn(
+            call(f"./.20191106_foo.json.{pid}.tmp", "./20191106_foo.json"),
+            replace_mock.mock_calls,
+        )
+        self.assertEqual(replace_mock.call_count, 3)
 
-    def test_write_includes_file_path(self):
+    @patch("harvest.output.os.replace")
+    def test_write_includes_file_path(self, replace_mock):
         m = mock_open()
         with patch("builtins.open", m):
             collator = Collator(*self.args, include_file_path=True)
             collator.write("raw/foo/foo.json", self.commits)
         handle = m()
 
+        pid = os.getpid()
         self.assertEqual(handle.write.call_count, 3)
-        self.assertIn(call("./20191106_raw_foo_foo.json", "w+"), m.mock_calls)
-        self.assertIn(call("./20191105_raw_foo_foo.json", "w+"), m.mock_calls)
-        self.assertIn(call("./20191101_raw_foo_foo.json", "w+"), m.mock_calls)
+        replaced = [c.args[1] for c in replace_mock.call_args_list]
+        self.assertIn("./20191106_raw_foo_foo.json", replaced)
+        self.assertIn("./20191105_raw_foo_foo.json", replaced)
+        self.assertIn("./20191101_raw_foo_foo.json", replaced)
+        self.assertIn(
+            call(f"./.20191101_raw_foo_foo.json.{pid}.tmp", "w"), m.mock_calls
+        )
 
+    def test_write_chronological_order(self):
+        """Ensures versions are handed to the output oldest first."""
+        output = MagicMock()
+        collator = Collator(*self.args, output=output)
+        collator.write("raw/foo/foo.json", self.commits)
+        names = [c.args[0].name for c in output.write.call_args_list]
+        self.assertEqual(
+            names, ["20191101_foo.json", "20191105_foo.json", "20191106_foo.json"]
+        )
+
+    @patch("harvest.collator.Collator.maintain")
     @patch("harvest.collator.git.Repo.clone_from")
     @patch("harvest.collator.os.path.isdir")
-    def test_checkout_clone(self, is_dir_mock, clone_from_mock):
+    def test_checkout_clone(self, is_dir_mock, clone_from_mock, maintain_mock):
         """Ensures repo is cloned if none exists."""
         is_dir_mock.return_value = False
         clone_from_mock.return_value = "my-cloned-repo"
@@ -176,20 +196,25 @@ class TestCollator(unittest.TestCase):
         collator.checkout()
 
         is_dir_mock.assert_called_once_with(
-            "/".join([tempfile.gettempdir(), "harvest", "foo", "bar", ".git"])
+            "/".join([tempfile.gettempdir(), "harvest", "foo", "bar"])
         )
         clone_from_mock.assert_called_once_with(
             "https://foo-ghe-token@github.com/foo/bar.git",
             "/".join([tempfile.gettempdir(), "harvest", "foo", "bar"]),
             branch="master",
+            odbt=GitCmdObjectDB,
+            bare=True,
         )
         self.assertEqual(collator.git_repo, "my-cloned-repo")
+        maintain_mock.assert_called_once_with()
 
+    @patch("harvest.collator.os.utime")
+    @patch("harvest.collator.Collator.maintain")
     @patch("harvest.collator.git.Repo", autospec=True)
     @patch("harvest.collator.os.path.isdir")
-    def test_checkout_fetch(self, is_dir_mock, repo_mock):
-        """Ensures repo is refreshed if repo exists."""
-        is_dir_mock.return_value = True
+    def test_checkout_fetch(self, is_dir_mock, repo_mock, maintain_mock, utime_mock):
+        """Ensures the branch is fetched if a bare repo exists."""
+        is_dir_mock.side_effect = lambda path: not path.endswith(".git")
         mock_repo = create_autospec(Repo)
         mock_remote = create_autospec(Remote)
         mock_fetch = MagicMock()
@@ -204,16 +229,18 @@ class TestCollator(unittest.TestCase):
         collator = Collator(*self.args)
         collator.checkout()
 
-        is_dir_mock.assert_called_once_with(
-            "/".join([tempfile.gettempdir(), "harvest", "foo", "bar", ".git"])
-        )
         repo_mock.assert_called_once_with(
-            "/".join([tempfile.gettempdir(), "harvest", "foo", "bar"])
+            "/".join([tempfile.gettempdir(), "harvest", "foo", "bar"]),
+            odbt=GitCmdObjectDB,
         )
         self.assertEqual(collator.git_repo, mock_repo)
-        mock_fetch.assert_called_once_with()
-        mock_pull.assert_called_once_with()
+        mock_fetch.assert_called_once_with("+refs/heads/master:refs/heads/master")
+        mock_pull.assert_not_called()
         mock_clone_from.assert_not_called()
+        maintain_mock.assert_called_once_with()
+        utime_mock.assert_called_once_with(
+            "/".join([tempfile.gettempdir(), "harvest", "foo", "bar"])
+        )
 
     @patch("harvest.collator.git.Repo", autospec=True)
     def test_checkout_fetch_repo_path(self, repo_mock):
@@ -237,12 +264,27 @@ class TestCollator(unittest.TestCase):
         collator = Collator(*self.args, "my/repo/path")
         collator.checkout()
 
-        repo_mock.assert_called_once_with("my/repo/path")
+        repo_mock.assert_called_once_with("my/repo/path", odbt=GitCmdObjectDB)
         self.assertEqual(collator.git_repo, mock_repo)
         mock_fetch.assert_not_called()
         mock_pull.assert_not_called()
         mock_clone_from.assert_not_called()
 
+    @patch("harvest.collator.git.Repo", autospec=True)
+    def test_checkout_in_process_odb(self, repo_mock):
+        """Ensures the selected object database backend is used."""
+        collator = Collator(*self.args, "my/repo/path", False, odb="gitdb")
+        collator.checkout()
+        repo_mock.assert_called_once_with("my/repo/path", odbt=GitDB)
+
+    def test_constructor_invalid_odb(self):
+        """Ensures an unknown object database backend is rejected."""
+        with self.assertRaises(ValueError) as cm:
+            Collator(*self.args, odb="foo")
+        self.assertEqual(
+            str(cm.exception), "foo is not a valid object database backend"
+        )
+
     @patch("harvest.collator.git.Repo", autospec=True)
     def test_checkout_fetch_repo_path_mismatch(self, repo_mock):
         """Ensures exception is raised if repo path does not match org/repo."""
@@ -272,3 +314,392 @@ class TestCollator(unittest.TestCase):
             mock_clone_from.assert_not_called()
 
         self.assertEqual(str(cm.exception), "foo/bar repository mismatch")
+
+
+class TestCollatorBareCache(unittest.TestCase):
+    """Test Collator bare repository caching."""
+
+    def setUp(self):
+        """Create an origin repository and a cached clone with a worktree."""
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.origin = make_repo(
+            os.path.join(self.tmpdir.name, "origin", "foo", "bar"),
+            [(datetime(2020, 1, 1, 12), {"raw/foo.json": "1"})],
+        )
+        self.cached = os.path.join(self.tmpdir.name, "harvest", "foo", "bar")
+        Repo.clone_from(self.origin.working_dir, self.cached)
+        patcher = patch("harvest.collator.tempfile.gettempdir")
+        patcher.start().return_value = self.tmpdir.name
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        """Clean up the repositories."""
+        self.tmpdir.cleanup()
+
+    def test_cached_clone_made_bare(self):
+        """Ensures a cached clone is converted to bare and fetched."""
+        with open(os.path.join(self.origin.working_dir, "raw/foo.json"), "w") as f:
+            f.write("2")
+        self.origin.git.commit("-am", "Evidence")
+        collator = Collator("https://github.com/foo/bar", None, "master")
+        collator.maintenance_budget = 0
+        collator.checkout()
+        self.assertTrue(collator.git_repo.bare)
+        self.assertFalse(os.path.exists(os.path.join(self.cached, ".git")))
+        self.assertFalse(os.path.exists(os.path.join(self.cached, "raw")))
+        commits = collator.read("raw/foo.json", datetime.today(), datetime.today())
+        self.assertEqual(collator.content(commits[0], "raw/foo.json"), b"2")
+        self.assertEqual(collator.revision(), self.origin.head.commit.hexsha)
+
+    def test_branches(self):
+        """Ensures a cached clone is read as of the branch collated."""
+        self.origin.git.checkout("-b", "dev")
+        with open(os.path.join(self.origin.working_dir, "raw/foo.json"), "w") as f:
+            f.write("dev")
+        self.origin.git.commit("-am", "Evidence")
+        self.origin.git.checkout("master")
+        for branch, expected in (("master", b"1"), ("dev", b"dev"), ("master", b"1")):
+            collator = Collator("https://github.com/foo/bar", None, branch)
+            collator.maintenance_budget = 0
+            commits = collator.read("raw/foo.json", datetime.today(), datetime.today())
+            self.assertEqual(collator.content(commits[0], "raw/foo.json"), expected)
+
+    def test_repo_path_branches(self):
+        """Ensures a local repository is read as of its branch or origin branch."""
+        self.origin.git.checkout("-b", "dev")
+        with open(os.path.join(self.origin.working_dir, "raw/foo.json"), "w") as f:
+            f.write("dev")
+        self.origin.git.commit("-am", "Evidence")
+        self.origin.git.checkout("master")
+        self.assertEqual(
+            Collator(
+                "https://github.com/foo/bar", None, "dev", self.cached
+            ).revisions(),
+            ["refs/heads/dev", "refs/remotes/origin/dev", "HEAD"],
+        )
+        repo = Repo(self.cached)
+        repo.remote().fetch()
+        for branch, expected in (("dev", b"dev"), ("master", b"1"), ("gone", b"1")):
+            collator = Collator("https://github.com/foo/bar", None, branch, self.cached)
+            collator.validate = False
+            commits = collator.read("raw/foo.json", datetime.today(), datetime.today())
+            self.assertEqual(collator.content(commits[0], "raw/foo.json"), expected)
+
+    def test_bare_repo_path(self):
+        """Ensures a bare repository can be provided as the repo path."""
+        bare_path = os.path.join(self.tmpdir.name, "bare.git")
+        Repo.clone_from(self.origin.working_dir, bare_path, bare=True).git.remote(
+            "set-url", "origin", "https://github.com/foo/bar.git"
+        )
+        collator = Collator("https://github.com/foo/bar", None, "master", bare_path)
+        commits = collator.read("raw/foo.json", datetime.today(), datetime.today())
+        self.assertEqual(collator.content(commits[0], "raw/foo.json"), b"1")
+
+
+class TestCollatorMaintenance(unittest.TestCase):
+    """Test Collator repository maintenance."""
+
+    def setUp(self):
+        """Create a repository with a short dated history."""
+        self.tmpdir = tempfile.TemporaryDirectory()
+        make_repo(
+            self.tmpdir.name,
+            [
+                (datetime(2020, 1, 1, 12) + timedelta(days=d), {"raw/foo.json": str(d)})
+                for d in range(3)
+            ],
+        )
+        self.collator = Collator(
+            "https://github.com/foo/bar", None, "master", self.tmpdir.name
+        )
+        self.collator.checkout()
+
+    def tearDown(self):
+        """Clean up the repository."""
+        self.tmpdir.cleanup()
+
+    def test_maintain(self):
+        """Ensures a commit-graph with changed path filters is written."""
+        self.collator.maintain()
+        chain = os.path.join(
+            self.tmpdir.name, ".git", "objects", "info", "commit-graphs"
+        )
+        self.assertTrue(os.path.isdir(chain))
+        tasks = self.collator.maintenance["tasks"]
+        self.assertEqual(tasks["commit_graph"]["status"], "done")
+        self.assertIn("--changed-paths", tasks["commit_graph"]["args"])
+        self.assertIn("repack", tasks)
+        self.assertEqual(
+            self.collator.audit.notes["maintenance"], self.collator.maintenance
+        )
+        self.assertEqual(self.collator.audit.count("command", "commit-graph"), 1)
+
+    def test_maintain_no_budget(self):
+        """Ensures no maintenance is performed without a time budget."""
+        self.collator.maintenance_budget = 0
+        self.collator.maintain()
+        self.assertEqual(self.collator.maintenance["tasks"], {})
+        self.assertEqual(self.collator.audit.count("command"), 0)
+
+
+class TestCollatorGranularity(unittest.TestCase):
+    """Test Collator sampled reads."""
+
+    def setUp(self):
+        """Create a repository with a commit on each day of a quarter."""
+        self.tmpdir = tempfile.TemporaryDirectory()
+        make_repo(
+            self.tmpdir.name,
+            [
+                (datetime(2020, 1, 1, 12) + timedelta(days=d), {"raw/foo.json": str(d)})
+                for d in range(91)
+            ],
+        )
+        self.collator = Collator(
+            "https://github.com/foo/bar", None, "master", self.tmpdir.name
+        )
+
+    def tearDown(self):
+        """Clean up the repository."""
+        self.tmpdir.cleanup()
+
+    def _days(self, commits):
+        return [self.collator._ts_to_str(c.committed_date) for c in commits]
+
+    def test_sample_dates(self):
+        """Ensures sample dates count back from the end date."""
+        start, end = datetime(2020, 1, 10), datetime(2020, 3, 15, 8)
+        self.assertEqual(len(sample_dates(start, end)), 66)
+        self.assertEqual(
+            sample_dates(start, end, "weekly")[:2],
+            [datetime(2020, 3, 15), datetime(2020, 3, 8)],
+        )
+        self.assertEqual(
+            sample_dates(start, end, "monthly"),
+            [datetime(2020, 3, 15), datetime(2020, 2, 29), datetime(2020, 1, 31)],
+        )
+        self.assertEqual(
+            sample_dates(start, end, [datetime(2020, 1, 1), datetime(2020, 2, 1)]),
+            [datetime(2020, 2, 1)],
+        )
+
+    def test_read_daily(self):
+        """Ensures every day's version is read by default."""
+        commits = self.collator.read(
+            "raw/foo.json", datetime(2020, 1, 1), datetime(2020, 3, 31)
+        )
+        self.assertEqual(len(commits), 91)
+        self.assertEqual(self.collator.audit.count("command", "rev-list"), 1)
+
+    def test_read_monthly(self):
+        """Ensures only the version as of each month end is read."""
+        commits = self.collator.read(
+            "raw/foo.json", datetime(2020, 1, 1), datetime(2020, 3, 31), "monthly"
+        )
+        self.assertEqual(self._days(commits), ["20200331", "20200229", "20200131"])
+        self.assertEqual(self.collator.audit.count("command", "rev-list"), 1)
+
+    def test_read_files(self):
+        """Ensures several files are read from one walk of their histories."""
+        from_dt, until_dt = datetime(2020, 1, 10), datetime(2020, 3, 15)
+        expected = self.collator.read("raw/foo.json", from_dt, until_dt, "weekly")
+        self.collator.audit.reset()
+        commits = self.collator.read_files(
+            ["raw/foo.json", "raw/bar.json"], from_dt, until_dt, "weekly"
+        )
+        self.assertEqual(
+            [c.hexsha for c in commits["raw/foo.json"]], [c.hexsha for c in expected]
+        )
+        self.assertEqual(self._days(commits["raw/foo.json"]), self._days(expected))
+        self.assertEqual(commits["raw/bar.json"], [])
+        self.assertEqual(self.collator.audit.count("command", "log"), 1)
+        self.assertEqual(self.collator.audit.count("command", "rev-list"), 0)
+
+    def test_read_files_merge(self):
+        """Ensures a merge resolving a conflict in a file is read as by read."""
+        with tempfile.TemporaryDirectory() as repo_path:
+            repo = make_repo(
+                repo_path,
+                [(datetime(2020, 1, 1, 12), {"a.json": '"base"', "b.json": '"b"'})],
+            )
+            date = f"{int(datetime(2020, 1, 2, 12).timestamp())} +0000"
+            env = {"GIT_AUTHOR_DATE": date, "GIT_COMMITTER_DATE": date}
+            repo.git.branch("dev")
+            for branch, content in (("dev", '"dev"'), ("master", '"main"')):
+                repo.git.checkout(branch)
+                with open(os.path.join(repo_path, "a.json"), "w") as f:
+                    f.write(content)
+                repo.git.commit("-am", branch, env=env)
+            repo.git.merge("dev", with_exceptions=False, env=env)
+            with open(os.path.join(repo_path, "a.json"), "w") as f:
+                f.write('"resolved"')
+            repo.git.commit("-am", "Merge dev", env=env)
+            collator = Collator("https://github.com/foo/bar", None, "master", repo_path)
+            from_dt, until_dt = datetime(2020, 1, 1), datetime(2020, 1, 3)
+            commits = collator.read_files(["a.json", "b.json"], from_dt, until_dt)
+            for filepath in ("a.json", "b.json"):
+                self.assertEqual(
+                    [c.hexsha for c in commits[filepath]],
+                    [c.hexsha for c in collator.read(filepath, from_dt, until_dt)],
+                )
+            self.assertEqual(commits["a.json"][0].hexsha, repo.head.commit.hexsha)
+
+    def test_read_dates(self):
+        """Ensures an explicit list of dates reads the version as of each."""
+        commits = self.collator.read(
+            "raw/foo.json",
+            datetime(2019, 12, 1),
+            datetime(2020, 12, 31),
+            [datetime(2019, 12, 1), datetime(2020, 2, 14), datetime(2020, 6, 1)],
+        )
+        self.assertEqual(self._days(commits), ["20200331", "20200214"])
+
+    def test_progress(self):
+        """Ensures read and write progress is sent to the callback."""
+        events = []
+        self.collator.progress = events.append
+        self.collator.output = MagicMock()
+        commits = self.collator.read(
+            "raw/foo.json", datetime(2020, 1, 1), datetime(2020, 3, 31), "monthly"
+        )
+        self.collator.write("raw/foo.json", commits)
+        finished = [e for e in events if e["finished"]]
+        self.assertEqual(
+            [(e["phase"], e["done"], e["total"]) for e in finished],
+            [("read", 3, 3), ("write", 3, 3)],
+        )
+        self.assertEqual(finished[0]["repo"], "foo/bar")
+        self.assertEqual(finished[0]["item"], "raw/foo.json")
+
+
+class TestCollatorSnapshot(unittest.TestCase):
+    """Test Collator reads pinned to a snapshot commit."""
+
+    def setUp(self):
+        """Create a repository with a commit on two days."""
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.repo = make_repo(
+            self.tmpdir.name,
+            [
+                (datetime(2020, 1, 1, 12), {"raw/foo.json": "1"}),
+                (datetime(2020, 1, 2, 12), {"raw/foo.json": "2"}),
+            ],
+        )
+        self.args = ["https://github.com/foo/bar", None, "master", self.tmpdir.name]
+
+    def tearDown(self):
+        """Clean up the repository."""
+        self.tmpdir.cleanup()
+
+    def _latest(self, collator):
+        commits = collator.read("raw/foo.json", datetime.today(), datetime.today())
+        return collator.content(commits[0], "raw/foo.json")
+
+    def test_reads_pinned(self):
+        """Ensures commits made after the branch is resolved are not read."""
+        collator = Collator(*self.args)
+        head = self.repo.head.commit.hexsha
+        self.assertEqual(self._latest(collator), b"2")
+        with open(os.path.join(self.tmpdir.name, "raw/foo.json"), "w") as f:
+            f.write("3")
+        self.repo.git.commit("-am", "Evidence")
+        self.assertEqual(self._latest(collator), b"2")
+        self.assertEqual(collator.revision(), head)
+        self.assertEqual(collator.audit.notes["revision"], head)
+        collator.snapshot = None
+        self.assertEqual(self._latest(collator), b"3")
+
+    def test_rev(self):
+        """Ensures reads are answered as of an explicit revision."""
+        collator = Collator(*self.args, rev="HEAD~1")
+        self.assertEqual(self._latest(collator), b"1")
+        self.assertEqual(collator.revision(), self.repo.commit("HEAD~1").hexsha)
+        commits = collator.read("raw/foo.json", datetime(2020, 1, 1), datetime.today())
+        collator.output = MagicMock()
+        collator.write("raw/foo.json", commits)
+        version = collator.output.write.call_args[0][0]
+        self.assertEqual(version.revision, collator.revision())
+
+    def test_invalid_rev(self):
+        """Ensures an unknown revision is reported."""
+        collator = Collator(*self.args, rev="nope")
+        with self.assertRaises(ValueError) as cm:
+            collator.revision()
+        self.assertEqual(str(cm.exception), "nope is not a valid revision")
+
+
+class TestCollatorThreads(unittest.TestCase):
+    """Test a Collator shared by several threads."""
+
+    def setUp(self):
+        """Create a repository with a commit on each of sixty days."""
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.start = datetime(2020, 1, 1)
+        make_repo(
+            self.tmpdir.name,
+            [
+                (
+                    self.start + timedelta(days=d, hours=12),
+                    {"raw/foo.json": str(d // 2), "raw/bar.json": str(-d)},
+                )
+                for d in range(60)
+            ],
+        )
+
+    def tearDown(self):
+        """Clean up the repository."""
+        self.tmpdir.cleanup()
+
+    def _content(self, collator, filepath, day):
+        file_dt = self.start + timedelta(days=day)
+        commits = collator.read(filepath, file_dt, file_dt)
+        return collator.content(commits[0], filepath)
+
+    def _stress(self, odb):
+        collator = Collator(
+            "https://github.com/foo/bar",
+            None,
+            "master",
+            self.tmpdir.name,
+            odb=odb,
+            blob_cache=BlobCache(),
+        )
+        barrier = threading.Barrier(8)
+        handles = set()
+
+        def retrieve(day):
+            if day < 8:
+                # The first reads of every thread start together
+                barrier.wait()
+            filepath = "raw/foo.json" if day % 2 else "raw/bar.json"
+            expected = str(day // 2 if day % 2 else -day).encode()
+            content = self._content(collator, filepath, day)
+            handles.add(id(collator.git_repo))
+            return content == expected
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(retrieve, list(range(60)) * 5))
+        self.assertTrue(all(results))
+        self.assertEqual(len(handles), 8)
+        self.assertEqual(collator.audit.count("command", "rev-list"), 300)
+        self.assertGreater(collator.blob_cache.hits, 0)
+
+    def test_concurrent_reads(self):
+        """Ensures concurrent reads through git processes are consistent."""
+        self._stress("git")
+
+    def test_concurrent_reads_gitdb(self):
+        """Ensures concurrent reads through the in process backend are consistent."""
+        self._stress("gitdb")
+
+    def test_commits_shared_across_threads(self):
+        """Ensures commits read by one thread can be read by another."""
+        collator = Collator(
+            "https://github.com/foo/bar", None, "master", self.tmpdir.name
+        )
+        commits = collator.read("raw/foo.json", self.start, self.start.replace(day=31))
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            contents = list(
+                executor.map(lambda c: collator.content(c, "raw/foo.json"), commits)
+            )
+        self.assertEqual(contents, [str(d).encode() for d in range(15, -1, -1)])
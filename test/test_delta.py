@@ -0,0 +1,157 @@
+# Copyright (c) 2020 IBM Corp. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Harvest JSON delta encoding tests."""
+
+import copy
+import json
+import os
+import tempfile
+import unittest
+from datetime import datetime
+from test.test_output import _version
+
+from harvest.delta import DeltaReader, diff, patch
+from harvest.output import DeltaOutput
+
+
+class TestDelta(unittest.TestCase):
+    """Test JSON delta encoding."""
+
+    def assertRoundTrip(self, old, new):
+        """Assert that patching old with its diff to new produces new."""
+        ops = diff(old, new)
+        self.assertEqual(patch(copy.deepcopy(old), ops), new)
+        return ops
+
+    def test_no_change(self):
+        """Ensures identical documents produce no operations."""
+        self.assertEqual(diff({"foo": [1, 2]}, {"foo": [1, 2]}), [])
+
+    def test_dict_changes(self):
+        """Ensures keys added, removed and replaced are encoded."""
+        ops = self.assertRoundTrip(
+            {"foo": 1, "bar": {"baz": 2}, "a/b~c": 3},
+            {"foo": 1, "bar": {"baz": 3}, "qux": 4},
+        )
+        self.assertEqual(
+            ops,
+            [
+                {"op": "remove", "path": "/a~1b~0c"},
+                {"op": "replace", "path": "/bar/baz", "value": 3},
+                {"op": "add", "path": "/qux", "value": 4},
+            ],
+        )
+
+    def test_list_insertion(self):
+        """Ensures an entry inserted mid list is a single operation."""
+        old = [{"name": n} for n in "abcdef"]
+        new = old[:3] + [{"name": "x"}] + old[3:]
+        ops = self.assertRoundTrip(old, new)
+        self.assertEqual(ops, [{"op": "add", "path": "/3", "value": {"name": "x"}}])
+
+    def test_list_removals(self):
+        """Ensures entries removed from a list are encoded."""
+        self.assertRoundTrip(list(range(10)), [0, 1, 5, 9])
+        self.assertRoundTrip([1, 2, 3], [])
+        self.assertRoundTrip([], [1, 2, 3])
+
+    def test_type_changes(self):
+        """Ensures value type changes are encoded."""
+        self.assertRoundTrip({"foo": 1}, [1])
+        self.assertRoundTrip({"foo": 1}, {"foo": "1"})
+        self.assertRoundTrip({"foo": [1]}, {"foo": {"0": 1}})
+
+    def test_nested_type_changes(self):
+        """Ensures values equal in Python but not in JSON are encoded."""
+        for old, new in (
+            ({"a": [1]}, {"a": [True]}),
+            ({"x": {"a": 0}}, {"x": {"a": False}}),
+            ([1.0], [1]),
+        ):
+            ops = diff(old, new)
+            self.assertNotEqual(ops, [])
+            self.assertEqual(
+                json.dumps(patch(copy.deepcopy(old), ops)), json.dumps(new)
+            )
+
+
+class TestDeltaOutput(unittest.TestCase):
+    """Test delta encoded collate output and reader."""
+
+    def setUp(self):
+        """Write a delta output of three versions."""
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "versions.delta.jsonl")
+        self.docs = [
+            {"packages": ["a", "b"], "count": 2},
+            {"packages": ["a", "b", "c"], "count": 3},
+            {"packages": ["b", "c"], "count": 2},
+        ]
+        with DeltaOutput(self.path) as output:
+            for day, doc in enumerate(self.docs, 1):
+                output.write(
+                    _version(
+                        f"2019110{day}_foo.json",
+                        json.dumps(doc).encode(),
+                        datetime(2019, 11, day),
+                    )
+                )
+
+    def tearDown(self):
+        """Clean up after each test."""
+        self.tmpdir.cleanup()
+
+    def test_records(self):
+        """Ensures the first version is in full and the rest are patches."""
+        with open(self.path) as f:
+            records = [json.loads(line) for line in f]
+        self.assertEqual(records[0]["content"], self.docs[0])
+        self.assertNotIn("content", records[1])
+        self.assertEqual(
+            records[1]["patch"],
+            [
+                {"op": "add", "path": "/packages/2", "value": "c"},
+                {"op": "replace", "path": "/count", "value": 3},
+            ],
+        )
+
+    def test_reader(self):
+        """Ensures any date's content is rebuilt on demand."""
+        reader = DeltaReader(self.path)
+        self.assertEqual(
+            reader.dates("raw/foo/foo.json"),
+            ["2019-11-01", "2019-11-02", "2019-11-03"],
+        )
+        self.assertIsNone(reader.content("raw/foo/foo.json", "2019-10-31"))
+        self.assertEqual(reader.content("raw/foo/foo.json", "2019-11-01"), self.docs[0])
+        self.assertEqual(
+            reader.content("raw/foo/foo.json", datetime(2019, 11, 2)), self.docs[1]
+        )
+        self.assertEqual(reader.content("raw/foo/foo.json", "2019-12-31"), self.docs[2])
+        self.assertIsNone(reader.content("raw/bar/bar.json", "2019-12-31"))
+
+    def test_compressed_reader(self):
+        """Ensures a compressed delta file is read."""
+        path = f"{self.path}.gz"
+        with DeltaOutput(path) as output:
+            for day, doc in enumerate(self.docs, 1):
+                output.write(
+                    _version(
+                        f"2019110{day}_foo.json",
+                        json.dumps(doc).encode(),
+                        datetime(2019, 11, day),
+                    )
+                )
+        reader = DeltaReader(path)
+        self.assertEqual(reader.content("raw/foo/foo.json", "2019-12-31"), self.docs[2])
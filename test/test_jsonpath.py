@@ -0,0 +1,41 @@
+# Copyright (c) 2020 IBM Corp. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Harvest JSON field path tests."""
+
+import unittest
+
+from harvest.jsonpath import extract, parse
+
+
+class TestJsonPath(unittest.TestCase):
+    """Test JSON field paths."""
+
+    def test_parse(self):
+        """Ensures paths are parsed into keys and indexes."""
+        self.assertEqual(parse("$.accounts[0].name"), ["accounts", 0, "name"])
+        self.assertEqual(parse("accounts.name"), ["accounts", "name"])
+        self.assertEqual(parse("$['foo.bar'][\"baz\"]"), ["foo.bar", "baz"])
+        self.assertEqual(parse("$"), [])
+        with self.assertRaises(ValueError) as cm:
+            parse("$.foo[bar")
+        self.assertEqual(str(cm.exception), "$.foo[bar is not a valid JSON path")
+
+    def test_extract(self):
+        """Ensures values are found and missing values are the default."""
+        doc = {"accounts": [{"name": "foo"}], "ids": {"0": "bar"}}
+        self.assertEqual(extract(doc, "$.accounts[0].name"), "foo")
+        self.assertEqual(extract(doc, "$.ids[0]"), "bar")
+        self.assertEqual(extract(doc, "$"), doc)
+        self.assertIsNone(extract(doc, "$.accounts[1].name"))
+        self.assertEqual(extract(doc, "$.accounts.name", "n/a"), "n/a")
@@ -0,0 +1,121 @@
+# Copyright (c) 2020 IBM Corp. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Harvest run metrics tests."""
+
+import os
+import tempfile
+import unittest
+from datetime import datetime
+from test.fixtures.git_repo import make_repo
+from unittest.mock import patch
+
+from harvest.cli import Harvest
+from harvest.metrics import RunMetrics
+
+
+class TestRunMetrics(unittest.TestCase):
+    """Test run metrics."""
+
+    def setUp(self):
+        """Create a repository with a commit on three days."""
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.repo_path = os.path.join(self.tmpdir.name, "repo")
+        make_repo(
+            self.repo_path,
+            [
+                (datetime(2020, 1, day, 12), {"raw/foo.json": f'{{"day": {day}}}'})
+                for day in (1, 2, 3)
+            ],
+        )
+
+    def tearDown(self):
+        """Clean up the repository."""
+        self.tmpdir.cleanup()
+
+    def _samples(self, text):
+        return dict(
+            line.rsplit(" ", 1) for line in text.splitlines() if not line[0] == "#"
+        )
+
+    def test_text(self):
+        """Ensures metrics are written as labelled gauges ending with EOF."""
+        metrics = RunMetrics("report")
+        metrics({"phase": "write", "done": 3, "bytes": 0, "elapsed": 1, "finished": 0})
+        metrics({"phase": "write", "done": 5, "bytes": 10, "elapsed": 2, "finished": 1})
+        metrics.cache("report", 1, 0)
+        metrics.cache("report", 0, 3)
+        metrics.set("harvest_report_duration_seconds", 1.5, report='my "report"')
+        text = metrics.text()
+        self.assertTrue(text.endswith("# EOF\n"))
+        self.assertIn(
+            "# HELP harvest_phase_items Items processed by each phase of the run.\n"
+            "# TYPE harvest_phase_items gauge\n",
+            text,
+        )
+        samples = self._samples(text)
+        self.assertEqual(
+            samples['harvest_phase_items{command="report",phase="write"}'], "5"
+        )
+        self.assertEqual(
+            samples['harvest_cache_hit_ratio{command="report",cache="report"}'], "0.25"
+        )
+        self.assertEqual(
+            samples[
+                'harvest_report_duration_seconds{command="report",'
+                'report="my \\"report\\""}'
+            ],
+            "1.5",
+        )
+        self.assertEqual(samples['harvest_run_errors{command="report"}'], "0")
+        self.assertNotIn("harvest_files_written", text)
+
+    def test_collate_metrics_file(self):
+        """Ensures collate writes its statistics to the metrics file."""
+        path = os.path.join(self.tmpdir.name, "harvest.prom")
+        self.addCleanup(os.chdir, os.getcwd())
+        os.chdir(self.tmpdir.name)
+        with patch("harvest.cli.Collate.err") as err_mock:
+            Harvest().run(
+                [
+                    "collate",
+                    "local",
+                    "raw/foo.json",
+                    "raw/bar.json",
+                    "--repo-path",
+                    self.repo_path,
+                    "--start",
+                    "20200101",
+                    "--end",
+                    "20200103",
+                    "--metrics-file",
+                    path,
+                ]
+            )
+        err_mock.assert_called_once()
+        self.assertEqual(
+            sorted(f for f in os.listdir(self.tmpdir.name) if f.startswith(".")), []
+        )
+        with open(path) as f:
+            samples = self._samples(f.read())
+        labels = 'command="collate",phase="write",repo="local/local"'
+        self.assertEqual(samples[f"harvest_phase_items{{{labels}}}"], "3")
+        self.assertEqual(samples['harvest_files_written{command="collate"}'], "3")
+        self.assertEqual(samples['harvest_run_errors{command="collate"}'], "1")
+        self.assertEqual(
+            samples[
+                'harvest_git_requests{command="collate",kind="command",'
+                'repo="local/local",request="rev-list"}'
+            ],
+            "2",
+        )
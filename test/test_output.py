@@ -0,0 +1,296 @@
+# Copyright (c) 2020 IBM Corp. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Harvest collate output tests."""
+
+import gzip
+import io
+import json
+import lzma
+import os
+import tarfile
+import tempfile
+import unittest
+import zipfile
+from datetime import datetime
+from unittest.mock import MagicMock, patch
+
+from harvest import compression
+from harvest.output import (
+    ArchiveOutput,
+    DirectoryOutput,
+    FileVersion,
+    JsonLinesOutput,
+    MANIFEST_FILENAME,
+    NamespacedOutput,
+)
+
+
+def _version(name, content, commit_dt=datetime(2019, 11, 6)):
+    blob = MagicMock()
+    blob.hexsha = f"{name}-hexsha"
+    blob.data_stream = io.BytesIO(content)
+    commit = MagicMock()
+    commit.hexsha = f"{name}-commit"
+    commit.committed_date = commit_dt.timestamp()
+    commit.tree = {"raw/foo/foo.json": blob}
+    return FileVersion(name, "raw/foo/foo.json", commit)
+
+
+class TestCollateOutputs(unittest.TestCase):
+    """Test collate outputs."""
+
+    def setUp(self):
+        """Initialize supporting test objects before each test."""
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.versions = [
+            _version("20191105_foo.json", b'{"foo": 1}', datetime(2019, 11, 5)),
+            _version("20191106_foo.json", b'{"foo": 2}', datetime(2019, 11, 6)),
+        ]
+
+    def tearDown(self):
+        """Clean up after each test."""
+        self.tmpdir.cleanup()
+
+    def test_file_version_content_read_once(self):
+        """Ensures version content is read from the blob once."""
+        version = self.versions[0]
+        self.assertEqual(version.content, b'{"foo": 1}')
+        self.assertEqual(version.content, b'{"foo": 1}')
+
+    def test_file_version_data(self):
+        """Ensures version data is parsed JSON or text."""
+        self.assertEqual(self.versions[0].data, {"foo": 1})
+        self.assertEqual(self.versions[0].date, "2019-11-05")
+        self.assertEqual(_version("foo.txt", b"foo bar").data, "foo bar")
+
+    def test_directory_output(self):
+        """Ensures each version is written as a file."""
+        with DirectoryOutput(self.tmpdir.name) as output:
+            for version in self.versions:
+                output.write(version)
+        self.assertEqual(
+            sorted(os.listdir(self.tmpdir.name)),
+            ["20191105_foo.json", "20191106_foo.json"],
+        )
+        with open(os.path.join(self.tmpdir.name, "20191106_foo.json")) as f:
+            self.assertEqual(f.read(), '{"foo": 2}')
+
+    def test_directory_output_resume(self):
+        """Ensures versions already written with the same blob are skipped."""
+        with DirectoryOutput(self.tmpdir.name, resume=True) as output:
+            for version in self.versions:
+                output.write(version)
+        self.assertEqual(output.written, 2)
+        with open(os.path.join(self.tmpdir.name, MANIFEST_FILENAME)) as f:
+            self.assertEqual(
+                json.load(f)["versions"],
+                {
+                    "20191105_foo.json": "20191105_foo.json-hexsha",
+                    "20191106_foo.json": "20191106_foo.json-hexsha",
+                },
+            )
+        changed = _version("20191106_foo.json", b'{"foo": 3}')
+        changed.commit.tree["raw/foo/foo.json"].hexsha = "changed-hexsha"
+        unchanged = _version("20191105_foo.json", b"")
+        unchanged.commit.tree["raw/foo/foo.json"].data_stream = None
+        with DirectoryOutput(self.tmpdir.name, resume=True) as output:
+            output.write(unchanged)
+            output.write(changed)
+        self.assertEqual((output.written, output.skipped), (1, 1))
+        with open(os.path.join(self.tmpdir.name, "20191106_foo.json")) as f:
+            self.assertEqual(f.read(), '{"foo": 3}')
+
+    @patch("harvest.output.os.replace")
+    def test_directory_output_interrupted(self, replace_mock):
+        """Ensures an interrupted write leaves no partial files behind."""
+        replace_mock.side_effect = KeyboardInterrupt()
+        with self.assertRaises(KeyboardInterrupt):
+            DirectoryOutput(self.tmpdir.name).write(self.versions[0])
+        self.assertEqual(os.listdir(self.tmpdir.name), [])
+
+    def test_tar_output(self):
+        """Ensures versions are written as entries of a compressed tar."""
+        path = os.path.join(self.tmpdir.name, "versions.tar.gz")
+        with ArchiveOutput(path) as output:
+            for version in self.versions:
+                output.write(version)
+        with tarfile.open(path, "r:gz") as tar:
+            self.assertEqual(tar.getnames(), ["20191105_foo.json", "20191106_foo.json"])
+            member = tar.getmember("20191105_foo.json")
+            self.assertEqual(member.mtime, int(datetime(2019, 11, 5).timestamp()))
+            self.assertEqual(tar.extractfile(member).read(), b'{"foo": 1}')
+
+    def test_zip_output(self):
+        """Ensures versions are written as entries of a zip archive."""
+        path = os.path.join(self.tmpdir.name, "versions.zip")
+        with ArchiveOutput(path) as output:
+            for version in self.versions:
+                output.write(version)
+        with zipfile.ZipFile(path) as zip_file:
+            self.assertEqual(
+                zip_file.namelist(), ["20191105_foo.json", "20191106_foo.json"]
+            )
+            self.assertEqual(zip_file.read("20191106_foo.json"), b'{"foo": 2}')
+
+    def test_stdout_output(self):
+        """Ensures a tar archive is streamed to standard output."""
+        stdout = MagicMock()
+        stdout.buffer = io.BytesIO()
+        with patch("harvest.output.sys.stdout", stdout):
+            with ArchiveOutput("-") as output:
+                for version in self.versions:
+                    output.write(version)
+        stdout.buffer.seek(0)
+        with tarfile.open(fileobj=stdout.buffer, mode="r|") as tar:
+            self.assertEqual(
+                [m.name for m in tar], ["20191105_foo.json", "20191106_foo.json"]
+            )
+
+    def test_unsupported_archive(self):
+        """Ensures an unknown archive type is rejected."""
+        self.assertFalse(ArchiveOutput.supported("versions.rar"))
+        with self.assertRaises(ValueError) as cm:
+            ArchiveOutput("versions.rar")
+        self.assertEqual(
+            str(cm.exception), "versions.rar is not a supported archive type"
+        )
+
+    def test_jsonl_output(self):
+        """Ensures one JSON record is written per version."""
+        path = os.path.join(self.tmpdir.name, "versions.jsonl")
+        self.versions.append(_version("20191107_foo.json", b"not json"))
+        with JsonLinesOutput(path) as output:
+            for version in self.versions:
+                output.write(version)
+        with open(path) as f:
+            records = [json.loads(line) for line in f]
+        self.assertEqual(len(records), 3)
+        self.assertEqual(
+            records[0],
+            {
+                "date": "2019-11-05",
+                "commit": "20191105_foo.json-commit",
+                "path": "raw/foo/foo.json",
+                "content": {"foo": 1},
+            },
+        )
+        self.assertEqual(records[2]["content"], "not json")
+
+    def test_jsonl_stdout_output(self):
+        """Ensures JSON records are streamed to standard output."""
+        with patch("harvest.output.sys.stdout", new_callable=io.StringIO) as stdout:
+            with JsonLinesOutput("-") as output:
+                output.write(self.versions[0])
+            self.assertFalse(stdout.closed)
+            self.assertEqual(json.loads(stdout.getvalue())["content"], {"foo": 1})
+
+    def test_snapshot_revision_recorded(self):
+        """Ensures the snapshot commit is recorded in records and the manifest."""
+        for version in self.versions:
+            version.revision = "snapshot-sha"
+        stream = io.StringIO()
+        JsonLinesOutput(stream).write(self.versions[0])
+        self.assertEqual(json.loads(stream.getvalue())["revision"], "snapshot-sha")
+        with DirectoryOutput(self.tmpdir.name, resume=True) as output:
+            output.write(self.versions[0])
+        with DirectoryOutput(self.tmpdir.name, resume=True) as output:
+            self.assertEqual(output.revisions, {"": "snapshot-sha"})
+            output.write(self.versions[0])
+            NamespacedOutput(output, "foo/bar").write(self.versions[1])
+        with open(os.path.join(self.tmpdir.name, MANIFEST_FILENAME)) as f:
+            self.assertEqual(
+                json.load(f)["revisions"],
+                {"": "snapshot-sha", "foo/bar": "snapshot-sha"},
+            )
+
+    def test_namespaced_output(self):
+        """Ensures versions of each repo are kept apart in a shared output."""
+        path = os.path.join(self.tmpdir.name, "versions.jsonl")
+        with DirectoryOutput(self.tmpdir.name) as directory:
+            NamespacedOutput(directory, "foo/bar").write(self.versions[0])
+        with JsonLinesOutput(path) as output:
+            NamespacedOutput(output, "foo/baz").write(self.versions[1])
+        self.assertTrue(
+            os.path.isfile(os.path.join(self.tmpdir.name, "foo/bar/20191105_foo.json"))
+        )
+        with open(path) as f:
+            self.assertEqual(json.load(f)["repo"], "foo/baz")
+
+    def test_namespaced_output_lock(self):
+        """Ensures only single stream writes are locked, after reading content."""
+        read = []
+        lock = MagicMock()
+        lock.__enter__.side_effect = lambda: read.append(
+            self.versions[1]._content is not None
+        )
+        with DirectoryOutput(self.tmpdir.name) as directory:
+            NamespacedOutput(directory, "foo/bar", lock).write(self.versions[0])
+        lock.__enter__.assert_not_called()
+        with JsonLinesOutput(io.StringIO()) as output:
+            NamespacedOutput(output, "foo/baz", lock).write(self.versions[1])
+        self.assertEqual(read, [True])
+
+    def test_file_version_select(self):
+        """Ensures only the selected JSON content is provided."""
+        version = _version("20191105_foo.json", b'{"foo": {"bar": [1, 2]}, "baz": 3}')
+        version.select = "$.foo.bar"
+        self.assertEqual(version.content, b"[1, 2]")
+        self.assertEqual(version.data, [1, 2])
+        self.assertEqual(version.digest, "20191105_foo.json-hexsha:$.foo.bar")
+        missing = _version("20191105_foo.json", b'{"baz": 3}')
+        missing.select = "$.foo.bar"
+        self.assertEqual(missing.content, b"null")
+        text = _version("foo.txt", b"foo bar")
+        text.select = "$.foo"
+        with self.assertRaises(ValueError) as cm:
+            text.content
+        self.assertEqual(
+            str(cm.exception), "raw/foo/foo.json is not JSON, $.foo cannot be selected"
+        )
+
+    def test_directory_output_compressed(self):
+        """Ensures versions are compressed as they are written."""
+        with DirectoryOutput(self.tmpdir.name, compression="gzip") as output:
+            output.write(self.versions[0])
+        with DirectoryOutput(self.tmpdir.name, compression="xz") as output:
+            output.write(self.versions[1])
+        self.assertEqual(
+            sorted(os.listdir(self.tmpdir.name)),
+            ["20191105_foo.json.gz", "20191106_foo.json.xz"],
+        )
+        path = os.path.join(self.tmpdir.name, "20191105_foo.json.gz")
+        with gzip.open(path, "rt") as f:
+            self.assertEqual(f.read(), '{"foo": 1}')
+        path = os.path.join(self.tmpdir.name, "20191106_foo.json.xz")
+        with lzma.open(path, "rt") as f:
+            self.assertEqual(f.read(), '{"foo": 2}')
+
+    @unittest.skipUnless(compression.available("zstd"), "zstandard not installed")
+    def test_directory_output_zstd(self):
+        """Ensures versions are compressed with zstd when it is available."""
+        with DirectoryOutput(self.tmpdir.name, compression="zstd") as output:
+            output.write(self.versions[0])
+        path = os.path.join(self.tmpdir.name, "20191105_foo.json.zst")
+        with compression.open_file(path, "r", "zstd") as f:
+            self.assertEqual(f.read(), '{"foo": 1}')
+
+    def test_jsonl_output_compressed(self):
+        """Ensures a JSON Lines path with a compression extension is compressed."""
+        path = os.path.join(self.tmpdir.name, "versions.jsonl.gz")
+        with JsonLinesOutput(path) as output:
+            with patch.object(output.file, "flush") as flush_mock:
+                output.write(self.versions[0])
+            flush_mock.assert_not_called()
+        with gzip.open(path, "rt") as f:
+            self.assertEqual(json.loads(f.read())["content"], {"foo": 1})
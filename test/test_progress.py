@@ -0,0 +1,102 @@
+# Copyright (c) 2020 IBM Corp. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Harvest progress event tests."""
+
+import io
+import json
+import unittest
+from unittest.mock import MagicMock, patch
+
+from harvest.progress import (
+    JsonLinesRenderer,
+    TerminalRenderer,
+    format_event,
+    renderer,
+    tracker,
+)
+
+
+class TestProgress(unittest.TestCase):
+    """Test progress trackers and renderers."""
+
+    def test_no_callback(self):
+        """Ensures no events are built without a callback."""
+        progress = tracker(None, "read", 10)
+        progress.update()
+        progress.finish()
+        self.assertFalse(hasattr(progress, "done"))
+
+    @patch("harvest.progress.time.monotonic")
+    def test_events_rate_limited(self, monotonic_mock):
+        """Ensures events are sent on start, every interval and on finish."""
+        monotonic_mock.side_effect = [100, 100.1, 100.2, 100.6, 100.7, 101]
+        callback = MagicMock()
+        progress = tracker(callback, "write", 4, repo="foo/bar")
+        for _ in range(4):
+            progress.update(nbytes=10)
+        progress.finish()
+        progress.finish()
+        events = [c[0][0] for c in callback.call_args_list]
+        self.assertEqual([e["done"] for e in events], [0, 3, 4])
+        self.assertEqual(
+            events[-1],
+            {
+                "phase": "write",
+                "done": 4,
+                "total": 4,
+                "bytes": 40,
+                "elapsed": 1,
+                "finished": True,
+                "repo": "foo/bar",
+            },
+        )
+
+    def test_format_event(self):
+        """Ensures events are described with a bar and an ETA."""
+        event = {
+            "phase": "read",
+            "done": 5,
+            "total": 20,
+            "bytes": 3 * 1024 * 1024,
+            "elapsed": 30,
+            "finished": False,
+            "repo": "foo/bar",
+            "item": "raw/foo.json",
+        }
+        self.assertEqual(
+            format_event(event),
+            f'read foo/bar raw/foo.json [{"#" * 7}{"." * 23}] 5/20 3.0MB ETA 0:01:30',
+        )
+        event.update(total=None, bytes=0, finished=True, elapsed=3725)
+        self.assertEqual(format_event(event), "read foo/bar raw/foo.json 5 in 1:02:05")
+
+    def test_renderers(self):
+        """Ensures terminals get a progress line and other streams JSON lines."""
+        event = {
+            "phase": "fetch",
+            "done": 0,
+            "total": None,
+            "bytes": 0,
+            "elapsed": 0.0,
+            "finished": True,
+        }
+        stream = io.StringIO()
+        self.assertIsInstance(renderer(stream), JsonLinesRenderer)
+        renderer(stream)(event)
+        self.assertEqual(json.loads(stream.getvalue()), event)
+        stream = io.StringIO()
+        stream.isatty = lambda: True
+        self.assertIsInstance(renderer(stream), TerminalRenderer)
+        renderer(stream)(event)
+        self.assertEqual(stream.getvalue(), "\r\033[Kfetch 0 in 0:00:00\n")
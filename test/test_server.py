@@ -0,0 +1,181 @@
+# Copyright (c) 2020 IBM Corp. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Harvest server and client tests."""
+
+import os
+import tempfile
+import threading
+import unittest
+from datetime import datetime
+from test.fixtures.git_repo import make_repo
+from unittest.mock import patch
+
+from harvest.client import HarvestClient
+from harvest.server import AUDIT_MAX_ENTRIES, HarvestServer
+from harvest.utils import get_report_module
+
+
+class TestHarvestServer(unittest.TestCase):
+    """Test the harvest server through its client."""
+
+    def setUp(self):
+        """Start a server on a port and a Unix socket for a local repo."""
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.repo_path = os.path.join(self.tmpdir.name, "repo")
+        make_repo(
+            self.repo_path,
+            [
+                (datetime(2019, 11, day, 12), {"raw/foo.json": f'{{"day": {day}}}'})
+                for day in (1, 3, 5)
+            ],
+        )
+        self.harvest = HarvestServer(
+            None,
+            maintenance_budget=0,
+            allowed_paths=[self.repo_path],
+            allowed_packages=["test.fixtures"],
+        )
+        self.servers = [
+            self.harvest.http_server(port=0),
+            self.harvest.http_server(
+                socket_path=os.path.join(self.tmpdir.name, "harvest.sock")
+            ),
+        ]
+        for server in self.servers:
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+        host, port = self.servers[0].server_address
+        self.client = HarvestClient(
+            f"http://{host}:{port}", repo_path=self.repo_path, timeout=10
+        )
+        self.socket_client = HarvestClient(
+            socket_path=self.servers[1].server_address,
+            repo_path=self.repo_path,
+            timeout=10,
+        )
+
+    def tearDown(self):
+        """Stop the servers and clean up."""
+        for server in self.servers:
+            server.shutdown()
+            server.server_close()
+        self.tmpdir.cleanup()
+
+    def test_file_content(self):
+        """Ensures point in time content is served from a warm repository."""
+        for client in (self.client, self.socket_client):
+            self.assertEqual(
+                client.get_file_content("raw/foo.json", datetime(2019, 11, 4)),
+                b'{"day": 3}',
+            )
+        self.assertIsNone(
+            self.client.get_file_content("raw/foo.json", datetime(2019, 10, 31))
+        )
+        self.assertEqual(len(self.harvest.repos), 1)
+        self.assertEqual(self.harvest.blob_cache.hits, 1)
+
+    def test_history_reused_until_refresh(self):
+        """Ensures history is read once between repository refreshes."""
+        warm = self.harvest.warm_repo("local", repo_path=self.repo_path)
+        collator = warm.collator
+        with patch.object(collator, "read", wraps=collator.read) as read_mock:
+            for _ in range(3):
+                self.client.get_file_content("raw/foo.json", datetime(2019, 11, 4))
+            self.assertEqual(read_mock.call_count, 1)
+            warm.refresh = 0
+            self.client.get_file_content("raw/foo.json", datetime(2019, 11, 4))
+            self.assertEqual(read_mock.call_count, 2)
+
+    def test_refresh(self):
+        """Ensures refreshes skip maintenance and the audit is kept bounded."""
+        warm = self.harvest.warm_repo("local", repo_path=self.repo_path)
+        collator = warm.collator
+        collator.maintenance_budget = 30
+        budgets = []
+        checkout = collator.checkout
+        with patch.object(collator, "checkout") as checkout_mock:
+            checkout_mock.side_effect = lambda: (
+                budgets.append(collator.maintenance_budget),
+                checkout(),
+            )
+            day = datetime(2019, 11, 4)
+            for _ in range(AUDIT_MAX_ENTRIES):
+                collator.content(warm.read("raw/foo.json", day, day)[0], "raw/foo.json")
+            self.assertEqual(len(collator.audit.entries), AUDIT_MAX_ENTRIES)
+            warm.refresh = 0
+            warm.checkout()
+        self.assertEqual((budgets[0], budgets[-1]), (30, 0))
+        self.assertEqual(collator.maintenance_budget, 30)
+        self.assertLess(len(collator.audit.entries), 10)
+
+    def test_allowed_repos(self):
+        """Ensures only the repositories allowed are served."""
+        self.harvest.allowed_repos = {"https://github.com/foo/bar"}
+        for repo, repo_path in (
+            ("https://github.com/foo/baz", None),
+            ("https://github.com/foo/bar", "/tmp"),
+            ("local", self.tmpdir.name),
+        ):
+            with self.assertRaises(ValueError) as cm:
+                self.harvest.warm_repo(repo, repo_path=repo_path)
+            self.assertIn("is not served", str(cm.exception))
+        self.harvest.warm_repo("https://github.com/foo/bar.git/")
+        self.harvest.warm_repo("local", repo_path=f"{self.repo_path}/")
+        host, port = self.servers[0].server_address
+        with self.assertRaises(RuntimeError) as cm:
+            HarvestClient(
+                f"http://{host}:{port}",
+                repo="https://evil.github.io/foo/bar",
+                timeout=10,
+            ).get_file_content("raw/foo.json")
+        self.assertIn("is not served", str(cm.exception))
+
+    def test_collate(self):
+        """Ensures versions within a date range are served as records."""
+        records = self.socket_client.collate(
+            "raw/foo.json", datetime(2019, 11, 1), datetime(2019, 11, 5)
+        )
+        self.assertEqual(
+            [r["date"] for r in records], ["2019-11-01", "2019-11-03", "2019-11-05"]
+        )
+        self.assertEqual(records[-1]["content"], {"day": 5})
+
+    def test_report(self):
+        """Ensures a report is generated and returned."""
+        self.assertEqual(
+            self.client.report("test.fixtures", "foo_fixture_report"),
+            ("foo_fixture_report.csv", b"FOO,BAR\r\nfoo,bar\r\n"),
+        )
+
+    def test_allowed_packages(self):
+        """Ensures only allowed report packages are loaded, once per report."""
+        with self.assertRaises(RuntimeError) as cm:
+            self.client.report("harvest", "foo_fixture_report")
+        self.assertEqual(str(cm.exception), "harvest is not served")
+        with patch(
+            "harvest.server.get_report_module", wraps=get_report_module
+        ) as module_mock:
+            for _ in range(2):
+                self.client.report("test.fixtures", "foo_fixture_report")
+        module_mock.assert_called_once_with("test.fixtures", "foo_fixture_report")
+
+    def test_errors(self):
+        """Ensures request errors are raised by the client."""
+        with self.assertRaises(RuntimeError) as cm:
+            self.client.collate("raw/bar.json")
+        self.assertIn("raw/bar.json not found", str(cm.exception))
+        with self.assertRaises(RuntimeError) as cm:
+            self.client.report("test.fixtures", "no_such_report")
+        self.assertEqual(
+            str(cm.exception), "no_such_report is not found or is ambiguous"
+        )
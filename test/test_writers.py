@@ -0,0 +1,121 @@
+# Copyright (c) 2020 IBM Corp. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Harvest report writer tests."""
+
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from harvest import writers
+from harvest.reporter import BaseReporter
+from harvest.writers import CsvWriter, ParquetWriter, TextWriter, register_writer
+
+
+class RowsReporter(BaseReporter):
+    """Report of generated rows."""
+
+    @property
+    def report_filename(self):
+        """Return the report filename."""
+        return "rows.csv"
+
+    def generate_report(self):
+        """Generate rows lazily."""
+        return ({"id": n, "name": f"row {n}"} for n in range(5))
+
+
+class TestReportWriters(unittest.TestCase):
+    """Test report writers."""
+
+    def setUp(self):
+        """Initialize supporting test objects before each test."""
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.reporter = RowsReporter(
+            "https://github.com/org/repo", None, "master", None, self.tmpdir.name
+        )
+
+    def tearDown(self):
+        """Clean up after each test."""
+        self.tmpdir.cleanup()
+
+    def test_writer_selection(self):
+        """Ensures writers are selected by extension with text as a fallback."""
+        self.assertIs(writers.get_writer("CSV"), CsvWriter)
+        self.assertIs(writers.get_writer("parquet"), ParquetWriter)
+        self.assertIs(writers.get_writer("md"), TextWriter)
+
+    @patch("harvest.reporter.WRITE_BATCH_SIZE", 2)
+    def test_batched_rows(self):
+        """Ensures generated rows are written in batches."""
+        with patch.object(CsvWriter, "write_rows", autospec=True) as write_rows:
+            self.reporter.write(self.reporter.generate_report(), self.tmpdir.name)
+        self.assertEqual([len(c.args[1]) for c in write_rows.call_args_list], [2, 2, 1])
+
+    def test_jsonl_format(self):
+        """Ensures the output format overrides the filename extension."""
+        self.reporter.write(
+            self.reporter.generate_report(), self.tmpdir.name, output_format="jsonl"
+        )
+        with open(os.path.join(self.tmpdir.name, "rows.jsonl")) as f:
+            rows = [json.loads(line) for line in f]
+        self.assertEqual(rows[4], {"id": 4, "name": "row 4"})
+
+    def test_registered_writer(self):
+        """Ensures report packages can register their own writers."""
+
+        class UpperWriter(TextWriter):
+            def write_rows(self, rows):
+                self.file.writelines(r["name"].upper() + "\n" for r in rows)
+
+        register_writer("upper", UpperWriter)
+        try:
+            self.reporter.write(
+                self.reporter.generate_report(),
+                self.tmpdir.name,
+                output_format="upper",
+            )
+        finally:
+            del writers.WRITERS["upper"]
+        with open(os.path.join(self.tmpdir.name, "rows.upper")) as f:
+            self.assertEqual(f.readline(), "ROW 0\n")
+
+    @patch("harvest.writers.pyarrow", None)
+    def test_parquet_unavailable(self):
+        """Ensures a missing Parquet dependency is reported."""
+        with self.assertRaises(RuntimeError) as cm:
+            self.reporter.write(
+                self.reporter.generate_report(),
+                self.tmpdir.name,
+                output_format="parquet",
+            )
+        self.assertEqual(
+            str(cm.exception), "rows.parquet writer dependencies are not installed"
+        )
+
+    @unittest.skipUnless(writers.pyarrow, "pyarrow not installed")
+    def test_parquet_format(self):
+        """Ensures rows are written as Parquet keeping their types."""
+        with patch("harvest.reporter.WRITE_BATCH_SIZE", 2):
+            self.reporter.write(
+                self.reporter.generate_report(),
+                self.tmpdir.name,
+                output_format="parquet",
+            )
+        table = writers.pyarrow.parquet.read_table(
+            os.path.join(self.tmpdir.name, "rows.parquet")
+        )
+        self.assertEqual(table.num_rows, 5)
+        self.assertEqual(str(table.schema.field("id").type), "int64")